@@ -1,6 +1,7 @@
+import os
 from datetime import timedelta
 from feast import Entity, FeatureView, Field, FileSource
-from feast.types import Float32, Int64
+from feast.types import Float32, Int64, String
 
 # Define entity
 phone = Entity(
@@ -96,4 +97,39 @@ phone_value_fv = FeatureView(
     source=phone_data_source,
     online=True,
     tags={"team": "value"},
-)
\ No newline at end of file
+)
+
+# 🆕 Feature View 6: Precomputed Predictions (scripts/precompute_predictions.py)
+# Parquet chỉ có sau khi chạy precompute_predictions.py, nên view chỉ được khai báo ở module level
+# khi file đã tồn tại: repo mới checkout vẫn `feast apply` được (precompute_predictions tự apply view)
+PREDICTIONS_PATH = "data/processed/phone_predictions.parquet"
+
+
+def phone_predictions_objects():
+    """(FileSource, FeatureView) của phone_predictions"""
+    source = FileSource(
+        name="phone_predictions_source",
+        path=PREDICTIONS_PATH,
+        timestamp_field="event_timestamp",
+        created_timestamp_column="created_timestamp",
+    )
+    feature_view = FeatureView(
+        name="phone_predictions",
+        entities=[phone],
+        ttl=timedelta(days=365),
+        schema=[
+            Field(name="predicted_overall_score", dtype=Float32),
+            Field(name="predicted_is_premium", dtype=Int64),
+            Field(name="premium_probability", dtype=Float32),
+            Field(name="predicted_camera_rating", dtype=Float32),
+            Field(name="model_version", dtype=String),
+        ],
+        source=source,
+        online=True,
+        tags={"team": "ml"},
+    )
+    return source, feature_view
+
+
+if os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", PREDICTIONS_PATH)):
+    phone_predictions_source, phone_predictions_fv = phone_predictions_objects()
@@ -0,0 +1,398 @@
+"""
+Memory-mapped columnar online store cho Feast.
+
+Mỗi feature view được lưu thành một thư mục các file .npy fixed-width
+(1 file / feature + keys + timestamps), sort theo entity key và đọc bằng
+np.load(mmap_mode="r"). Một lần online_read = searchsorted trên cột key
++ fancy indexing trên các cột feature, không có SQLite và không decode
+protobuf từng dòng.
+
+Cách dùng trong feature_store.yaml (thư mục my_phone_features phải nằm
+trong PYTHONPATH):
+
+    online_store:
+        type: mmap_online_store.MmapOnlineStore
+        path: data/online_store_mmap
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Literal, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import StrictStr
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ khóa trong process
+    fcntl = None
+
+from feast import Entity, FeatureView
+from feast.infra.key_encoding_utils import serialize_entity_key
+from feast.infra.online_stores.online_store import OnlineStore
+from feast.protos.feast.types.EntityKey_pb2 import EntityKey as EntityKeyProto
+from feast.protos.feast.types.Value_pb2 import Value as ValueProto
+from feast.repo_config import FeastConfigBaseModel, RepoConfig
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_NULL_TS = np.iinfo(np.int64).min
+# Version cũ chỉ bị xóa sau khi đã bị thay quá khoảng này: reader vừa đọc CURRENT (process khác)
+# vẫn kịp mở các file của version đó
+_VERSION_GRACE_SECONDS = 60.0
+# Số lần đọc lại CURRENT khi version vừa đọc đã bị xóa
+_READ_RETRIES = 3
+
+# ValueProto field -> numpy dtype của cột
+_KIND_DTYPES = {
+    "float_val": np.float32,
+    "double_val": np.float64,
+    "int32_val": np.int32,
+    "int64_val": np.int64,
+    "bool_val": np.bool_,
+    "string_val": np.str_,
+}
+
+
+class MmapOnlineStoreConfig(FeastConfigBaseModel):
+    """Online store config for the memory-mapped columnar store"""
+
+    type: Literal["mmap_online_store.MmapOnlineStore"] = "mmap_online_store.MmapOnlineStore"
+    path: StrictStr = "data/online_store_mmap"
+
+
+def _to_micros(ts):
+    if ts is None:
+        return _NULL_TS
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (ts - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(micros):
+    if micros == _NULL_TS:
+        return None
+    # Naive UTC giống SqliteOnlineStore
+    return datetime(1970, 1, 1) + timedelta(microseconds=int(micros))
+
+
+class _ViewColumns:
+    """Các cột (memory-mapped) của một version của một feature view"""
+
+    def __init__(self, version_dir):
+        with open(os.path.join(version_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.kinds = self.meta["features"]
+        self.n_rows = self.meta["n_rows"]
+
+        def _load(name):
+            # Plain ndarray view trên mmap (tránh overhead của np.memmap subclass)
+            return np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode="r").view(np.ndarray)
+
+        if self.n_rows == 0:
+            self.keys = np.empty(0, dtype="S1")
+            self.event_ts = self.created_ts = np.empty(0, dtype=np.int64)
+            self.values = {}
+            self.present = {}
+            return
+
+        self.keys = _load("keys")
+        self.event_ts = _load("event_ts")
+        self.created_ts = _load("created_ts")
+        self.values = {name: _load(f"f_{i}") for i, name in enumerate(self.kinds)}
+        self.present = {name: _load(f"p_{i}") for i, name in enumerate(self.kinds)}
+
+    def lookup(self, keys):
+        """Row index cho mỗi key, -1 nếu không tồn tại"""
+        if self.n_rows == 0 or len(keys) == 0:
+            return np.full(len(keys), -1, dtype=np.intp)
+        pos = np.searchsorted(self.keys, keys)
+        pos_clipped = np.minimum(pos, self.n_rows - 1)
+        found = self.keys[pos_clipped] == keys
+        return np.where(found, pos_clipped, -1)
+
+
+class MmapOnlineStore(OnlineStore):
+    """
+    Online store: fixed-width column files, memory-mapped and sorted by entity key.
+
+    Writes build a new immutable version directory and atomically repoint the
+    CURRENT file, so readers (kể cả process khác) never see a partial batch.
+    Read-modify-swap giữ flock trên file LOCK của view: price ingestion và
+    materialize incremental chạy ở process riêng không ghi đè batch của nhau.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._views: Dict[str, Tuple[str, _ViewColumns]] = {}
+        self._write_lock = threading.Lock()
+
+    # ==================== PATHS ====================
+
+    @staticmethod
+    def _store_path(config: RepoConfig) -> Path:
+        path = Path(config.online_store.path)
+        if config.repo_path and not path.is_absolute():
+            path = Path(config.repo_path) / path
+        return path
+
+    def _view_dir(self, config: RepoConfig, table: FeatureView) -> Path:
+        return self._store_path(config) / f"{config.project}_{table.name}"
+
+    @staticmethod
+    def _current_version(view_dir: Path) -> Optional[str]:
+        try:
+            return (view_dir / "CURRENT").read_text().strip()
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _view_lock(self, view_dir: Path):
+        """Khóa ghi của view, giữa các thread (threading.Lock) và giữa các process (flock)"""
+        view_dir.mkdir(parents=True, exist_ok=True)
+        with self._write_lock, open(view_dir / "LOCK", "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _get_columns(self, config: RepoConfig, table: FeatureView) -> Optional[_ViewColumns]:
+        view_dir = self._view_dir(config, table)
+        # Cache theo tên version trong CURRENT: mtime có thể trùng khi 2 lần swap gần nhau
+        version = self._current_version(view_dir)
+        if version is None:
+            return None
+
+        for attempt in range(_READ_RETRIES):
+            cached = self._views.get(str(view_dir))
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            try:
+                columns = _ViewColumns(str(view_dir / version))
+            except FileNotFoundError:
+                # Version bị writer (process khác) prune giữa lúc đọc CURRENT và lúc mở file: đọc lại CURRENT
+                if attempt == _READ_RETRIES - 1:
+                    raise
+                version = self._current_version(view_dir)
+                if version is None:
+                    return None
+                continue
+            self._views[str(view_dir)] = (version, columns)
+            return columns
+
+    def _serialize_keys(self, config: RepoConfig, entity_keys: Sequence[EntityKeyProto]) -> np.ndarray:
+        # Hex để key fixed-width không bị numpy cắt các byte \x00 ở cuối
+        return np.array([
+            serialize_entity_key(
+                entity_key,
+                entity_key_serialization_version=config.entity_key_serialization_version,
+            ).hex().encode()
+            for entity_key in entity_keys
+        ])
+
+    # ==================== WRITE ====================
+
+    def online_write_batch(
+        self,
+        config: RepoConfig,
+        table: FeatureView,
+        data: List[Tuple[EntityKeyProto, Dict[str, ValueProto], datetime, Optional[datetime]]],
+        progress: Optional[Callable[[int], Any]],
+    ) -> None:
+        if not data:
+            return
+
+        view_dir = self._view_dir(config, table)
+        with self._view_lock(view_dir):
+            old = self._get_columns(config, table)
+
+            # Dedup trong batch: bản ghi sau ghi đè bản ghi trước
+            batch = {}
+            for entity_key, values, event_ts, created_ts in data:
+                batch[entity_key.SerializeToString()] = (entity_key, values, event_ts, created_ts)
+            rows = list(batch.values())
+
+            new_keys = self._serialize_keys(config, [row[0] for row in rows])
+            kinds = dict(old.kinds) if old is not None else {}
+            for _, values, _, _ in rows:
+                for name, value in values.items():
+                    kind = value.WhichOneof("val")
+                    if kind in _KIND_DTYPES and name not in kinds:
+                        kinds[name] = kind
+
+            # Merge: giữ các row cũ không bị update, thêm batch mới rồi sort lại theo key
+            if old is not None and old.n_rows > 0:
+                keep = ~np.isin(old.keys, new_keys)
+                key_dtype = f"S{max(old.keys.dtype.itemsize, new_keys.dtype.itemsize)}"
+                keys = np.concatenate([old.keys[keep].astype(key_dtype), new_keys.astype(key_dtype)])
+            else:
+                keep = np.zeros(0, dtype=bool)
+                keys = new_keys
+            n_old = int(keep.sum())
+            order = np.argsort(keys, kind="stable")
+
+            event_ts = np.empty(len(keys), dtype=np.int64)
+            created_ts = np.empty(len(keys), dtype=np.int64)
+            event_ts[n_old:] = [_to_micros(row[2]) for row in rows]
+            created_ts[n_old:] = [_to_micros(row[3]) for row in rows]
+            if n_old:
+                event_ts[:n_old] = old.event_ts[keep]
+                created_ts[:n_old] = old.created_ts[keep]
+
+            columns = {}
+            for name, kind in kinds.items():
+                raw = [row[1].get(name) for row in rows]
+                present_new = np.array([v is not None and v.WhichOneof("val") == kind for v in raw], dtype=bool)
+                values_new = np.array(
+                    [getattr(v, kind) if ok else _KIND_DTYPES[kind]() for v, ok in zip(raw, present_new)],
+                    dtype=_KIND_DTYPES[kind],
+                )
+                if n_old and name in old.values:
+                    values_col = np.concatenate([np.asarray(old.values[name][keep]), values_new])
+                    present_col = np.concatenate([np.asarray(old.present[name][keep]), present_new])
+                else:
+                    values_col = np.concatenate([np.zeros(n_old, dtype=values_new.dtype), values_new])
+                    present_col = np.concatenate([np.zeros(n_old, dtype=bool), present_new])
+                columns[name] = (values_col[order], present_col[order])
+
+            self._write_version(view_dir, kinds, keys[order], event_ts[order], created_ts[order], columns)
+
+        if progress:
+            progress(len(data))
+
+    def online_delete(self, config: RepoConfig, table: FeatureView, entity_keys: Sequence[EntityKeyProto]) -> int:
+        """Xóa các entity khỏi view (ghi version mới không chứa chúng), trả về số dòng đã xóa"""
+        if not entity_keys:
+            return 0
+
+        view_dir = self._view_dir(config, table)
+        with self._view_lock(view_dir):
+            old = self._get_columns(config, table)
+            if old is None or old.n_rows == 0:
+                return 0
+            keep = ~np.isin(old.keys, self._serialize_keys(config, entity_keys))
+            n_deleted = int((~keep).sum())
+            if n_deleted:
+                columns = {
+                    name: (np.asarray(old.values[name][keep]), np.asarray(old.present[name][keep]))
+                    for name in old.kinds
+                }
+                self._write_version(view_dir, dict(old.kinds), np.asarray(old.keys[keep]),
+                                    np.asarray(old.event_ts[keep]), np.asarray(old.created_ts[keep]), columns)
+        return n_deleted
+
+    def _write_version(self, view_dir, kinds, keys, event_ts, created_ts, columns):
+        version = f"v{time.time_ns()}"
+        version_dir = view_dir / version
+        version_dir.mkdir()
+
+        np.save(version_dir / "keys.npy", keys)
+        np.save(version_dir / "event_ts.npy", event_ts)
+        np.save(version_dir / "created_ts.npy", created_ts)
+        for i, name in enumerate(kinds):
+            values_col, present_col = columns[name]
+            np.save(version_dir / f"f_{i}.npy", values_col)
+            np.save(version_dir / f"p_{i}.npy", present_col)
+        with open(version_dir / "meta.json", "w") as f:
+            json.dump({"features": kinds, "n_rows": int(len(keys))}, f)
+
+        # Atomic swap: readers chỉ thấy version cũ hoặc version mới
+        tmp_current = view_dir / "CURRENT.tmp"
+        tmp_current.write_text(version)
+        os.replace(tmp_current, view_dir / "CURRENT")
+
+        # Giữ lại version trước, các version cũ hơn chỉ xóa khi đã bị thay (= version kế tiếp được tạo)
+        # quá _VERSION_GRACE_SECONDS. Reader đã mmap thì không ảnh hưởng (file bị unlink vẫn đọc được)
+        versions = sorted((p for p in view_dir.iterdir() if p.is_dir() and p.name.startswith("v")),
+                          key=lambda p: int(p.name[1:]))
+        cutoff = time.time_ns() - int(_VERSION_GRACE_SECONDS * 1e9)
+        for stale, successor in zip(versions[:-2], versions[1:-1]):
+            if int(successor.name[1:]) < cutoff:
+                shutil.rmtree(stale, ignore_errors=True)
+
+    # ==================== READ ====================
+
+    def version_token(self, config: RepoConfig) -> Optional[Tuple[Tuple[str, str], ...]]:
+        """Version hiện tại (nội dung CURRENT) của mọi view: thay đổi sau mỗi lần ghi / xóa"""
+        store_path = self._store_path(config)
+        if not store_path.is_dir():
+            return None
+        return tuple(sorted(
+            (view_dir.name, version)
+            for view_dir in store_path.iterdir()
+            if view_dir.is_dir() and (version := self._current_version(view_dir)) is not None
+        ))
+
+    def online_read(
+        self,
+        config: RepoConfig,
+        table: FeatureView,
+        entity_keys: List[EntityKeyProto],
+        requested_features: Optional[List[str]] = None,
+    ) -> List[Tuple[Optional[datetime], Optional[Dict[str, ValueProto]]]]:
+        columns = self._get_columns(config, table)
+        if columns is None or columns.n_rows == 0:
+            return [(None, None)] * len(entity_keys)
+
+        keys = self._serialize_keys(config, entity_keys)
+        rows = columns.lookup(keys)
+        found = rows >= 0
+        safe_rows = np.where(found, rows, 0)
+
+        names = [name for name in (requested_features or list(columns.kinds)) if name in columns.kinds]
+        # Gather cả batch một lần cho mỗi cột
+        gathered = {
+            name: (columns.values[name][safe_rows].tolist(), columns.present[name][safe_rows].tolist())
+            for name in names
+        }
+        event_ts = columns.event_ts[safe_rows].tolist()
+
+        result = []
+        for i, ok in enumerate(found.tolist()):
+            if not ok:
+                result.append((None, None))
+                continue
+            features = {}
+            for name in names:
+                values, present = gathered[name]
+                if present[i]:
+                    features[name] = ValueProto(**{columns.kinds[name]: values[i]})
+                else:
+                    features[name] = ValueProto()
+            result.append((_from_micros(event_ts[i]), features))
+        return result
+
+    # ==================== LIFECYCLE ====================
+
+    def update(
+        self,
+        config: RepoConfig,
+        tables_to_delete: Sequence[FeatureView],
+        tables_to_keep: Sequence[FeatureView],
+        entities_to_delete: Sequence[Entity],
+        entities_to_keep: Sequence[Entity],
+        partial: bool,
+    ):
+        for table in tables_to_delete:
+            shutil.rmtree(self._view_dir(config, table), ignore_errors=True)
+            self._views.pop(str(self._view_dir(config, table)), None)
+
+        for table in tables_to_keep:
+            view_dir = self._view_dir(config, table)
+            if self._current_version(view_dir) is None:
+                view_dir.mkdir(parents=True, exist_ok=True)
+                self._write_version(view_dir, {}, np.empty(0, dtype="S1"),
+                                    np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), {})
+
+    def teardown(
+        self,
+        config: RepoConfig,
+        tables: Sequence[FeatureView],
+        entities: Sequence[Entity],
+    ):
+        for table in tables:
+            shutil.rmtree(self._view_dir(config, table), ignore_errors=True)
+        self._views.clear()
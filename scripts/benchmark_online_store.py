@@ -0,0 +1,100 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from feast import FeatureStore
+
+from feature_snapshot import ALL_FEATURE_REFS
+
+REPO_PATH = os.path.abspath("../my_phone_features")
+
+STORE_CONFIGS = {
+    "sqlite": "online_store:\n    type: sqlite\n    path: data/online_store.db\n",
+    "mmap": "online_store:\n    type: mmap_online_store.MmapOnlineStore\n    path: data/online_store_mmap\n",
+}
+
+
+def _make_repo(tmp_root, store_name):
+    """Copy feature repo sang thư mục tạm với online store tương ứng"""
+    repo = os.path.join(tmp_root, store_name)
+    shutil.copytree(REPO_PATH, repo, ignore=shutil.ignore_patterns(
+        "online_store.db", "online_store_mmap", "registry.db", "__pycache__"))
+
+    with open(os.path.join(repo, "feature_store.yaml")) as f:
+        config = f.read()
+    config = config[:config.index("online_store:")] + STORE_CONFIGS[store_name]
+    with open(os.path.join(repo, "feature_store.yaml"), "w") as f:
+        f.write(config)
+    return repo
+
+
+def _apply_and_materialize(repo):
+    from features.phone_features import (
+        phone, phone_display_fv, phone_camera_fv, phone_product_fv, phone_ratings_fv, phone_value_fv
+    )
+
+    fs = FeatureStore(repo_path=repo)
+    fs.apply([phone, phone_display_fv, phone_camera_fv, phone_product_fv, phone_ratings_fv, phone_value_fv])
+
+    start = time.perf_counter()
+    fs.materialize(datetime.now() - timedelta(days=3650), datetime.now())
+    return fs, time.perf_counter() - start
+
+
+def _time_lookups(fs, product_ids, batch_size, n_requests):
+    rng = np.random.default_rng(42)
+    latencies = []
+    for _ in range(n_requests):
+        batch = rng.choice(product_ids, size=batch_size)
+        start = time.perf_counter()
+        fs.get_online_features(
+            entity_rows=[{"product_id": pid} for pid in batch],
+            features=ALL_FEATURE_REFS
+        ).to_df()
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def run_benchmark(n_requests=300):
+    # mmap_online_store.py nằm trong feature repo
+    sys.path.insert(0, REPO_PATH)
+    product_ids = pd.read_parquet(
+        os.path.join(REPO_PATH, "data/processed/phone_data_processed.parquet"), columns=["product_id"]
+    )["product_id"].unique()
+
+    results = {}
+    tmp_root = tempfile.mkdtemp(prefix="online_store_bench_")
+    cwd = os.getcwd()
+    try:
+        for store_name in STORE_CONFIGS:
+            repo = _make_repo(tmp_root, store_name)
+            # FileSource dùng path tương đối so với feature repo
+            os.chdir(repo)
+            fs, materialize_time = _apply_and_materialize(repo)
+
+            results[store_name] = {"materialize_s": materialize_time}
+            for batch_size in [1, 10, 100]:
+                p50, p99 = _time_lookups(fs, product_ids, batch_size, n_requests)
+                results[store_name][f"batch_{batch_size}"] = (p50, p99)
+            os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp_root, ignore_errors=True)
+
+    print("\n📊 ONLINE STORE BENCHMARK (get_online_features, all 5 views)")
+    print(f"   {'store':8} {'materialize':>12} {'batch':>6} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for store_name, stats in results.items():
+        for batch_size in [1, 10, 100]:
+            p50, p99 = stats[f"batch_{batch_size}"]
+            print(f"   {store_name:8} {stats['materialize_s']:>11.2f}s {batch_size:>6} {p50:>10.2f} {p99:>10.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    print("🚀 Benchmark: SQLite vs memory-mapped columnar online store")
+    run_benchmark()
@@ -0,0 +1,611 @@
+"""
+Crawler async cho trang sản phẩm điện thoại (cellphones.com.vn, thegioididong.com, tiki.vn),
+ghi thẳng vào raw store (Data/raw/final_data_phone.csv) theo đúng layout cột hiện tại.
+
+- Connection pool giới hạn (httpx.Limits) + tối đa `concurrency` request cùng lúc
+- Rate limit theo host: mỗi host tối đa `per_host_rps` request / giây
+- Retry với exponential backoff + jitter cho lỗi mạng, 429 (theo Retry-After) và 5xx
+- Conditional request (If-None-Match / If-Modified-Since): trang không đổi trả 304,
+  không parse, không ghi lại raw store
+
+    python crawler.py                               # crawl lại mọi Link trong raw CSV
+    python crawler.py --urls urls.txt --concurrency 16 --per-host-rps 2
+    python crawler.py --selftest                    # end-to-end với fixture HTTP server local
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+from html import unescape
+from urllib.parse import urlsplit
+
+RAW_DATA_PATH = "../Data/raw/final_data_phone.csv"
+CACHE_PATH = "../CrawlerData/http_cache.json"
+
+RAW_COLUMNS = [
+    'Link', 'Name', 'Brand', 'DiscountedPrice', 'DiscountedPercent', 'SoldQuantity',
+    'BatteryCapacity', 'FrontCamera', 'GPU', 'ChargingPort', 'RAM', 'Resolution', 'ROM',
+    'ScreenSize', 'Rating', 'NumberOfReview', 'Description', 'data_source',
+    'main_camera_mp', 'num_cameras', 'has_telephoto', 'has_ultrawide', 'has_ois',
+    'has_warranty', 'is_new_product', 'has_original_accessories',
+]
+
+# Domain -> giá trị cột data_source
+SOURCES = {
+    'cellphones.com.vn': 'CellphoneS',
+    'thegioididong.com': 'TheGioiDiDong',
+    'tiki.vn': 'Tiki',
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = "Mozilla/5.0 (compatible; phone-data-crawler/1.0)"
+
+
+def source_for(url, sources=SOURCES):
+    host = urlsplit(url).hostname or ""
+    for domain, name in sources.items():
+        if host == domain or host.endswith("." + domain):
+            return name
+    return None
+
+
+# ==================== PARSER ====================
+
+_JSON_LD = re.compile(r'<script[^>]+application/ld\+json[^>]*>(.*?)</script>', re.S | re.I)
+_SPEC_ROW = re.compile(r'<tr[^>]*>\s*<t[hd][^>]*>(.*?)</t[hd]>\s*<td[^>]*>(.*?)</td>', re.S | re.I)
+_H1 = re.compile(r'<h1[^>]*>(.*?)</h1>', re.S | re.I)
+_META_DESCRIPTION = re.compile(r'<meta[^>]+name=["\']description["\'][^>]+content=["\']([^"\']*)', re.I)
+_TAG = re.compile(r'<[^>]+>')
+_SCRIPT = re.compile(r'<(script|style)[^>]*>.*?</\1>', re.S | re.I)
+_NUMBER = re.compile(r'\d+(?:[.,]\d+)*')
+_MEGAPIXELS = re.compile(r'(\d+(?:[.,]\d+)?)\s*MP', re.I)
+_RESOLUTION = re.compile(r'(\d{3,4})\s*[x×]\s*(\d{3,4})')
+_DISCOUNT = re.compile(r'Giảm\s*(\d+)\s*%', re.I)
+_SOLD = re.compile(r'Đã bán\s*([\d.,]+)\s*(k)?', re.I)
+_WARRANTY = re.compile(r'bảo hành\s*(?:chính hãng\s*)?\d+\s*tháng', re.I)
+
+# Nhãn trong bảng thông số (lowercase) -> cột raw
+SPEC_LABELS = {
+    'dung lượng pin': 'BatteryCapacity', 'pin': 'BatteryCapacity',
+    'camera trước': 'FrontCamera', 'độ phân giải camera trước': 'FrontCamera',
+    'camera sau': 'rear_camera', 'camera chính': 'rear_camera', 'độ phân giải camera sau': 'rear_camera',
+    'gpu': 'GPU', 'loại cpu': 'GPU', 'cpu': 'GPU',
+    'cổng sạc': 'ChargingPort', 'cổng kết nối/sạc': 'ChargingPort',
+    'dung lượng ram': 'RAM', 'ram': 'RAM',
+    'bộ nhớ trong': 'ROM', 'dung lượng lưu trữ': 'ROM', 'rom': 'ROM',
+    'kích thước màn hình': 'ScreenSize', 'màn hình rộng': 'ScreenSize',
+    'độ phân giải màn hình': 'Resolution', 'độ phân giải': 'Resolution',
+}
+
+
+def _text(html):
+    return re.sub(r'\s+', ' ', unescape(_TAG.sub(' ', html))).strip()
+
+
+def _number(text, thousands=False):
+    """Số đầu tiên trong text; thousands=True: '5.000' = 5000 (dấu chấm / phẩy là phân cách nghìn)"""
+    match = _NUMBER.search(text or "")
+    if not match:
+        return None
+    value = match.group(0)
+    value = re.sub(r'[.,]', '', value) if thousands else value.replace(',', '.')
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _sold_quantity(text):
+    """'Đã bán 1.234' = 1234; có hậu tố k thì dấu chấm / phẩy là phần thập phân: '1,2k' = 1200"""
+    sold = _SOLD.search(text)
+    if not sold:
+        return None
+    if sold.group(2):
+        value = _number(sold.group(1))
+        return float(round(value * 1000)) if value is not None else None
+    return _number(sold.group(1), thousands=True)
+
+
+def _json_ld_product(html):
+    for block in _JSON_LD.findall(html):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        for item in data if isinstance(data, list) else data.get('@graph', [data]):
+            if isinstance(item, dict) and item.get('@type') == 'Product':
+                return item
+    return {}
+
+
+def _camera_columns(rear_camera):
+    """main_camera_mp, num_cameras, has_telephoto / has_ultrawide / has_ois từ text camera sau"""
+    if not rear_camera:
+        return {}
+    megapixels = [float(v.replace(',', '.')) for v in _MEGAPIXELS.findall(rear_camera)]
+    lowered = rear_camera.lower()
+    return {
+        'main_camera_mp': max(megapixels) if megapixels else None,
+        'num_cameras': float(len(megapixels)) if megapixels else None,
+        'has_telephoto': 'Có camera tele' if 'tele' in lowered else 'Không có camera tele',
+        'has_ultrawide': ('Có camera siêu rộng' if 'siêu rộng' in lowered or 'ultra wide' in lowered
+                          else 'Không có camera siêu rộng'),
+        'has_ois': 'Có chống rung OIS' if 'ois' in lowered else 'Không có chống rung OIS',
+    }
+
+
+def parse_product(url, html, data_source=None):
+    """
+    HTML trang sản phẩm -> dict theo RAW_COLUMNS, None nếu không phải trang sản phẩm.
+    Lấy JSON-LD Product (tên, hãng, giá, rating) + bảng thông số kỹ thuật (<tr><th|td>nhãn</..><td>giá trị).
+    """
+    product = _json_ld_product(html)
+    specs = {}
+    for label, value in _SPEC_ROW.findall(html):
+        column = SPEC_LABELS.get(_text(label).lower().rstrip(':'))
+        if column and column not in specs:
+            specs[column] = _text(value)
+
+    name = product.get('name') or (_text(_H1.search(html).group(1)) if _H1.search(html) else None)
+    if not name:
+        return None
+
+    brand = product.get('brand')
+    offers = product.get('offers') or {}
+    offers = offers[0] if isinstance(offers, list) and offers else offers
+    price = offers.get('price') or offers.get('lowPrice')
+    rating = product.get('aggregateRating') or {}
+    description = product.get('description')
+    if not description:
+        match = _META_DESCRIPTION.search(html)
+        description = unescape(match.group(1)) if match else None
+
+    page_text = _text(_SCRIPT.sub(' ', html))
+    discount = _DISCOUNT.search(page_text)
+    resolution = _RESOLUTION.search(specs.get('Resolution', ""))
+
+    record = dict.fromkeys(RAW_COLUMNS)
+    record.update({
+        'Link': url,
+        'Name': _text(name),
+        'Brand': brand.get('name') if isinstance(brand, dict) else brand,
+        'DiscountedPrice': str(int(float(price))) if price else 'Giá Liên Hệ',
+        'DiscountedPercent': f"Giảm {discount.group(1)}%" if discount else None,
+        'SoldQuantity': _sold_quantity(page_text),
+        'BatteryCapacity': _number(specs.get('BatteryCapacity'), thousands=True),
+        'FrontCamera': specs.get('FrontCamera'),
+        'GPU': specs.get('GPU'),
+        'ChargingPort': specs.get('ChargingPort'),
+        'RAM': _number(specs.get('RAM')),
+        'Resolution': f"{resolution.group(1)}x{resolution.group(2)}" if resolution else None,
+        'ROM': _number(specs.get('ROM')),
+        'ScreenSize': _number(specs.get('ScreenSize')),
+        'Rating': f"{rating['ratingValue']}/5" if rating.get('ratingValue') else None,
+        'NumberOfReview': float(rating['reviewCount']) if rating.get('reviewCount') is not None else 0.0,
+        'Description': description,
+        'data_source': data_source or source_for(url),
+        'has_warranty': 'Có bảo hành' if _WARRANTY.search(page_text) else 'Không có bảo hành',
+        'is_new_product': 'Sản phẩm cũ' if re.search(r'\b(cũ|like new)\b', name, re.I) else 'Sản phẩm mới',
+        'has_original_accessories': 'Đầy đủ phụ kiện',
+    })
+    record.update(_camera_columns(specs.get('rear_camera')))
+    return record
+
+
+# ==================== STORE / CACHE ====================
+
+def _csv_value(value):
+    """Giá trị record -> chuỗi giống pandas.to_csv của raw CSV (float ghi '128.0', thiếu = '')"""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class RawStore:
+    """
+    Raw CSV, key = Link. Đọc / ghi toàn bộ dưới dạng chuỗi nên các dòng không đổi giữ nguyên từng byte.
+    Dòng cũ giữ nguyên vị trí (create_feast_processed_data đánh product_id theo thứ tự dòng),
+    dòng mới thêm vào cuối. Cột crawler không lấy được (None) giữ giá trị cũ.
+    """
+
+    def __init__(self, path=RAW_DATA_PATH):
+        self.path = path
+        self._pending = {}
+
+    def upsert(self, record):
+        self._pending[record['Link']] = record
+
+    def flush(self):
+        import pandas as pd
+
+        if not self._pending:
+            return {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        if os.path.exists(self.path):
+            frame = pd.read_csv(self.path, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+        else:
+            frame = pd.DataFrame(columns=RAW_COLUMNS)
+        positions = {link: i for i, link in enumerate(frame['Link'])}
+
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        new_rows = []
+        for link, record in self._pending.items():
+            values = {c: _csv_value(record.get(c)) for c in frame.columns if record.get(c) is not None}
+            if link not in positions:
+                new_rows.append({c: values.get(c, "") for c in frame.columns})
+                counts['inserted'] += 1
+                continue
+            row = positions[link]
+            changed = [c for c, v in values.items() if frame.at[row, c] != v]
+            if changed:
+                frame.loc[row, changed] = [values[c] for c in changed]
+                counts['updated'] += 1
+            else:
+                counts['unchanged'] += 1
+        self._pending = {}
+
+        if counts['inserted'] or counts['updated']:
+            if new_rows:
+                frame = pd.concat([frame, pd.DataFrame(new_rows, columns=frame.columns)], ignore_index=True)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            frame.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+            os.replace(tmp_path, self.path)
+        return counts
+
+
+class HttpCache:
+    """url -> ETag / Last-Modified của lần fetch trước (file JSON trong CrawlerData/)"""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def conditional_headers(self, url):
+        entry = self.entries.get(url) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, response):
+        etag, last_modified = response.headers.get('etag'), response.headers.get('last-modified')
+        if etag or last_modified:
+            self.entries[url] = {'etag': etag, 'last_modified': last_modified, 'fetched_at': time.time()}
+        else:
+            self.entries.pop(url, None)
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+# ==================== CRAWLER ====================
+
+class HostRateLimiter:
+    """Mỗi host tối đa per_second request / giây: request được xếp vào các slot cách nhau 1/per_second"""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second else 0.0
+        self._next_slot = {}
+
+    async def wait(self, host):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        # Không có await giữa đọc và ghi slot nên không cần lock (event loop 1 thread)
+        slot = max(now, self._next_slot.get(host, 0.0))
+        self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def _retry_after(response):
+    value = response.headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class Crawler:
+    def __init__(self, store=None, cache=None, concurrency=8, per_host_rps=2.0, max_retries=4,
+                 backoff=0.5, timeout=20.0, sources=SOURCES):
+        self.store = store if store is not None else RawStore()
+        self.cache = cache if cache is not None else HttpCache()
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.sources = sources
+        self.limiter = HostRateLimiter(per_host_rps)
+        self.stats = {'fetched': 0, 'not_modified': 0, 'unparsed': 0, 'failed': 0, 'retries': 0, 'bytes': 0}
+        self.errors = {}
+
+    async def fetch(self, client, url):
+        """GET có retry; trả về response cuối cùng (có thể là lỗi 4xx), None nếu hết lượt retry"""
+        host = urlsplit(url).hostname
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.wait(host)
+            try:
+                async with self._semaphore:
+                    response = await client.get(url, headers=self.cache.conditional_headers(url))
+            except Exception as e:  # httpx.TransportError: timeout, connection reset, DNS...
+                self.errors[url] = f"{type(e).__name__}: {e}"
+                delay = None
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                self.errors[url] = f"HTTP {response.status_code}"
+                delay = _retry_after(response)
+            if attempt == self.max_retries:
+                return None
+            self.stats['retries'] += 1
+            # Exponential backoff + jitter; Retry-After của server được ưu tiên
+            await asyncio.sleep(delay if delay is not None else self.backoff * 2 ** attempt * random.uniform(0.5, 1.0))
+        return None
+
+    async def crawl_one(self, client, url):
+        response = await self.fetch(client, url)
+        if response is None:
+            self.stats['failed'] += 1
+            return
+        if response.status_code == 304:
+            self.stats['not_modified'] += 1
+            return
+        if response.status_code != 200:
+            self.errors[url] = f"HTTP {response.status_code}"
+            self.stats['failed'] += 1
+            return
+
+        self.errors.pop(url, None)
+        self.stats['fetched'] += 1
+        self.stats['bytes'] += len(response.content)
+        record = parse_product(url, response.text, source_for(url, self.sources))
+        if record is None:
+            self.stats['unparsed'] += 1
+            return
+        self.store.upsert(record)
+        self.cache.put(url, response)
+
+    async def run(self, urls):
+        import httpx
+
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        started = time.perf_counter()
+        try:
+            async with httpx.AsyncClient(limits=limits, timeout=self.timeout, follow_redirects=True,
+                                         headers={'User-Agent': USER_AGENT}) as client:
+                await asyncio.gather(*(self.crawl_one(client, url) for url in dict.fromkeys(urls)))
+        finally:
+            # Ghi phần đã crawl được kể cả khi bị ngắt giữa chừng; cache lưu sau store
+            # để trang chưa ghi vào store không bị 304 ở lần chạy sau
+            self.stats.update(self.store.flush())
+            self.cache.save()
+        self.stats['elapsed_s'] = round(time.perf_counter() - started, 2)
+        return self.stats
+
+    def crawl(self, urls):
+        return asyncio.run(self.run(urls))
+
+
+def links_from_store(path=RAW_DATA_PATH, sources=None):
+    import pandas as pd
+
+    frame = pd.read_csv(path, usecols=['Link', 'data_source'], encoding='utf-8-sig')
+    if sources:
+        frame = frame[frame['data_source'].isin(sources)]
+    return frame['Link'].dropna().tolist()
+
+
+# ==================== SELFTEST ====================
+
+def _fixture_page(index, version=1):
+    product = {
+        '@context': 'https://schema.org', '@type': 'Product',
+        'name': f'Phone Test {index} 8GB 256GB', 'brand': {'@type': 'Brand', 'name': 'TestBrand'},
+        'description': f'Điện thoại test {index} phiên bản {version}',
+        'offers': {'@type': 'Offer', 'price': str(5000000 + index * 100000 + version), 'priceCurrency': 'VND'},
+        'aggregateRating': {'@type': 'AggregateRating', 'ratingValue': '4.8', 'reviewCount': str(10 + index)},
+    }
+    specs = [
+        ('Kích thước màn hình', '6,67 inches'), ('Độ phân giải màn hình', '1080 x 2400 pixels'),
+        ('Camera sau', 'Camera chính 108 MP, OIS<br>Camera góc siêu rộng 8 MP<br>Camera macro 2 MP'),
+        ('Camera trước', '16 MP, f/2.45'), ('Dung lượng RAM', '8 GB'), ('Bộ nhớ trong', '256 GB'),
+        ('Dung lượng pin', '5.000 mAh'), ('Cổng sạc', 'USB Type-C'), ('GPU', 'Adreno 610'),
+    ]
+    rows = "".join(f"<tr><th>{label}</th><td>{value}</td></tr>" for label, value in specs)
+    return (f'<html><head><script type="application/ld+json">{json.dumps(product, ensure_ascii=False)}</script>'
+            f'</head><body><h1>{product["name"]}</h1><span>Giảm 15%</span><span>Bảo hành 12 tháng</span>'
+            f'<table>{rows}</table></body></html>').encode('utf-8')
+
+
+def _start_fixture_server(n_pages, latency=0.05):
+    """ThreadingHTTPServer: /p/<i>.html (ETag + Last-Modified), /flaky.html (503 lần đầu),
+    /limited.html (429 + Retry-After lần đầu), /missing.html (404)"""
+    import hashlib
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    state = {'versions': dict.fromkeys(range(n_pages), 1), 'hits': {}, 'requests': [], 'statuses': [],
+             'in_flight': 0, 'max_in_flight': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=b"", headers=None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            state['statuses'].append(status)
+
+        def do_GET(self):
+            with lock:
+                state['in_flight'] += 1
+                state['max_in_flight'] = max(state['max_in_flight'], state['in_flight'])
+                hits = state['hits'][self.path] = state['hits'].get(self.path, 0) + 1
+                state['requests'].append((self.headers.get('Host'), time.monotonic()))
+            try:
+                time.sleep(latency)
+                self._handle(hits)
+            finally:
+                with lock:
+                    state['in_flight'] -= 1
+
+        def _handle(self, hits):
+            if self.path == '/missing.html':
+                return self._send(404)
+            if self.path == '/flaky.html' and hits == 1:
+                return self._send(503)
+            if self.path == '/limited.html' and hits == 1:
+                return self._send(429, headers={'Retry-After': '1'})
+            match = re.fullmatch(r'/p/(\d+)\.html', self.path)
+            if match:
+                index = int(match.group(1))
+                version = state['versions'][index]
+            elif self.path in ('/flaky.html', '/limited.html'):
+                index, version = 1000 + len(self.path), 1
+            else:
+                return self._send(404)
+            body = _fixture_page(index, version)
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            last_modified = 'Mon, 06 Jan 2025 00:00:%02d GMT' % version
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(304, headers={'ETag': etag})
+            self._send(200, body, {'Content-Type': 'text/html; charset=utf-8', 'ETag': etag,
+                                   'Last-Modified': last_modified})
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def run_selftest(n_pages=40, concurrency=4, per_host_rps=20.0):
+    import tempfile
+    import pandas as pd
+
+    sold_cases = {"Đã bán 1,2k": 1200, "Đã bán 2.5k": 2500, "Đã bán 3k": 3000,
+                  "Đã bán 1.234": 1234, "Đã bán 56": 56, "Còn hàng": None}
+    for text, expected in sold_cases.items():
+        assert _sold_quantity(text) == expected, (text, _sold_quantity(text))
+
+    server, state = _start_fixture_server(n_pages)
+    port = server.server_address[1]
+    # 2 host trỏ về cùng server để kiểm tra rate limit tách theo host
+    hosts = {'127.0.0.1': 'CellphoneS', 'localhost': 'Tiki'}
+    urls = [f"http://{list(hosts)[i % 2]}:{port}/p/{i}.html" for i in range(n_pages)]
+    urls += [f"http://127.0.0.1:{port}/{name}.html" for name in ('flaky', 'limited', 'missing')]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "final_data_phone.csv")
+        cache_path = os.path.join(tmp, "http_cache.json")
+        # Raw store có sẵn 1 dòng cũ của trang 0: phải được cập nhật tại chỗ, không thêm dòng
+        stale = dict.fromkeys(RAW_COLUMNS, "")
+        stale.update({'Link': urls[0], 'Name': 'Old name', 'ScreenSize': '6.1', 'Rating': '4.0/5'})
+        pd.DataFrame([stale], columns=RAW_COLUMNS).to_csv(store_path, index=False, encoding='utf-8-sig')
+
+        def crawl():
+            crawler = Crawler(RawStore(store_path), HttpCache(cache_path), concurrency=concurrency,
+                              per_host_rps=per_host_rps, backoff=0.05, sources=hosts)
+            return crawler.crawl(urls)
+
+        first = crawl()
+        print(f"\n🕷️  Lần 1: {first}")
+        stored = pd.read_csv(store_path, encoding='utf-8-sig')
+        assert list(stored.columns) == RAW_COLUMNS
+        assert len(stored) == n_pages + 2 and stored.loc[0, 'Link'] == urls[0]
+        assert stored.loc[0, 'Name'] == 'Phone Test 0 8GB 256GB' and stored.loc[0, 'ScreenSize'] == 6.67
+        assert first['fetched'] == n_pages + 2 and first['failed'] == 1 and first['retries'] == 2
+        assert (first['inserted'], first['updated']) == (n_pages + 1, 1)
+        assert state['max_in_flight'] <= concurrency
+        row = stored.set_index('Link').loc[urls[1]]
+        assert (row['Resolution'], row['RAM'], row['ROM'], row['BatteryCapacity']) == ('1080x2400', 8, 256, 5000)
+        assert (row['main_camera_mp'], row['num_cameras'], row['has_ois'], row['has_ultrawide']) == \
+            (108, 3, 'Có chống rung OIS', 'Có camera siêu rộng')
+        assert row['data_source'] == 'Tiki' and row['DiscountedPercent'] == 'Giảm 15%'
+
+        for host in hosts:
+            # Thời điểm đến server có jitter (kết nối mới, 1 CPU): kiểm tra số request trong cửa sổ 1 giây
+            times = sorted(t for h, t in state['requests'] if h.startswith(host))
+            busiest = max(sum(1 for t in times[i:] if t - start < 1.0) for i, start in enumerate(times))
+            assert busiest <= per_host_rps + 1, (host, busiest)
+            print(f"   ✅ {host}: {len(times)} request, tối đa {busiest} request / giây "
+                  f"(giới hạn {per_host_rps:.0f})")
+        print(f"   ✅ Tối đa {state['max_in_flight']} request đồng thời (giới hạn {concurrency})")
+
+        snapshot = open(store_path, 'rb').read()
+        state['statuses'].clear()
+        second = crawl()
+        print(f"🕷️  Lần 2 (không đổi): {second}")
+        assert second['not_modified'] == n_pages + 2 and second['fetched'] == 0 and second['bytes'] == 0
+        assert open(store_path, 'rb').read() == snapshot
+        print(f"   ✅ {state['statuses'].count(304)} x 304, raw store không bị ghi lại")
+
+        state['versions'][5] += 1
+        third = crawl()
+        print(f"🕷️  Lần 3 (1 trang đổi): {third}")
+        assert (third['fetched'], third['updated'], third['inserted']) == (1, 1, 0)
+        assert len(pd.read_csv(store_path, encoding='utf-8-sig')) == n_pages + 2
+    server.shutdown()
+    print("🎉 Crawler selftest OK")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl trang sản phẩm vào raw CSV")
+    parser.add_argument("--urls", help="File URL (1 dòng / URL). Mặc định: mọi Link trong raw CSV")
+    parser.add_argument("--sources", nargs="*", help="Chỉ crawl lại Link của các data_source này")
+    parser.add_argument("--output", default=RAW_DATA_PATH)
+    parser.add_argument("--cache", default=CACHE_PATH)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--per-host-rps", type=float, default=2.0)
+    parser.add_argument("--max-retries", type=int, default=4)
+    parser.add_argument("--selftest", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.selftest:
+        run_selftest()
+        return
+    if args.urls:
+        with open(args.urls, encoding='utf-8') as f:
+            urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    else:
+        urls = links_from_store(args.output, args.sources)
+
+    crawler = Crawler(RawStore(args.output), HttpCache(args.cache), concurrency=args.concurrency,
+                      per_host_rps=args.per_host_rps, max_retries=args.max_retries)
+    print(f"🕷️  Crawling {len(urls)} URL...")
+    stats = crawler.crawl(urls)
+    print(json.dumps(stats, indent=2))
+    for url, error in list(crawler.errors.items())[:10]:
+        print(f"   ❌ {url}: {error}")
+
+
+if __name__ == "__main__":
+    main()
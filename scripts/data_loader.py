@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime, timedelta
+from spec_extractor import extract_specs
+from deduplicator import assign_canonical_ids
 
 class DataLoader:
     def __init__(self, data_path):
@@ -14,7 +16,7 @@ class DataLoader:
         print(f" Loaded dataset with {len(self.dataset)} rows")
         return self
     
-    def preprocess_for_feast(self, save_path=None):
+    def preprocess_for_feast(self, save_path=None, with_specs=True, with_dedup=True):
         if self.dataset is None:
             raise ValueError("Please load data first using load_raw_data()")
         
@@ -24,6 +26,14 @@ class DataLoader:
             'Description', 'data_source'], axis=1)
         
         nan_count = dataset_clean.isnull().sum(axis=1)
+        if with_specs:
+            # RAM/ROM/pin/camera trước/chipset trích từ các cột text vừa bỏ (không tính vào nan_count)
+            dataset_clean = pd.concat([dataset_clean, extract_specs(self.dataset)], axis=1)
+        if with_dedup:
+            # Listing trùng (khác nguồn / màu / cách ghi tên) cùng canonical_product_id, tính từ Name trước khi bỏ
+            deduped, _ = assign_canonical_ids(self.dataset)
+            dataset_clean['canonical_product_id'] = deduped['canonical_product_id']
+            dataset_clean['duplicate_group_size'] = deduped['duplicate_group_size']
         dataset_clean = dataset_clean[nan_count < 6]
         
         dataset_clean = self._add_timestamps(dataset_clean)
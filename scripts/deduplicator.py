@@ -0,0 +1,467 @@
+"""
+Gom các listing trùng / gần trùng (cùng model + cùng cấu hình RAM/ROM, khác màu, khác cách ghi tên,
+khác data_source) và gán canonical_product_id = product_id của listing đầu tiên trong nhóm.
+
+Thời gian gần tuyến tính theo số listing:
+1. Chuẩn hoá Name -> tập token (bỏ dấu, bỏ "điện thoại", "chính hãng", màu, phần mô tả sau "(" / "|" / " - ")
+2. MinHash 64 hàm hash (numpy, theo lô), LSH 16 band x 4 dòng, bucket = (block, band, hash band) với
+   block = hãng + token có số (model, RAM/ROM) + hậu tố (Pro, Max, Plus...), các token này phải giống hệt
+3. Trong mỗi bucket chỉ so mỗi listing với listing đầu bucket và listing liền trước (không so từng cặp)
+4. Cặp được nhận nếu Jaccard ước lượng >= threshold và Jaccard thật (trên tập token) >= threshold
+5. Connected components (scipy) = union-find trên các cặp đã nhận
+
+Cột Brand của raw CSV không dùng được để block ("Tin đồn - Mới ra", "Chuẩn NFC"...), hãng lấy từ tên.
+
+    frame = assign_canonical_ids(raw_df)            # + canonical_product_id, duplicate_group_size
+    python deduplicator.py                          # thống kê trên raw CSV
+    python deduplicator.py --benchmark --rows 200000
+
+Benchmark đo precision / recall trên listing giả lập (synthetic_listings) và trên LABELLED_PAIRS:
+các cặp tên thật trong raw CSV được gán nhãn tay (cùng / khác product).
+"""
+import argparse
+import os
+import re
+import time
+import unicodedata
+import numpy as np
+import pandas as pd
+
+RAW_DATA_PATH = "../Data/raw/final_data_phone.csv"
+
+NUM_PERM = 64
+BANDS = 16
+THRESHOLD = 0.7
+
+STOPWORDS = {
+    'dien', 'thoai', 'dtdd', 'chinh', 'hang', 'vn', 'a', 'i', 'ban', 'quoc', 'te', 'moi', 'new',
+    'fullbox', 'nguyen', 'seal', 'da', 'kich', 'hoat', 'bao', 'hanh', 'tu', 'mau', 'va', 'ram', 'rom',
+    'ai',  # "Điện thoại AI Samsung Galaxy S24 Ultra": không để "ai" thành tên hãng
+}
+COLOURS = {
+    'den', 'trang', 'xanh', 'do', 'tim', 'vang', 'hong', 'bac', 'xam', 'titan', 'nhien', 'sa', 'mac',
+    'duong', 'la', 'ngoc', 'black', 'white', 'blue', 'green', 'purple', 'gold', 'silver', 'gray', 'grey',
+    'red', 'pink', 'midnight', 'starlight', 'graphite', 'cream', 'lavender', 'mint', 'natural', 'desert',
+}
+# Hậu tố phân biệt model: phải giống hệt giống token có số ("iPhone 14" khác "iPhone 14 Plus")
+VARIANT_WORDS = {'pro', 'max', 'plus', 'ultra', 'lite', 'mini', 'fe', 'prime', 'neo', 'turbo', 'edge',
+                 'fold', 'flip', 'se', 'xl', 'f', 'pro+', '+'}
+# Token đầu của tên -> hãng (khi tên bắt đầu bằng dòng máy)
+BRAND_ALIASES = {'iphone': 'apple', 'galaxy': 'samsung', 'redmi': 'xiaomi', 'poco': 'xiaomi', 'mi': 'xiaomi',
+                 'pixel': 'google', 'cmf': 'nothing'}
+# Dòng máy mà mọi điện thoại của hãng đều có ("Samsung A56" = "Samsung Galaxy A56"): bỏ như tên hãng.
+# Redmi / POCO không nằm ở đây vì "Redmi 12" khác "Xiaomi 12"
+IMPLIED_SERIES = {'galaxy', 'iphone', 'pixel'}
+
+_CUT = re.compile(r'\(|\||\s-\s|,|\bI\s+Chính hãng', re.I)
+_MEMORY_PAIR = re.compile(r'(\d+)\s*(?:gb)?\s*[/+]\s*(\d+)\s*(gb|tb)')
+_MEMORY = re.compile(r'(\d+)\s*(gb|tb|mb)\b')
+_TOKEN = re.compile(r'[a-z0-9+]+')
+
+
+def _strip_accents(text):
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def tokenize_name(name):
+    """
+    Name -> (hãng, token model (đã bỏ hãng, màu), token bộ nhớ).
+    Token bộ nhớ ("8gb", "256gb") lấy trên cả tên, token model chỉ lấy phần trước "(" / "|" / " - " / ","
+    vì phần sau thường là mô tả dài của Tiki.
+    """
+    if not isinstance(name, str):
+        return "", [], []
+    text = _strip_accents(name).lower()
+    text = _MEMORY_PAIR.sub(lambda m: f"{m.group(1)}gb {m.group(2)}{m.group(3)}", text)
+    memory = sorted({f"{a}{unit}" for a, unit in _MEMORY.findall(text)})
+
+    head = _CUT.split(text, maxsplit=1)[0]
+    head = _MEMORY.sub(' ', head)
+    tokens = [t for t in _TOKEN.findall(head) if t not in STOPWORDS and t not in COLOURS]
+    brand = BRAND_ALIASES.get(tokens[0], tokens[0]) if tokens else ""
+    # Tên hãng đã nằm trong khoá block: bỏ khỏi token để "Samsung Galaxy A34" = "Galaxy A34"
+    if len(tokens) > 1 and tokens[0] == brand:
+        tokens = tokens[1:]
+    tokens = [t for t in tokens if t not in IMPLIED_SERIES] or tokens
+    return brand, tokens, memory
+
+
+def _hash_tokens(tokens):
+    return pd.util.hash_array(np.asarray(tokens, dtype=object)) if len(tokens) else np.empty(0, dtype=np.uint64)
+
+
+def minhash_signatures(token_lists, num_perm=NUM_PERM, seed=1, chunk=16):
+    """
+    Chữ ký MinHash (n, num_perm) uint32. Hash họ multiply-shift: (a * h + b) >> 32 với a lẻ;
+    min theo từng listing bằng np.minimum.reduceat trên mảng token đã nối.
+    Listing không có token nhận chữ ký ngẫu nhiên riêng (không trùng ai).
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    lengths = np.fromiter((len(t) for t in token_lists), dtype=np.int64, count=len(token_lists))
+    hashes = _hash_tokens([t for tokens in token_lists for t in tokens])
+    signatures = rng.integers(0, 2 ** 32, size=(len(token_lists), num_perm), dtype=np.uint64).astype(np.uint32)
+    has_tokens = lengths > 0
+    if not has_tokens.any():
+        return signatures
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])[has_tokens]
+
+    for start in range(0, num_perm, chunk):
+        # Theo lô hàm hash để mảng tạm (n_tokens x chunk) không quá lớn
+        permuted = (hashes[:, None] * a[None, start:start + chunk] + b[None, start:start + chunk]) >> np.uint64(32)
+        signatures[has_tokens, start:start + chunk] = np.minimum.reduceat(permuted, offsets, axis=0).astype(np.uint32)
+    return signatures
+
+
+def _band_hashes(signatures, bands):
+    rows = signatures.shape[1] // bands
+    sig = signatures.astype(np.uint64)
+    out = np.empty((signatures.shape[0], bands), dtype=np.uint64)
+    for band in range(bands):
+        h = np.zeros(signatures.shape[0], dtype=np.uint64)
+        for column in sig[:, band * rows:(band + 1) * rows].T:
+            h = h * np.uint64(0x9E3779B97F4A7C15) + column
+        out[:, band] = h
+    return out
+
+
+def candidate_pairs(signatures, block_codes, bands=BANDS):
+    """
+    Cặp ứng viên từ LSH: trong mỗi bucket (block, band, hash), mỗi listing ghép với listing đầu bucket
+    và listing liền trước -> tối đa 2 cặp / listing / band, không bùng nổ khi bucket lớn.
+    """
+    band_hashes = _band_hashes(signatures, bands)
+    left, right = [], []
+    for band in range(bands):
+        h = band_hashes[:, band]
+        order = np.lexsort((h, block_codes))
+        h_sorted, block_sorted = h[order], block_codes[order]
+        same = (h_sorted[1:] == h_sorted[:-1]) & (block_sorted[1:] == block_sorted[:-1])
+        if not same.any():
+            continue
+        # Vị trí đầu bucket của từng phần tử
+        starts = np.maximum.accumulate(np.where(np.concatenate([[True], ~same]), np.arange(len(order)), 0))
+        members = np.nonzero(same)[0] + 1
+        left.extend([order[members - 1], order[starts[members]]])
+        right.extend([order[members], order[members]])
+    if not left:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    left, right = np.concatenate(left), np.concatenate(right)
+    # Bỏ cặp lặp giữa các band: mã hoá (min, max) thành 1 số int64 rồi np.unique 1 chiều
+    n = np.int64(len(signatures))
+    codes = np.unique(np.minimum(left, right) * n + np.maximum(left, right))
+    left, right = codes // n, codes % n
+    keep = left != right
+    return left[keep], right[keep]
+
+
+def cluster_listings(names, threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS):
+    """names -> (nhãn cụm int64 theo từng listing, thống kê)"""
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    started = time.perf_counter()
+    # Tên lặp lại nhiều (cùng listing qua nhiều lần crawl): tokenize mỗi tên 1 lần
+    codes, unique_names = pd.factorize(pd.Series(names, dtype=object), use_na_sentinel=False)
+    parsed = [tokenize_name(name) for name in unique_names]
+    # MinHash chỉ trên token model: bộ nhớ đã được so khớp chính xác qua block, để trong Jaccard
+    # thì "Redmi Note 12 8GB 256GB" và "Redmi 12 8GB 256GB" giống nhau tới 0.8
+    token_lists = [parsed[code][1] for code in codes]
+    # Block = hãng + token có chữ số (model "a34", "14", bộ nhớ) + hậu tố (Pro, Max...), phải giống hệt:
+    # khác màu / cách ghi thì gộp, khác model / khác RAM-ROM thì không. Nằm trong khoá bucket (không chỉ
+    # lọc sau) để listing khác RAM-ROM không chen giữa chuỗi "đầu bucket / liền trước" của cùng cấu hình
+    blocks = pd.factorize(pd.Series([
+        p[0] + "|" + " ".join(sorted(t for t in p[1] + p[2] if t in VARIANT_WORDS or any(ch.isdigit() for ch in t)))
+        for p in parsed]))[0].astype(np.int64)[codes]
+    tokenized = time.perf_counter()
+
+    signatures = minhash_signatures(token_lists, num_perm)
+    hashed = time.perf_counter()
+
+    left, right = candidate_pairs(signatures, blocks, bands)
+    similarity = (signatures[left] == signatures[right]).mean(axis=1)
+    accepted = similarity >= threshold
+    # Jaccard ước lượng từ 64 hash lệch ~±0.06: kiểm tra lại Jaccard thật trên các cặp đã qua ngưỡng
+    # ("Redmi Note 12" / "Redmi 12" thật là 0.67), chỉ tính 1 lần cho mỗi cặp tên khác nhau
+    token_sets = [frozenset(p[1]) for p in parsed]
+    exact = {}
+    for i in np.nonzero(accepted)[0]:
+        a, b = codes[left[i]], codes[right[i]]
+        if a != b:
+            key = (a, b) if a < b else (b, a)
+            if key not in exact:
+                union = token_sets[a] | token_sets[b]
+                exact[key] = len(token_sets[a] & token_sets[b]) / len(union) if union else 0.0
+            accepted[i] = exact[key] >= threshold
+    n = len(token_lists)
+    graph = coo_matrix((np.ones(accepted.sum(), dtype=np.int8), (left[accepted], right[accepted])), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    finished = time.perf_counter()
+
+    stats = {
+        'listings': n, 'clusters': int(labels.max() + 1) if n else 0,
+        'candidate_pairs': int(len(left)), 'accepted_pairs': int(accepted.sum()),
+        'tokenize_s': round(tokenized - started, 3), 'minhash_s': round(hashed - tokenized, 3),
+        'lsh_cluster_s': round(finished - hashed, 3), 'elapsed_s': round(finished - started, 3),
+    }
+    return labels, stats
+
+
+def assign_canonical_ids(frame, id_column='product_id', name_column='Name', threshold=THRESHOLD):
+    """frame + canonical_product_id (product_id của listing đầu tiên trong cụm) + duplicate_group_size"""
+    labels, stats = cluster_listings(frame[name_column].tolist(), threshold)
+    result = frame.copy()
+    first = pd.Series(np.arange(len(frame))).groupby(labels).transform('min').to_numpy()
+    result['canonical_product_id'] = frame[id_column].to_numpy()[first]
+    result['duplicate_group_size'] = pd.Series(labels).map(pd.Series(labels).value_counts()).to_numpy()
+    return result, stats
+
+
+# ==================== ĐÁNH GIÁ / BENCHMARK ====================
+
+_SYNTH_BRANDS = {
+    'Samsung': ['Galaxy A', 'Galaxy S', 'Galaxy M', 'Galaxy Z Fold', 'Galaxy Z Flip'],
+    'Xiaomi': ['Redmi Note ', 'Redmi ', 'Xiaomi ', 'POCO X', 'POCO F'],
+    'OPPO': ['OPPO A', 'OPPO Reno', 'OPPO Find X'], 'vivo': ['vivo Y', 'vivo V', 'vivo X'],
+    'Apple': ['iPhone '], 'realme': ['realme C', 'realme Note ', 'realme GT '], 'HONOR': ['HONOR X', 'HONOR Magic'],
+    'Tecno': ['Tecno Spark ', 'Tecno Camon '], 'Nokia': ['Nokia G', 'Nokia C'], 'Google': ['Pixel '],
+}
+_SUFFIXES = ['', ' Pro', ' Pro Max', ' Ultra', ' Plus', ' Lite', ' 5G', ' Pro 5G', ' FE', 's']
+_MEMORY_CONFIGS = [(4, 64), (4, 128), (6, 128), (8, 128), (8, 256), (12, 256), (12, 512), (16, 1024)]
+_COLOURS = ['Đen', 'Trắng', 'Xanh dương', 'Tím', 'Vàng', 'Titan tự nhiên', 'Midnight', 'Starlight', 'Hồng']
+
+
+def _memory_text(ram, rom, style):
+    rom_text = f"{rom // 1024}TB" if rom >= 1024 else f"{rom}GB"
+    return [f"{ram}GB {rom_text}", f"{ram}GB/{rom_text}", f"({ram}GB/{rom_text})", f"({ram}/{rom_text})",
+            f"Ram {ram}GB Rom {rom_text}"][style]
+
+
+def synthetic_listings(n_rows, seed=7):
+    """
+    Listing giả lập có nhãn: mỗi product (hãng + dòng + số + hậu tố + RAM/ROM) có 1-6 listing, mỗi listing
+    đổi cách ghi tên như giữa các nguồn (tiền tố "Điện thoại", "| Chính hãng VN/A", "- Hàng chính hãng",
+    màu, kiểu ghi RAM/ROM, chữ hoa/thường). Product "anh em" (khác 1 số / RAM-ROM) là negative khó.
+    """
+    rng = np.random.default_rng(seed)
+    brands = list(_SYNTH_BRANDS)
+    names, labels = [], []
+    seen = set()
+    product = 0
+    while len(names) < n_rows:
+        brand = brands[rng.integers(len(brands))]
+        series = _SYNTH_BRANDS[brand][rng.integers(len(_SYNTH_BRANDS[brand]))]
+        model = f"{series}{rng.integers(1, 100)}{_SUFFIXES[rng.integers(len(_SUFFIXES))]}"
+        ram, rom = _MEMORY_CONFIGS[rng.integers(len(_MEMORY_CONFIGS))]
+        # Mỗi (model, RAM/ROM) chỉ là 1 product, nếu không nhãn thật tự mâu thuẫn
+        if (model, ram, rom) in seen:
+            continue
+        seen.add((model, ram, rom))
+        for _ in range(rng.integers(1, 7)):
+            name = f"{model} {_memory_text(ram, rom, rng.integers(5))}"
+            if not model.lower().startswith(brand.lower()) and rng.random() < 0.5:
+                name = f"{brand} {name}"
+            if rng.random() < 0.4:
+                name = f"Điện thoại {name}"
+            if rng.random() < 0.3:
+                name = f"{name} {_COLOURS[rng.integers(len(_COLOURS))]}"
+            tail = rng.random()
+            if tail < 0.25:
+                name = f"{name} | Chính hãng VN/A"
+            elif tail < 0.5:
+                name = f"{name} - Hàng chính hãng"
+            elif tail < 0.6:
+                name = f"{name}, Camera AI, Pin trâu - Hàng Chính Hãng"
+            if rng.random() < 0.2:
+                name = name.upper() if rng.random() < 0.5 else name.lower()
+            names.append(name)
+            labels.append(product)
+        product += 1
+    return names[:n_rows], np.asarray(labels[:n_rows])
+
+
+def _pair_count(counts):
+    counts = np.asarray(counts, dtype=np.int64)
+    return int((counts * (counts - 1) // 2).sum())
+
+
+def pairwise_scores(predicted, truth):
+    """Precision / recall trên mọi cặp listing (cặp cùng cụm dự đoán vs cùng product thật), O(n)"""
+    joint = pd.DataFrame({'p': predicted, 't': truth}).value_counts().to_numpy()
+    true_positive = _pair_count(joint)
+    predicted_pairs = _pair_count(pd.Series(predicted).value_counts().to_numpy())
+    true_pairs = _pair_count(pd.Series(truth).value_counts().to_numpy())
+    precision = true_positive / predicted_pairs if predicted_pairs else 1.0
+    recall = true_positive / true_pairs if true_pairs else 1.0
+    return precision, recall
+
+
+# Cặp listing thật trong raw CSV (Name), gán nhãn tay. Listing không ghi RAM/ROM ("Apple iPhone 14") không
+# được gán nhãn vì không biết cấu hình
+LABELLED_PAIRS = [
+    # Cùng product: khác nguồn / màu / cách ghi RAM-ROM / tiền tố, hậu tố mô tả
+    ('realme C75X 8GB-128GB',
+     'Điện thoại realme C75x 8GB/128GB', True),
+    ('Điện thoại iPhone 14 128GB',
+     'iPhone 14 128GB | Chính hãng VN/A', True),
+    ('Điện thoại vivo Y18s (6GB+128GB) - Hàng chính hãng - Bảo hành 1 đổi 1 trong tháng đầu tiên',
+     'vivo Y18S 6GB 128GB', True),
+    ('[MỚI] Điện thoại vivo Y04 (6GB+128GB) - Hàng chính hãng - 1 Đổi 1 trong tháng đầu tiên - Bảo hành 12 tháng',
+     'vivo Y04 6GB 128GB', True),
+    ('vivo Y19S 8GB 128GB',
+     '[MỚI] Điện thoại vivo Y19s (8GB+128GB) - 1 Đổi 1 trong tháng đầu tiên - Bảo hành chính hãng 12 tháng - Hàng Chính Hãng', True),
+    ('TECNO SPARK Go 1 4GB 64GB',
+     'Điện thoại Tecno SPARK GO 1 ( 4GB - 64GB) - Hàng Chính Hãng', True),
+    ('Điện thoại Samsung Galaxy A56 5G 12GB/256GB',
+     'Samsung A56 5G 12GB - 256GB', True),
+    ('Điện thoại Xiaomi 15 Ultra 5G 16GB/512GB Trắng',
+     'Xiaomi 15 Ultra 5G 16GB 512GB', True),
+    ('Điện thoại Realme Note 50 , Màn 90HZ (3GB/64GB) Rom quốc tế - Hàng chính hãng',
+     'Điện thoại realme Note 50 3GB/64GB', True),
+    ('Xiaomi Redmi Note 13 Pro 4G 8GB 128GB',
+     'Điện thoại Xiaomi Redmi Note 13 Pro 4G (8GB/128GB) - Hàng chính hãng', True),
+    ('Điện thoại Samsung Galaxy Z Flip6 (12GB/256GB) - Hàng chính hãng',
+     'Samsung Galaxy Z Flip6 12GB 256GB', True),
+    ('Điện thoại Samsung Galaxy A06 5G (4/128GB), Màn Hình Cực Đại HD+ 6.7”, 5G Kết nối cực nhanh - Hàng chính hãng',
+     'Samsung Galaxy A06 5G 4GB 128GB', True),
+    ('OPPO Find X8 Pro 5G 16GB 512GB',
+     'Điện thoại OPPO Find X8 Pro 5G 16GB/512GB', True),
+    ('Nokia 110 4G Pro',
+     'Điện thoại Nokia 110 4G Pro', True),
+    ('Điện thoại Samsung Galaxy A05s (4GB/128GB) - Hàng chính hãng',
+     'Điện thoại Samsung Galaxy A05s (4Gb/128Gb) - Hàng chính hãng - Đã kích hoạt bảo hành điện tử', True),
+    ('Samsung Galaxy A05 4GB 128GB',
+     'Điện thoại Samsung Galaxy A05 (4GB/128GB)- Helio G85 - Sạc nhanh 25W - Hàng chính hãng', True),
+    ('Nokia 3210 4G',
+     'Điện thoại Nokia 3210 4G - Hàng chính hãng', True),
+    ('Điện thoại iPhone 16 Pro Max 256GB',
+     'iPhone 16 Pro Max 256GB | Chính hãng VN/A', True),
+    ('Điện thoại Samsung Galaxy A26 5G (8/128GB), Mặt lưng kính, AI-Circle to Search, Camera HDR chụp đêm sáng rõ - Hàng chính hãng',
+     'Samsung Galaxy A26 5G 8GB 128GB', True),
+    ('Điện thoại AI Samsung Galaxy S24 Ultra 12GB/512GB, Camera 200MP Zoom 100x, S Pen- Xám- Hàng Chính Hãng',
+     'Điện thoại AI Samsung Galaxy S24 Ultra 12GB/512GB, Camera 200MP Zoom 100x, S Pen- Đen- Hàng Chính Hãng', True),
+    ('TECNO SPARK 30 5G 6GB 128GB',
+     'Điện thoại Tecno Spark 30 5G 6GB/128GB', True),
+    ('Điện thoại Samsung Galaxy A34 5G (8GB/256GB) - Đã kích hoạt bảo hành điện tử Hàng chính hãng',
+     'Điện thoại Samsung Galaxy A34 5G (8GB/256GB) - Đã kích hoạt bảo hành điện tử Hàng chính hãng', True),
+    ('Điện thoại Samsung Galaxy A34 5G (8GB/128GB) - Hàng chính hãng',
+     'Samsung Galaxy A34 5G 8GB 128GB', True),
+    ('Điện thoại Xiaomi Redmi 13C (4+128GB) | 6.74" 90Hz| Media Tek Helio G85| 5000mAh - Hàng chính hãng',
+     'Điện thoại Xiaomi Redmi 13C (4GB/128GB) - Hàng chính hãng - Bảo hành 18 tháng', True),
+    ('Điện thoại Xiaomi Redmi Note 14 5G 8GB/256GB',
+     'Xiaomi Redmi Note 14 5G 8GB 256GB', True),
+    ('Điện thoại Xiaomi Redmi Note 14 Pro 5G (8GB/256GB) - Hàng chính hãng',
+     'Điện thoại Xiaomi Redmi Note 14 Pro 5G 8GB/256GB', True),
+    ('Điện thoại iPhone 14 Plus 128GB',
+     'iPhone 14 Plus 128GB | Chính hãng VN/A', True),
+    # Khác product: cùng dòng máy nhưng khác RAM-ROM, hoặc model anh em (Plus, FE, F, 5G, A05 / A05s)
+    ('Điện thoại Meizu Mblu 21 4GB 64GB',
+     'Điện thoại Meizu Mblu 21 6GB 128GB', False),
+    ('Điện thoại iPhone 15 Pro Max 256GB',
+     'iPhone 15 Pro Max 1TB | Chính hãng VN/A', False),
+    ('Samsung Galaxy A06 4GB 128GB',
+     'Samsung Galaxy A06 4GB 64GB', False),
+    ('Samsung Galaxy A34 5G 8GB 128GB',
+     'Điện thoại Samsung Galaxy A34 5G (8GB/256GB) - Đã kích hoạt bảo hành điện tử Hàng chính hãng', False),
+    ('Xiaomi Redmi Note 12 8GB 128GB',
+     'Xiaomi Redmi Note 12 4GB 128GB', False),
+    ('Điện thoại iPhone 16e 128GB',
+     'iPhone 16e 256GB | Chính hãng VN/A', False),
+    ('Điện thoại Xiaomi Redmi Note 14 8GB/128GB',
+     'Điện thoại Xiaomi Redmi Note 14 (6GB/128GB) - Hàng chính hãng', False),
+    ('Samsung Galaxy Z Flip6 12GB 512GB',
+     'Samsung Galaxy Z Flip6 12GB 256GB', False),
+    ('realme C61 4GB 128GB',
+     'realme C61 6GB 128GB', False),
+    ('Điện thoại Realme Note 60 (4GB/128GB) - Hàng chính hãng',
+     'Điện thoại Realme Note 60 (4GB/64GB) - Hàng chính hãng', False),
+    ('Điện thoại iPhone 14 128GB',
+     'Điện thoại iPhone 14 Plus 128GB', False),
+    ('Điện thoại Samsung Galaxy A05s (4GB/128GB) - Hàng chính hãng',
+     'Điện thoại Samsung Galaxy A05 (4GB/128GB) - Hàng chính hãng', False),
+    ('Điện thoại Xiaomi Redmi Note 14 Pro 5G 8GB/256GB',
+     'Điện thoại Xiaomi Redmi Note 14 Pro 8GB/256GB', False),
+    ('Điện thoại OPPO Reno13 5G 12GB/256GB',
+     'OPPO Reno13 F 5G 12GB 256GB', False),
+    ('Samsung Galaxy S24 8GB 256GB',
+     'Điện thoại Samsung Galaxy S24 FE 5G 8GB/256GB', False),
+    ('iPhone 15 128GB | Chính hãng VN/A',
+     'iPhone 15 Plus 128GB | Chính hãng VN/A', False),
+]
+
+
+def labelled_pair_scores(names, labels, pairs=LABELLED_PAIRS):
+    """
+    Precision / recall của cụm dự đoán (labels, theo từng listing trong names) trên các cặp đã gán nhãn.
+    Một tên có thể xuất hiện ở nhiều listing: cặp được tính là "cùng cụm" khi mọi listing của 2 tên nằm
+    trong 1 cụm, là "khác cụm" khi không có listing nào chung cụm. Cặp có tên không còn trong names
+    bị bỏ qua. Trả về (precision, recall, số cặp dùng, các cặp sai)
+    """
+    clusters = {}
+    for name, label in zip(names, labels):
+        clusters.setdefault(name, set()).add(label)
+    true_positive = false_positive = false_negative = used = 0
+    errors = []
+    for name_a, name_b, same in pairs:
+        if name_a not in clusters or name_b not in clusters:
+            continue
+        used += 1
+        if same:
+            predicted = len(clusters[name_a] | clusters[name_b]) == 1
+        else:
+            predicted = bool(clusters[name_a] & clusters[name_b])
+        true_positive += predicted and same
+        false_positive += predicted and not same
+        false_negative += same and not predicted
+        if predicted != same:
+            errors.append((name_a, name_b, same))
+    precision = true_positive / (true_positive + false_positive) if true_positive + false_positive else 1.0
+    recall = true_positive / (true_positive + false_negative) if true_positive + false_negative else 1.0
+    return precision, recall, used, errors
+
+
+def run_benchmark(sizes=(10000, 100000, 200000), raw_path=RAW_DATA_PATH):
+    print(f"\n🧬 NEAR-DUPLICATE DETECTION (MinHash {NUM_PERM} perm, LSH {BANDS} band, threshold {THRESHOLD})")
+    # Listing giả lập dùng chính từ vựng của tokenizer: đo thêm trên cặp thật đã gán nhãn tay
+    if os.path.exists(raw_path):
+        names = pd.read_csv(raw_path, encoding='utf-8-sig')['Name'].tolist()
+        labels, stats = cluster_listings(names)
+        precision, recall, used, errors = labelled_pair_scores(names, labels)
+        print(f"   raw catalog {stats['listings']:,} listing -> {stats['clusters']:,} product  "
+              f"cặp gán nhãn {used}/{len(LABELLED_PAIRS)}  precision {precision:.3f} recall {recall:.3f}")
+        for name_a, name_b, same in errors:
+            print(f"      ❌ {'bỏ sót' if same else 'gộp nhầm'}: {name_a} || {name_b}")
+    for n_rows in sizes:
+        names, truth = synthetic_listings(n_rows)
+        labels, stats = cluster_listings(names)
+        precision, recall = pairwise_scores(labels, truth)
+        print(f"   {n_rows:>8,} listing  {stats['elapsed_s']:6.2f}s ({n_rows / stats['elapsed_s']:>9,.0f}/s: "
+              f"tokenize {stats['tokenize_s']:.2f}s, minhash {stats['minhash_s']:.2f}s, "
+              f"lsh+cluster {stats['lsh_cluster_s']:.2f}s)  ứng viên {stats['candidate_pairs']:,}  "
+              f"precision {precision:.3f} recall {recall:.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gom listing trùng / gần trùng, gán canonical_product_id")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--rows", type=int, nargs="*", default=[10000, 100000, 200000])
+    parser.add_argument("--input", default=RAW_DATA_PATH)
+    args = parser.parse_args(argv)
+    if args.benchmark:
+        run_benchmark(args.rows)
+        return
+
+    raw = pd.read_csv(args.input, encoding='utf-8-sig')
+    raw['product_id'] = (raw.index + 1).astype(str).str.zfill(3)
+    deduped, stats = assign_canonical_ids(raw)
+    print(f"📊 {stats['listings']} listing -> {stats['clusters']} product ({stats['elapsed_s']}s)")
+    groups = deduped[deduped['duplicate_group_size'] > 1].sort_values(['canonical_product_id', 'product_id'])
+    for canonical, group in list(groups.groupby('canonical_product_id'))[:10]:
+        print(f"   {canonical}: " + " | ".join(f"{n} [{s}]" for n, s in zip(group['Name'], group['data_source'])))
+
+
+if __name__ == "__main__":
+    main()
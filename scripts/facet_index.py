@@ -0,0 +1,262 @@
+import time
+import numpy as np
+import pandas as pd
+
+PROCESSED_PATH = "../my_phone_features/data/processed/phone_data_processed.parquet"
+
+# Facet -> (cột do MobilePhoneTransformer tạo ra, các giá trị / bins)
+FACETS = {
+    'price_segment': ('price_segment', [0, 1, 2]),
+    'has_telephoto': ('has_telephoto', [0, 1]),
+    'has_ultrawide': ('has_ultrawide', [0, 1]),
+    'has_ois': ('has_ois', [0, 1]),
+    'has_warranty': ('has_warranty', [0, 1]),
+    'num_cameras': ('num_cameras', [1, 2, 3, 4, 5]),
+    'screen_size': ('ScreenSize', ['<6.0', '6.0-6.5', '6.5-6.7', '>=6.7']),
+}
+
+SCREEN_SIZE_EDGES = [6.0, 6.5, 6.7]
+
+# Popcount cho từng byte (numpy 1.24 chưa có np.bitwise_count)
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(words):
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+    return int(_POPCOUNT8[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+def _bucket_codes(facet, values):
+    """Map giá trị cột -> vị trí trong FACETS[facet][1], -1 nếu ngoài danh sách"""
+    values = np.asarray(values, dtype=np.float64)
+    if facet == 'screen_size':
+        codes = np.digitize(values, SCREEN_SIZE_EDGES)
+        return np.where(np.isnan(values), -1, codes)
+
+    choices = np.array(FACETS[facet][1], dtype=np.float64)
+    codes = np.full(len(values), -1, dtype=np.int64)
+    for code, choice in enumerate(choices):
+        codes[values == choice] = code
+    return codes
+
+
+class FacetBitmapIndex:
+    """
+    Bitmap index for catalog faceting.
+
+    Mỗi (facet, value) là một bitmap uint64 (1 bit / row). Filter = OR các value
+    trong cùng facet rồi AND giữa các facet, facet count = popcount(filter AND bitmap).
+    Rows được cập nhật tăng dần bằng cách clear bit ở bucket cũ và set bit ở bucket mới.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = 0
+        self.n_rows = 0
+        self.product_ids = []
+        self.row_index = {}
+        self.alive = np.zeros(0, dtype=np.uint64)
+        self.bitmaps = {facet: [np.zeros(0, dtype=np.uint64) for _ in values]
+                        for facet, (_, values) in FACETS.items()}
+        # Bucket hiện tại của mỗi row, để update biết bit nào cần clear
+        self.row_codes = {facet: np.zeros(0, dtype=np.int64) for facet in FACETS}
+        self._grow(capacity)
+
+    @classmethod
+    def from_frame(cls, catalog):
+        index = cls(capacity=max(len(catalog), 1024))
+        index.upsert(catalog)
+        return index
+
+    @classmethod
+    def from_parquet(cls, path=PROCESSED_PATH):
+        catalog = pd.read_parquet(path)
+        catalog = catalog.sort_values('event_timestamp').drop_duplicates('product_id', keep='last')
+        return cls.from_frame(catalog)
+
+    # ==================== STORAGE ====================
+
+    def _grow(self, min_capacity):
+        if min_capacity <= self.capacity:
+            return
+        new_capacity = max(min_capacity, self.capacity * 2)
+        n_words = (new_capacity + 63) // 64
+        extra_words = n_words - len(self.alive)
+
+        self.alive = np.concatenate([self.alive, np.zeros(extra_words, dtype=np.uint64)])
+        for facet in FACETS:
+            self.bitmaps[facet] = [np.concatenate([bitmap, np.zeros(extra_words, dtype=np.uint64)])
+                                   for bitmap in self.bitmaps[facet]]
+            self.row_codes[facet] = np.concatenate([
+                self.row_codes[facet], np.full(new_capacity - self.capacity, -1, dtype=np.int64)])
+        self.capacity = new_capacity
+
+    @staticmethod
+    def _bits(rows):
+        return rows >> 6, np.left_shift(np.uint64(1), (rows & 63).astype(np.uint64))
+
+    def _set_bits(self, bitmap, rows):
+        words, masks = self._bits(rows)
+        np.bitwise_or.at(bitmap, words, masks)
+
+    def _clear_bits(self, bitmap, rows):
+        words, masks = self._bits(rows)
+        np.bitwise_and.at(bitmap, words, ~masks)
+
+    # ==================== UPDATE ====================
+
+    def upsert(self, rows_df):
+        """Thêm mới hoặc cập nhật các rows (theo product_id)"""
+        # product_id lặp lại trong cùng batch: giữ bản ghi sau (giống semantics của online store),
+        # nếu không 2 dòng cùng row sẽ set bit ở cả 2 bucket
+        rows_df = rows_df.drop_duplicates('product_id', keep='last')
+        product_ids = rows_df['product_id'].tolist()
+
+        rows = np.empty(len(product_ids), dtype=np.int64)
+        for i, pid in enumerate(product_ids):
+            row = self.row_index.get(pid)
+            if row is None:
+                row = self.n_rows
+                self.row_index[pid] = row
+                self.product_ids.append(pid)
+                self.n_rows += 1
+            rows[i] = row
+        self._grow(self.n_rows)
+
+        for facet, (column, values) in FACETS.items():
+            if column not in rows_df.columns:
+                continue
+            new_codes = _bucket_codes(facet, rows_df[column].to_numpy())
+            old_codes = self.row_codes[facet][rows]
+
+            changed = new_codes != old_codes
+            for code in range(len(values)):
+                self._clear_bits(self.bitmaps[facet][code], rows[changed & (old_codes == code)])
+                self._set_bits(self.bitmaps[facet][code], rows[changed & (new_codes == code)])
+            self.row_codes[facet][rows] = new_codes
+
+        self._set_bits(self.alive, rows)
+        return self
+
+    def remove(self, product_ids):
+        rows = np.array([self.row_index[pid] for pid in product_ids if pid in self.row_index], dtype=np.int64)
+        self._clear_bits(self.alive, rows)
+        return self
+
+    # ==================== QUERY ====================
+
+    def _facet_bitmap(self, facet, selected_values):
+        values = FACETS[facet][1]
+        result = np.zeros_like(self.alive)
+        for value in selected_values:
+            # Value không có trong FACETS (vd. num_cameras=6) không khớp row nào
+            if value in values:
+                result |= self.bitmaps[facet][values.index(value)]
+        return result
+
+    def filter_bitmap(self, selection, exclude_facet=None):
+        """AND giữa các facet, OR giữa các value trong cùng facet"""
+        result = self.alive.copy()
+        for facet, selected_values in selection.items():
+            if facet == exclude_facet or not selected_values:
+                continue
+            result &= self._facet_bitmap(facet, selected_values)
+        return result
+
+    def count(self, selection):
+        return _popcount(self.filter_bitmap(selection))
+
+    def matching_product_ids(self, selection):
+        bits = np.unpackbits(self.filter_bitmap(selection).view(np.uint8), bitorder='little')
+        rows = np.flatnonzero(bits[:self.n_rows])
+        return [self.product_ids[row] for row in rows]
+
+    def facet_counts(self, selection):
+        """
+        Live counts cho mọi facet value dưới filter hiện tại.
+
+        Count của một facet bỏ qua filter của chính facet đó, để UI hiển thị
+        được số lượng khi chọn thêm value khác trong cùng facet.
+        """
+        counts = {}
+        base = None
+        for facet, (_, values) in FACETS.items():
+            if selection.get(facet):
+                facet_filter = self.filter_bitmap(selection, exclude_facet=facet)
+            else:
+                if base is None:
+                    base = self.filter_bitmap(selection)
+                facet_filter = base
+            counts[facet] = {value: _popcount(facet_filter & self.bitmaps[facet][code])
+                             for code, value in enumerate(values)}
+        return {'total': self.count(selection), 'facets': counts}
+
+
+def _pandas_facet_counts(catalog, selection):
+    """Baseline: boolean masks trên DataFrame"""
+    screen_codes = _bucket_codes('screen_size', catalog['ScreenSize'].to_numpy())
+    masks = {}
+    for facet, selected_values in selection.items():
+        column, values = FACETS[facet]
+        if facet == 'screen_size':
+            masks[facet] = np.isin(screen_codes, [values.index(v) for v in selected_values if v in values])
+        else:
+            masks[facet] = catalog[column].isin(selected_values).to_numpy()
+
+    counts = {}
+    for facet, (column, values) in FACETS.items():
+        mask = np.ones(len(catalog), dtype=bool)
+        for other, other_mask in masks.items():
+            if other != facet:
+                mask &= other_mask
+        if facet == 'screen_size':
+            counts[facet] = {v: int((mask & (screen_codes == code)).sum()) for code, v in enumerate(values)}
+        else:
+            counts[facet] = {v: int((mask & (catalog[column] == v).to_numpy()).sum()) for v in values}
+    return counts
+
+
+def run_benchmark(sizes=(2000, 200000, 2000000), n_queries=20):
+    from recommendation_engine import make_synthetic_catalog
+
+    selection = {'price_segment': [0, 1], 'has_ultrawide': [1], 'has_ois': [1], 'screen_size': ['6.5-6.7', '>=6.7']}
+
+    print(f"\n📊 FACET COUNTS LATENCY (ms, median of {n_queries})")
+    print(f"   {'rows':>9} {'build (s)':>10} {'bitmap':>9} {'pandas':>9} {'update 1k rows':>15}")
+    for n_rows in sizes:
+        catalog = make_synthetic_catalog(n_rows)
+
+        start = time.perf_counter()
+        index = FacetBitmapIndex.from_frame(catalog)
+        build_time = time.perf_counter() - start
+
+        bitmap_times, pandas_times = [], []
+        for _ in range(n_queries):
+            start = time.perf_counter()
+            result = index.facet_counts(selection)
+            bitmap_times.append(time.perf_counter() - start)
+        for _ in range(max(n_queries // 4, 3)):
+            start = time.perf_counter()
+            expected = _pandas_facet_counts(catalog, selection)
+            pandas_times.append(time.perf_counter() - start)
+        assert result['facets'] == expected
+
+        changed = catalog.sample(1000, random_state=1).copy()
+        changed['has_ois'] = 1 - changed['has_ois']
+        start = time.perf_counter()
+        index.upsert(changed)
+        update_time = time.perf_counter() - start
+
+        print(f"   {n_rows:>9,} {build_time:>10.2f} {np.median(bitmap_times) * 1000:>9.3f} "
+              f"{np.median(pandas_times) * 1000:>9.3f} {update_time * 1000:>14.3f}")
+
+
+if __name__ == "__main__":
+    index = FacetBitmapIndex.from_parquet()
+    selection = {'price_segment': [0, 1], 'has_ois': [1]}
+    result = index.facet_counts(selection)
+    print(f"🔎 Filter {selection}: {result['total']} phones")
+    for facet, counts in result['facets'].items():
+        print(f"   {facet:14}: {counts}")
+
+    run_benchmark()
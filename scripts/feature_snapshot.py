@@ -0,0 +1,236 @@
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# 5 feature views (giống my_phone_features/features/phone_features.py)
+FEATURE_VIEWS = {
+    "phone_display": ["ScreenSize", "Res_Width", "Res_Height", "PPI", "total_resolution"],
+    "phone_camera": ["main_camera_mp", "num_cameras", "has_telephoto", "has_ultrawide",
+                     "has_ois", "camera_feature_count", "camera_score"],
+    "phone_product": ["NumberOfReview", "has_warranty"],
+    "phone_ratings": ["camera_rating", "display_score", "popularity_score", "overall_score"],
+    "phone_value": ["value_score", "is_premium", "price_segment"],
+}
+
+ALL_FEATURE_REFS = [f"{view}:{feature}" for view, features in FEATURE_VIEWS.items() for feature in features]
+
+
+class _SnapshotState:
+    """Immutable snapshot: một mảng (n_products x n_features) + hash map product_id -> row"""
+    __slots__ = ("values", "labels", "row_index", "column_index", "loaded_at")
+
+    def __init__(self, values, labels, row_index, column_index):
+        self.values = values
+        self.labels = labels
+        self.row_index = row_index
+        self.column_index = column_index
+        self.loaded_at = time.time()
+
+
+class FeatureSnapshot:
+    """
+    In-memory snapshot of the whole online store.
+
+    All features of the 5 feature views are kept in one contiguous float64 array,
+    so a lookup is a dict hit + a single array index. refresh() builds a new state
+    and swaps it in with one reference assignment, readers never see a half-built snapshot.
+    """
+
+    def __init__(self, fs=None, repo_path="../my_phone_features", feature_refs=None,
+                 processed_path=None, source="online", label_refs=None):
+        self.repo_path = repo_path
+        self.fs = fs
+        self.feature_refs = list(feature_refs or ALL_FEATURE_REFS)
+        self.feature_names = [ref.split(":", 1)[1] for ref in self.feature_refs]
+        # Features dạng string (vd. model_version) không đưa vào mảng số
+        self.label_refs = list(label_refs or [])
+        self.label_names = [ref.split(":", 1)[1] for ref in self.label_refs]
+        self.processed_path = processed_path or os.path.join(
+            repo_path, "data", "processed", "phone_data_processed.parquet")
+        # "online": đọc từ online store (sau materialize), "offline": đọc thẳng file parquet
+        self.source = source
+
+        self._state = None
+        self._column_cache = {}
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+        self._stop_event = threading.Event()
+        # Version của nguồn lúc build snapshot hiện tại (refresh thread so sánh với giá trị này)
+        self._loaded_version = None
+
+        self.refresh()
+
+    # ==================== LOADING ====================
+
+    def _feature_store(self):
+        if self.fs is None:
+            from feast import FeatureStore
+            self.fs = FeatureStore(repo_path=self.repo_path)
+        return self.fs
+
+    def _load_online(self, product_ids):
+        feature_data = self._feature_store().get_online_features(
+            entity_rows=[{"product_id": pid} for pid in product_ids],
+            features=self.feature_refs + self.label_refs
+        ).to_df()
+        return feature_data
+
+    def _load_offline(self):
+        data = pd.read_parquet(self.processed_path)
+        # Giữ bản ghi mới nhất của mỗi product_id (giống semantics của online store)
+        if 'event_timestamp' in data.columns:
+            data = data.sort_values('event_timestamp')
+        return data.drop_duplicates('product_id', keep='last')
+
+    def _build_state(self):
+        if self.source == "offline":
+            feature_data = self._load_offline()
+        else:
+            product_ids = pd.read_parquet(self.processed_path, columns=['product_id'])['product_id']
+            feature_data = self._load_online(product_ids.drop_duplicates().tolist())
+
+        values = feature_data[self.feature_names].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        # Bỏ các product chưa được materialize (tất cả features đều null)
+        materialized = ~np.isnan(values).all(axis=1)
+        values = np.ascontiguousarray(values[materialized])
+        values.setflags(write=False)
+
+        product_ids = feature_data['product_id'].to_numpy()[materialized]
+        row_index = {pid: row for row, pid in enumerate(product_ids)}
+        column_index = {name: col for col, name in enumerate(self.feature_names)}
+        labels = {name: feature_data[name].to_numpy(dtype=object)[materialized] for name in self.label_names}
+
+        return _SnapshotState(values, labels, row_index, column_index)
+
+    def refresh(self):
+        """Load lại toàn bộ catalog và swap atomically"""
+        with self._refresh_lock:
+            start = time.perf_counter()
+            version = self._watched_version()
+            state = self._build_state()
+            self._state = state
+            self._loaded_version = version
+            elapsed = (time.perf_counter() - start) * 1000
+        print(f"📦 Feature snapshot loaded: {state.values.shape[0]} phones x "
+              f"{state.values.shape[1]} features ({elapsed:.1f} ms)")
+        return self
+
+    # ==================== LOOKUP ====================
+
+    def _columns_for(self, features):
+        key = tuple(features)
+        columns = self._column_cache.get(key)
+        if columns is None:
+            columns = np.array([self._state.column_index[f] for f in features], dtype=np.intp)
+            self._column_cache[key] = columns
+        return columns
+
+    def __contains__(self, product_id):
+        return product_id in self._state.row_index
+
+    def __len__(self):
+        return len(self._state.row_index)
+
+    def get_row(self, product_id):
+        """Toàn bộ features của một product (read-only view), None nếu không có"""
+        state = self._state
+        row = state.row_index.get(product_id)
+        if row is None:
+            return None
+        return state.values[row]
+
+    def get_features(self, product_id, features):
+        """Trả về DataFrame 1 dòng với đúng thứ tự features, None nếu không có"""
+        state = self._state
+        row = state.row_index.get(product_id)
+        if row is None:
+            return None
+        values = state.values[row, self._columns_for(features)]
+        return pd.DataFrame(values[np.newaxis, :], columns=features)
+
+    def get_label(self, product_id, name):
+        state = self._state
+        row = state.row_index.get(product_id)
+        if row is None:
+            return None
+        return state.labels[name][row]
+
+    @property
+    def loaded_at(self):
+        return self._state.loaded_at
+
+    # ==================== BACKGROUND REFRESH ====================
+
+    def _watched_version(self):
+        """
+        Giá trị đổi mỗi khi nguồn có dữ liệu mới: offline mode theo dõi mtime file parquet, online
+        store có version_token (MmapOnlineStore: CURRENT của từng view) thì hỏi store, còn lại
+        (sqlite) theo dõi mtime file của online store trong feature_store.yaml
+        """
+        if self.source == "offline":
+            watched = self.processed_path
+        else:
+            fs = self._feature_store()
+            online_store = fs._get_provider().online_store
+            if hasattr(online_store, "version_token"):
+                return online_store.version_token(fs.config)
+            watched = fs.config.online_store.path
+            if not os.path.isabs(watched):
+                watched = os.path.join(self.repo_path, watched)
+        try:
+            return os.path.getmtime(watched)
+        except OSError:
+            return None
+
+    def start_background_refresh(self, interval=30.0):
+        """Poll online store và refresh snapshot khi có materialization mới"""
+        if self._refresh_thread is not None:
+            return self
+
+        self._stop_event.clear()
+
+        def _loop():
+            # So với version lúc build (không phải lúc start thread): snapshot build trước fork
+            # vẫn được refresh nếu có materialization giữa lúc build và lúc worker start thread
+            while not self._stop_event.wait(interval):
+                try:
+                    version = self._watched_version()
+                except Exception as e:
+                    print(f"❌ Snapshot version check failed: {e}")
+                    continue
+                if version is None or version == self._loaded_version:
+                    continue
+                try:
+                    self.refresh()
+                except Exception as e:
+                    # Giữ snapshot cũ nếu refresh lỗi
+                    print(f"❌ Snapshot refresh failed: {e}")
+
+        self._refresh_thread = threading.Thread(target=_loop, name="feature-snapshot-refresh", daemon=True)
+        self._refresh_thread.start()
+        return self
+
+    def stop_background_refresh(self):
+        self._stop_event.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+            self._refresh_thread = None
+
+
+if __name__ == "__main__":
+    snapshot = FeatureSnapshot(source="offline")
+
+    test_phones = ["001", "050", "100"]
+    for phone_id in test_phones:
+        row = snapshot.get_features(phone_id, ["overall_score", "camera_rating", "price_segment"])
+        print(f"   Phone {phone_id}: {row.to_dict('records') if row is not None else 'N/A'}")
+
+    n_lookups = 100000
+    start = time.perf_counter()
+    for i in range(n_lookups):
+        snapshot.get_row(test_phones[i % 3])
+    elapsed = time.perf_counter() - start
+    print(f"⚡ {n_lookups} lookups: {elapsed * 1e6 / n_lookups:.2f} µs/lookup")
@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+class InferenceTimeout(TimeoutError):
+    pass
+
+
+class InferenceRejected(RuntimeError):
+    """Pool đã đầy (quá max_pending request đang chờ)"""
+    pass
+
+
+class InferenceCancelled(RuntimeError):
+    """Request bị thay thế bởi request mới hơn của cùng session"""
+    pass
+
+
+class InferencePool:
+    """
+    Bounded thread pool cho model inference.
+
+    max_workers: số inference chạy song song (mặc định = số CPU), tránh việc
+    hàng chục handler thread cùng tranh GIL. max_pending: số request tối đa
+    đang chờ + đang chạy, vượt quá thì reject ngay thay vì xếp hàng vô hạn.
+    timeout: thời gian tối đa chờ kết quả của một request.
+    Mỗi session chỉ giữ request mới nhất: request cũ chưa chạy bị cancel,
+    request cũ đang chạy thì kết quả bị bỏ. session là khoá hashable bất kỳ, vd.
+    (session_hash, handler) để các handler khác nhau của cùng user không cancel nhau.
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, timeout=10.0):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 8
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._latest = {}
+        self.stats = {'completed': 0, 'timeouts': 0, 'rejected': 0, 'cancelled': 0}
+
+    @classmethod
+    def from_env(cls):
+        """PHONE_INFERENCE_WORKERS, PHONE_INFERENCE_MAX_PENDING, PHONE_INFERENCE_TIMEOUT (giây)"""
+        return cls(
+            max_workers=env_int("PHONE_INFERENCE_WORKERS", None),
+            max_pending=env_int("PHONE_INFERENCE_MAX_PENDING", None),
+            timeout=env_float("PHONE_INFERENCE_TIMEOUT", 10.0)
+        )
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def run(self, fn, *args, session=None, timeout=None, **kwargs):
+        """Chạy fn trong pool và chờ kết quả (raise InferenceTimeout / Rejected / Cancelled)"""
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise InferenceRejected(f"Server đang quá tải ({self.max_pending} request đang chờ)")
+
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Slot được trả khi task thật sự kết thúc (xong / lỗi / bị cancel trước khi chạy), không phải
+        # khi caller hết chờ: task timeout vẫn đang chạy tiếp chiếm 1 worker nên vẫn tính vào max_pending
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            with self._lock:
+                stale = self._latest.get(session) if session is not None else None
+                if session is not None:
+                    self._latest[session] = future
+            # Request cũ của cùng session chưa chạy -> bỏ khỏi hàng đợi
+            if stale is not None and stale.cancel():
+                self._count('cancelled')
+
+            timeout = timeout if timeout is not None else self.timeout
+            try:
+                result = future.result(timeout=timeout)
+            except CancelledError:
+                raise InferenceCancelled("Request đã được thay bằng request mới hơn")
+            except FutureTimeoutError:
+                # Chỉ bỏ được task chưa chạy, task đang chạy vẫn giữ slot tới khi xong
+                future.cancel()
+                self._count('timeouts')
+                raise InferenceTimeout(f"Inference quá {timeout}s")
+
+            # Session đã gửi request mới trong lúc request này chạy -> kết quả không còn cần
+            if session is not None and self._latest.get(session) is not future:
+                self._count('cancelled')
+                raise InferenceCancelled("Request đã được thay bằng request mới hơn")
+
+            self._count('completed')
+            return result
+        finally:
+            if session is not None:
+                with self._lock:
+                    if self._latest.get(session) is future:
+                        del self._latest[session]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _manual_prediction(registry, row):
+    """1 prediction giống predict_from_features của web app (3 models, 1 dòng)"""
+    from model_reloader import SERVICE_FEATURES
+    results = {}
+    for service, features in SERVICE_FEATURES.items():
+        model, scaler = registry.get(service)
+        results[service] = model.predict(scaler.transform(row[features]))[0]
+    return results
+
+
+def run_benchmark(sessions_list=(1, 10, 50), duration=5.0):
+    """Throughput / latency khi N session gửi request liên tục: gọi thẳng trong handler thread vs qua pool"""
+    import numpy as np
+    from model_registry import ModelRegistry
+    from model_reloader import load_validation_sample
+
+    registry = ModelRegistry()
+    sample = load_validation_sample(n_rows=1)
+    _manual_prediction(registry, sample)
+
+    def load(n_sessions, call):
+        latencies, errors = [], [0]
+        stop = time.perf_counter() + duration
+
+        def session_loop(session_id):
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                try:
+                    call(session_id)
+                    latencies.append(time.perf_counter() - start)
+                except Exception:
+                    # Bị reject / timeout: client chờ một chút rồi gửi lại
+                    errors[0] += 1
+                    time.sleep(0.05)
+
+        threads = [threading.Thread(target=session_loop, args=(i,)) for i in range(n_sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        values = np.array(latencies) * 1000
+        return len(values) / duration, np.percentile(values, 50), np.percentile(values, 99), errors[0]
+
+    pool = InferencePool.from_env()
+    modes = {
+        'direct': lambda session_id: _manual_prediction(registry, sample),
+        'pool': lambda session_id: pool.run(_manual_prediction, registry, sample, session=session_id),
+    }
+
+    print(f"\n📊 CONCURRENT SESSIONS ({duration:.0f}s each, pool workers={pool.max_workers})")
+    print(f"   {'sessions':>8} {'mode':>7} {'req/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'errors':>7}")
+    for n_sessions in sessions_list:
+        for mode, call in modes.items():
+            throughput, p50, p99, errors = load(n_sessions, call)
+            print(f"   {n_sessions:>8} {mode:>7} {throughput:>8.1f} {p50:>9.2f} {p99:>9.2f} {errors:>7}")
+    print(f"   pool stats: {pool.stats}")
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    run_benchmark()
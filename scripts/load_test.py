@@ -0,0 +1,292 @@
+"""
+Load generator cho các prediction path.
+
+    python load_test.py --target multi --concurrency 10 --duration 30
+    python load_test.py --target phone --rate 50 --duration 30 --output results.json
+    python load_test.py --target http --url http://localhost:7855 --concurrency 4
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+PROCESSED_PATH = "../my_phone_features/data/processed/phone_data_processed.parquet"
+WEB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "web")
+
+MANUAL_FEATURES = [
+    'ScreenSize', 'PPI', 'total_resolution', 'camera_score', 'main_camera_mp', 'num_cameras',
+    'camera_feature_count', 'has_telephoto', 'has_ultrawide', 'has_ois', 'popularity_score',
+    'overall_score', 'display_score', 'camera_rating', 'value_score', 'price_segment',
+    'is_premium', 'has_warranty', 'NumberOfReview'
+]
+SERVICES = ["recommender", "value_detector", "camera_predictor"]
+
+
+class Workload:
+    """
+    Sinh request giống traffic thật: product_id theo phân phối Zipf (vài phone hot
+    chiếm phần lớn traffic), một tỉ lệ cold miss (product chưa có trong store),
+    và một tỉ lệ request nhập thông số thủ công.
+    """
+
+    def __init__(self, processed_path=PROCESSED_PATH, zipf_s=1.1, cold_ratio=0.05, manual_ratio=0.2, seed=42):
+        import pandas as pd
+
+        catalog = pd.read_parquet(processed_path)
+        catalog = catalog.sort_values('event_timestamp').drop_duplicates('product_id', keep='last')
+        self.product_ids = catalog['product_id'].tolist()
+        self.manual_rows = catalog[MANUAL_FEATURES].fillna(0).to_dict('records')
+        self.cold_ratio = cold_ratio
+        self.manual_ratio = manual_ratio
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+        # Thứ tự hot ngẫu nhiên, p(rank) ~ 1 / rank^s
+        ranks = np.arange(1, len(self.product_ids) + 1)
+        weights = 1.0 / ranks ** zipf_s
+        self._cdf = np.cumsum(weights / weights.sum())
+        self._rng.shuffle(self.product_ids)
+
+    def next_request(self):
+        with self._lock:
+            u = self._rng.random()
+            if u < self.manual_ratio:
+                row = dict(self.manual_rows[self._rng.integers(len(self.manual_rows))])
+                # Người dùng thường chỉnh nhẹ thông số của một máy có sẵn
+                row['main_camera_mp'] = float(row['main_camera_mp']) * self._rng.uniform(0.8, 1.2)
+                return 'manual', row
+            if u < self.manual_ratio + self.cold_ratio:
+                return 'cold', f"cold-{self._rng.integers(10 ** 9)}"
+            index = int(np.searchsorted(self._cdf, self._rng.random()))
+            return 'hot', self.product_ids[min(index, len(self.product_ids) - 1)]
+
+
+# ==================== TARGETS ====================
+
+def _is_error(result):
+    return isinstance(result, dict) and result.get('status') == 'error'
+
+
+def make_target(name, url=None):
+    """Trả về hàm call(kind, payload) -> True nếu thành công"""
+    if name == 'phone':
+        from predict_service import PhonePredictor
+        predictor = PhonePredictor(warm_up=True)
+        manual = _manual_target()
+
+        def call(kind, payload):
+            if kind == 'manual':
+                return manual(payload)
+            return not _is_error(predictor.predict_phone_score(payload))
+        return call
+
+    if name == 'multi':
+        from predict_service import MultiModelPredictor
+        predictor = MultiModelPredictor(use_snapshot=True, warm_up=True)
+        manual = _manual_target()
+
+        def call(kind, payload):
+            if kind == 'manual':
+                return manual(payload)
+            return not _is_error(predictor.predict_all(payload))
+        return call
+
+    if name == 'manual':
+        manual = _manual_target()
+
+        def call(kind, payload):
+            _require_manual(name, kind)
+            return manual(payload)
+        return call
+
+    if name == 'http':
+        return _http_target(url)
+
+    raise ValueError(f"Unknown target: {name}")
+
+
+# Target chỉ có đường nhập thông số thủ công: không có khái niệm product hot / cold
+MANUAL_ONLY_TARGETS = ('manual', 'http')
+
+
+def _require_manual(target, kind):
+    if kind != 'manual':
+        raise ValueError(f"Target {target} chỉ nhận request manual, không có {kind}")
+
+
+def _manual_target():
+    """predict_from_features của web app (in-process)"""
+    if WEB_DIR not in sys.path:
+        sys.path.append(WEB_DIR)
+    from gradio_app import MultiModelPredictor as WebPredictor
+    predictor = WebPredictor().warm_up()
+
+    def call(payload):
+        return not _is_error(predictor.predict_from_features(SERVICES, payload))
+    return call
+
+
+def _http_target(url):
+    """Gọi Gradio server qua gradio_client, mỗi thread một client"""
+    from gradio_client import Client
+
+    local = threading.local()
+
+    def call(kind, payload):
+        # Server chỉ có endpoint nhập thủ công
+        _require_manual('http', kind)
+        if not hasattr(local, 'client'):
+            local.client = Client(url, verbose=False)
+        args = [SERVICES] + [payload[feature] for feature in MANUAL_FEATURES]
+        result = local.client.predict(*args, api_name="/handle_expert_prediction")
+        status = result[3] if isinstance(result, (list, tuple)) and len(result) > 3 else ""
+        return str(status).startswith("✅")
+    return call
+
+
+# ==================== RUNNER ====================
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {'hot': [], 'cold': [], 'manual': []}
+        self.errors = {'hot': 0, 'cold': 0, 'manual': 0}
+
+    def record(self, kind, latency, ok):
+        with self._lock:
+            self.latencies[kind].append(latency)
+            if not ok:
+                self.errors[kind] += 1
+
+
+def _execute(call, kind, payload, recorder, scheduled_at):
+    try:
+        ok = call(kind, payload)
+    except Exception:
+        ok = False
+    # Latency tính từ thời điểm request đáng lẽ được gửi (tránh coordinated omission ở rate mode)
+    recorder.record(kind, time.perf_counter() - scheduled_at, ok)
+
+
+def run_concurrency(call, workload, concurrency, duration):
+    """Closed loop: N client, mỗi client gửi request tiếp theo ngay khi xong request trước"""
+    recorder = Recorder()
+    stop = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < stop:
+            kind, payload = workload.next_request()
+            _execute(call, kind, payload, recorder, time.perf_counter())
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder
+
+
+def run_rate(call, workload, rate, duration, max_workers=64):
+    """Open loop: gửi đều rate request/s bất kể server trả lời nhanh hay chậm"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    recorder = Recorder()
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for i in range(int(rate * duration)):
+            scheduled_at = start + i * interval
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            kind, payload = workload.next_request()
+            executor.submit(_execute, call, kind, payload, recorder, scheduled_at)
+    return recorder
+
+
+def _latency_summary(values):
+    if not values:
+        return None
+    values = np.asarray(values) * 1000
+    return {
+        'p50': round(float(np.percentile(values, 50)), 2),
+        'p95': round(float(np.percentile(values, 95)), 2),
+        'p99': round(float(np.percentile(values, 99)), 2),
+        'mean': round(float(values.mean()), 2),
+        'max': round(float(values.max()), 2),
+    }
+
+
+def build_report(recorder, args, elapsed):
+    all_latencies = [v for values in recorder.latencies.values() for v in values]
+    total = len(all_latencies)
+    total_errors = sum(recorder.errors.values())
+    return {
+        'target': args.target,
+        'mode': 'rate' if args.rate else 'concurrency',
+        'rate': args.rate,
+        'concurrency': None if args.rate else args.concurrency,
+        'duration_s': round(elapsed, 2),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2) if elapsed > 0 else 0,
+        'error_rate': round(total_errors / total, 4) if total else 0,
+        'latency_ms': _latency_summary(all_latencies),
+        'by_kind': {
+            kind: {
+                'requests': len(values),
+                'error_rate': round(recorder.errors[kind] / len(values), 4) if values else 0,
+                'latency_ms': _latency_summary(values),
+            }
+            for kind, values in recorder.latencies.items()
+        },
+        'workload': {'zipf_s': args.zipf_s, 'cold_ratio': args.cold_ratio, 'manual_ratio': args.manual_ratio},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test cho prediction service")
+    parser.add_argument("--target", choices=["phone", "multi", "manual", "http"], default="multi")
+    parser.add_argument("--url", default="http://localhost:7855", help="Gradio server (target=http)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Số client song song (closed loop)")
+    parser.add_argument("--rate", type=float, default=None, help="Request/s cố định (open loop), bỏ qua --concurrency")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--zipf-s", type=float, default=1.1)
+    parser.add_argument("--cold-ratio", type=float, default=None, help="Mặc định 0.05 (manual / http: 0)")
+    parser.add_argument("--manual-ratio", type=float, default=None, help="Mặc định 0.2 (manual / http: 1)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Ghi report JSON ra file")
+    args = parser.parse_args(argv)
+
+    if args.target in MANUAL_ONLY_TARGETS:
+        # Không thay request product_id bằng 1 dòng thủ công rồi ghi vào hot / cold: số liệu giả
+        if (args.cold_ratio or 0) > 0 or (args.manual_ratio is not None and args.manual_ratio < 1):
+            parser.error(f"--target {args.target} chỉ chạy workload manual (--manual-ratio 1 --cold-ratio 0)")
+        args.manual_ratio, args.cold_ratio = 1.0, 0.0
+    else:
+        args.cold_ratio = 0.05 if args.cold_ratio is None else args.cold_ratio
+        args.manual_ratio = 0.2 if args.manual_ratio is None else args.manual_ratio
+
+    workload = Workload(zipf_s=args.zipf_s, cold_ratio=args.cold_ratio,
+                        manual_ratio=args.manual_ratio, seed=args.seed)
+    call = make_target(args.target, args.url)
+
+    start = time.perf_counter()
+    if args.rate:
+        recorder = run_rate(call, workload, args.rate, args.duration)
+    else:
+        recorder = run_concurrency(call, workload, args.concurrency, args.duration)
+    report = build_report(recorder, args, time.perf_counter() - start)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Materialize incremental: chỉ ghi vào online store các (view, product) có giá trị feature
+thay đổi so với lần materialize trước.
+
+`feast materialize` ghi lại mọi dòng của mọi view, và create_feast_processed_data random lại
+event_timestamp mỗi lần chạy nên theo timestamp thì dòng nào cũng "mới". Driver này so sánh
+hash của giá trị feature (bỏ qua timestamp) theo từng view + product với state file.
+
+    python materialize_incremental.py                       # các view lấy từ processed parquet
+    python materialize_incremental.py --dry-run             # chỉ đếm, không ghi
+    python materialize_incremental.py --full                # ghi lại tất cả và reset state
+    python materialize_incremental.py --source ../my_phone_features/data/processed/phone_predictions.parquet
+
+Product có trong state nhưng không còn trong source (bị gỡ khỏi catalog) được xóa khỏi online store
+của mọi view đã chọn (SQLite và MmapOnlineStore). Online store khác không có API xóa: in cảnh báo và
+giữ product trong state để lần chạy sau báo lại.
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+
+FEAST_REPO_PATH = "../my_phone_features"
+PROCESSED_PATH = "../my_phone_features/data/processed/phone_data_processed.parquet"
+STATE_DIR = "../my_phone_features/data/materialize_state"
+BATCH_SIZE = 5000
+
+
+def _view_source_path(feature_view):
+    source = feature_view.batch_source
+    return getattr(source, "path", None)
+
+
+def row_hashes(frame, features):
+    """uint64 hash giá trị feature của từng dòng (NaN được hash ổn định)"""
+    return pd.util.hash_pandas_object(frame[features], index=False).to_numpy()
+
+
+class IncrementalMaterializer:
+    """
+    State của mỗi source là 1 file parquet (product_id + 1 cột hash / view), lưu ở STATE_DIR.
+    State chỉ được cập nhật cho view đã ghi thành công, lỗi giữa chừng thì lần chạy sau
+    ghi lại phần còn thiếu.
+    """
+
+    def __init__(self, repo_path=FEAST_REPO_PATH, source_path=PROCESSED_PATH, state_dir=STATE_DIR,
+                 batch_size=BATCH_SIZE, fs=None):
+        self.repo_path = repo_path
+        self.source_path = source_path
+        self.state_path = os.path.join(state_dir, os.path.splitext(os.path.basename(source_path))[0] + ".state.parquet")
+        self.batch_size = batch_size
+        self._fs = fs
+
+    @property
+    def fs(self):
+        if self._fs is None:
+            from feast import FeatureStore
+            self._fs = FeatureStore(repo_path=self.repo_path)
+        return self._fs
+
+    def views_for_source(self, frame, views=None):
+        """Feature view lấy dữ liệu từ source này (theo FileSource.path), hoặc danh sách chỉ định"""
+        source_name = os.path.basename(self.source_path)
+        selected = []
+        for feature_view in self.fs.list_feature_views():
+            if views is not None:
+                if feature_view.name not in views:
+                    continue
+            elif os.path.basename(_view_source_path(feature_view) or "") != source_name:
+                continue
+            features = [field.name for field in feature_view.features]
+            missing = [f for f in features if f not in frame.columns]
+            if missing:
+                raise ValueError(f"{feature_view.name}: source thiếu cột {missing}")
+            selected.append((feature_view, features))
+        return selected
+
+    def load_state(self):
+        if not os.path.exists(self.state_path):
+            return None
+        return pd.read_parquet(self.state_path).set_index('product_id')
+
+    def save_state(self, state):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        state.reset_index().to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.state_path)
+
+    def _delete(self, feature_view, product_ids):
+        """Xóa entity khỏi online store, trả về số dòng đã xóa hoặc None nếu online store không hỗ trợ"""
+        from feast.protos.feast.types.EntityKey_pb2 import EntityKey as EntityKeyProto
+        from feast.protos.feast.types.Value_pb2 import Value as ValueProto
+
+        config = self.fs.config
+        online_store = self.fs._get_provider().online_store
+        join_keys = [column.name for column in feature_view.entity_columns]
+        entity_keys = [EntityKeyProto(join_keys=join_keys, entity_values=[ValueProto(string_val=str(product_id))])
+                       for product_id in product_ids]
+
+        if hasattr(online_store, 'online_delete'):
+            return online_store.online_delete(config, feature_view, entity_keys)
+
+        from feast.infra.online_stores.sqlite import SqliteOnlineStore, _table_id
+        if not isinstance(online_store, SqliteOnlineStore):
+            return None
+        from feast.infra.key_encoding_utils import serialize_entity_key
+
+        table_name = _table_id(config.project, feature_view, config.registry.enable_online_feature_view_versioning)
+        keys = [(serialize_entity_key(key, entity_key_serialization_version=config.entity_key_serialization_version),)
+                for key in entity_keys]
+        conn = online_store._get_conn(config)
+        deleted = 0
+        with conn:
+            try:
+                # Mỗi entity có 1 dòng / feature: đếm số entity có dòng bị xóa
+                for key in keys:
+                    deleted += conn.execute(f'DELETE FROM "{table_name}" WHERE entity_key = ?', key).rowcount > 0
+            except Exception as e:
+                # View chưa từng được ghi (chưa có bảng) thì không có gì để xóa
+                if 'no such table' in str(e):
+                    return deleted
+                raise
+        return deleted
+
+    def _delete_removed(self, frame, removed, views, dry_run, report):
+        """Xóa product đã bị gỡ khỏi source trong mọi view đã chọn, trả về các product chưa xóa được"""
+        if len(removed) == 0:
+            return removed
+        print(f"⚠️  {len(removed)} product không còn trong {os.path.basename(self.source_path)}"
+              f"{' (dry run, không xóa)' if dry_run else ', xóa khỏi online store'}")
+        if dry_run:
+            return removed
+
+        unsupported = []
+        for feature_view, _ in self.views_for_source(frame, views):
+            deleted = self._delete(feature_view, removed)
+            if deleted is None:
+                unsupported.append(feature_view.name)
+                continue
+            report['views'].setdefault(feature_view.name, {})['deleted'] = int(deleted)
+        if unsupported:
+            print(f"❌ Online store {type(self.fs._get_provider().online_store).__name__} không hỗ trợ xóa: "
+                  f"{len(removed)} product đã gỡ vẫn được serve từ {unsupported}")
+            report['undeleted_views'] = unsupported
+            return removed
+        return removed[:0]
+
+    def _write(self, feature_view, rows):
+        """Ghi theo lô lớn: mỗi write_to_online_store = 1 transaction của online store"""
+        for start in range(0, len(rows), self.batch_size):
+            self.fs.write_to_online_store(feature_view.name, rows.iloc[start:start + self.batch_size])
+
+    def run(self, views=None, full=False, dry_run=False):
+        started = time.perf_counter()
+        frame = pd.read_parquet(self.source_path)
+        # Mỗi product chỉ giữ bản ghi mới nhất (giống kết quả materialize)
+        frame = frame.sort_values('event_timestamp').drop_duplicates('product_id', keep='last').reset_index(drop=True)
+        product_ids = frame['product_id'].astype(str).to_numpy()
+
+        # --full vẫn đọc state để biết product nào đã bị gỡ khỏi source
+        stored = self.load_state()
+        previous = None if full else stored
+        state = pd.DataFrame(index=pd.Index(product_ids, name='product_id'))
+        if previous is not None:
+            state = state.join(previous, how='left')
+
+        report = {'source': self.source_path, 'products': len(frame), 'views': {}, 'dry_run': dry_run}
+        removed = stored.index[~stored.index.isin(product_ids)] if stored is not None else pd.Index([])
+        report['removed_products'] = len(removed)
+
+        pending = removed
+        try:
+            self._run_views(frame, state, views, dry_run, report)
+            pending = self._delete_removed(frame, removed, views, dry_run, report)
+        finally:
+            if not dry_run:
+                # Product đã gỡ nhưng chưa xóa được khỏi online store vẫn giữ trong state để lần sau xóa lại
+                self.save_state(pd.concat([state, stored.loc[pending]]) if len(pending) else state)
+        report['rows_written'] = sum(v.get('written', 0) for v in report['views'].values())
+        report['rows_skipped'] = sum(v.get('skipped', 0) for v in report['views'].values())
+        report['rows_deleted'] = sum(v.get('deleted', 0) for v in report['views'].values())
+        report['elapsed_s'] = round(time.perf_counter() - started, 2)
+        return report
+
+    def _run_views(self, frame, state, views, dry_run, report):
+        timestamp_field = 'event_timestamp'
+        for feature_view, features in self.views_for_source(frame, views):
+            view_started = time.perf_counter()
+            hashes = row_hashes(frame, features)
+            if feature_view.name in state.columns:
+                old = state[feature_view.name]
+                # Product mới (NA trong state) hoặc hash khác = thay đổi
+                changed = old.isna().to_numpy() | (old.to_numpy(dtype='uint64', na_value=0) != hashes)
+            else:
+                changed = np.ones(len(frame), dtype=bool)
+
+            rows = frame.loc[changed, ['product_id'] + features + [timestamp_field]].copy()
+            rows['product_id'] = rows['product_id'].astype(str)
+            rows['created_timestamp'] = pd.Timestamp.now(tz='UTC')
+            if not dry_run and len(rows):
+                self._write(feature_view, rows)
+            if not dry_run:
+                # Chỉ cập nhật state sau khi ghi xong view này
+                state[feature_view.name] = pd.array(hashes, dtype='UInt64')
+
+            report['views'][feature_view.name] = {
+                'written': int(changed.sum()),
+                'skipped': int((~changed).sum()),
+                'elapsed_ms': round((time.perf_counter() - view_started) * 1000, 1),
+            }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental materialize vào online store")
+    parser.add_argument("--repo-path", default=FEAST_REPO_PATH)
+    parser.add_argument("--source", default=PROCESSED_PATH, help="Parquet đã transform (FileSource của các view)")
+    parser.add_argument("--state-dir", default=STATE_DIR)
+    parser.add_argument("--views", nargs="*", help="Chỉ các view này (mặc định: mọi view đọc từ --source)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--full", action="store_true", help="Bỏ qua state, ghi lại tất cả")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    materializer = IncrementalMaterializer(repo_path=args.repo_path, source_path=args.source,
+                                           state_dir=args.state_dir, batch_size=args.batch_size)
+    report = materializer.run(views=args.views, full=args.full, dry_run=args.dry_run)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
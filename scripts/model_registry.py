@@ -0,0 +1,216 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+MODELS_DIR = "../models"
+
+# Service -> (model file, scaler file)
+SERVICE_FILES = {
+    'recommender': ("model_recommender.pkl", "scaler_recommender.pkl"),
+    'value_detector': ("model_value.pkl", "scaler_value.pkl"),
+    'camera_predictor': ("model_camera.pkl", "scaler_camera.pkl"),
+}
+
+# Model tuỳ chọn (train_all_models.py --multi-output): 1 forest predict cả overall_score và
+# camera_rating. Không nằm trong SERVICE_FILES nên warm-up / hot reload mặc định không cần file này
+MULTI_OUTPUT_FILES = {
+    'recommender_camera': ("model_recommender_camera.pkl", "scaler_recommender_camera.pkl"),
+}
+REGISTRY_FILES = {**SERVICE_FILES, **MULTI_OUTPUT_FILES}
+
+# Features + target của từng model theo đúng thứ tự lúc training. Định nghĩa duy nhất: train_all_models,
+# training_loader, predict_service, precompute_predictions, model_reloader và web/gradio_app đều import từ đây
+FEATURES_RECOM = [
+    'ScreenSize', 'PPI', 'total_resolution', 'camera_score',
+    'has_telephoto', 'has_ultrawide', 'popularity_score',
+    'value_score', 'price_segment', 'has_warranty', 'NumberOfReview'
+]
+TARGET_RECOM = 'overall_score'
+
+FEATURES_VALUE = [
+    'value_score', 'price_segment', 'overall_score', 'display_score',
+    'camera_rating', 'PPI', 'ScreenSize', 'camera_score',
+    'main_camera_mp', 'NumberOfReview'
+]
+TARGET_VALUE = 'is_premium'
+
+FEATURES_CAMERA = [
+    'main_camera_mp', 'num_cameras', 'has_telephoto', 'has_ultrawide',
+    'has_ois', 'camera_feature_count', 'PPI', 'total_resolution',
+    'ScreenSize', 'value_score', 'is_premium', 'NumberOfReview'
+]
+TARGET_CAMERA = 'camera_rating'
+
+# Model multi-output (recommender_camera): hợp features của recommender + camera_predictor
+FEATURES_MULTI = list(dict.fromkeys(FEATURES_RECOM + FEATURES_CAMERA))
+
+
+def _rss_bytes():
+    """Resident set size hiện tại của process (Linux /proc), None nếu không đọc được"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def services_from_env(name, default=()):
+    """Đọc danh sách service từ env var dạng "recommender,value_detector" """
+    value = os.environ.get(name)
+    if value is None:
+        return list(default)
+    services = [s.strip() for s in value.split(",") if s.strip()]
+    unknown = set(services) - set(REGISTRY_FILES)
+    if unknown:
+        raise ValueError(f"Unknown services in {name}: {sorted(unknown)}")
+    return services
+
+
+class ModelRegistry:
+    """
+    Load (model, scaler) theo từng service ở lần dùng đầu tiên.
+
+    Mỗi service có lock riêng: request của value_detector không phải chờ
+    recommender load xong. preload: các service load ngay khi khởi tạo.
+    max_loaded: giới hạn số service giữ trong RAM, service ít dùng nhất bị
+    evict (LRU) khi vượt quá. None = không giới hạn.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, preload=(), max_loaded=None):
+        self.models_dir = models_dir
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+        self._locks = {service: threading.Lock() for service in REGISTRY_FILES}
+        self._lru_lock = threading.Lock()
+        self._model_versions = {}
+        self.stats = {}
+        # Model multi-output đã được train chưa: kiểm tra 1 lần / registry, không phải mỗi request
+        self.multi_output_available = all(os.path.exists(os.path.join(models_dir, f))
+                                          for f in MULTI_OUTPUT_FILES['recommender_camera'])
+
+        for service in preload:
+            self.get(service)
+
+    @classmethod
+    def from_env(cls, models_dir=MODELS_DIR):
+        """PHONE_PRELOAD_SERVICES="recommender,value_detector", PHONE_MAX_LOADED_SERVICES=1"""
+        max_loaded = os.environ.get("PHONE_MAX_LOADED_SERVICES")
+        return cls(
+            models_dir=models_dir,
+            preload=services_from_env("PHONE_PRELOAD_SERVICES"),
+            max_loaded=int(max_loaded) if max_loaded else None
+        )
+
+    def is_loaded(self, service):
+        return service in self._loaded
+
+    def loaded_services(self):
+        return list(self._loaded)
+
+    def get(self, service):
+        """(model, scaler) của service, load nếu chưa có"""
+        if service not in REGISTRY_FILES:
+            raise ValueError(f"Unknown service: {service}")
+
+        entry = self._loaded.get(service)
+        if entry is None:
+            with self._locks[service]:
+                entry = self._loaded.get(service)
+                if entry is None:
+                    entry = self._load(service)
+                    with self._lru_lock:
+                        self._loaded[service] = entry
+                    self._evict_over_limit(keep=service)
+
+        with self._lru_lock:
+            if service in self._loaded:
+                self._loaded.move_to_end(service)
+        return entry
+
+    def model_version(self, multi_output=False):
+        """
+        Hash các file model trong models_dir (giống model_version của precompute_predictions),
+        tính 1 lần cho mỗi registry: hot reload tạo registry mới nên version mới được tính lại.
+        multi_output: tính cả model_recommender_camera.pkl
+        """
+        if multi_output not in self._model_versions:
+            from precompute_predictions import compute_model_version
+            self._model_versions[multi_output] = compute_model_version(self.models_dir, multi_output=multi_output)
+        return self._model_versions[multi_output]
+
+    def _load(self, service):
+        import joblib
+        # Import sklearn trước khi đo để RSS/load time chỉ tính phần model
+        import sklearn.ensemble  # noqa: F401
+
+        model_file, scaler_file = REGISTRY_FILES[service]
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        model = joblib.load(os.path.join(self.models_dir, model_file))
+        scaler = joblib.load(os.path.join(self.models_dir, scaler_file))
+        load_seconds = time.perf_counter() - start
+        rss_after = _rss_bytes()
+
+        stats = self.stats.setdefault(service, {'loads': 0, 'evictions': 0})
+        stats['loads'] += 1
+        stats['load_ms'] = round(load_seconds * 1000, 1)
+        stats['file_mb'] = round(sum(os.path.getsize(os.path.join(self.models_dir, f))
+                                     for f in REGISTRY_FILES[service]) / 1e6, 2)
+        # RSS delta chỉ là xấp xỉ: các thread khác cũng có thể cấp phát trong lúc load
+        if rss_before is not None and rss_after is not None:
+            stats['rss_delta_mb'] = round((rss_after - rss_before) / 1e6, 1)
+        return model, scaler
+
+    def _evict_over_limit(self, keep=None):
+        if self.max_loaded is None:
+            return
+        with self._lru_lock:
+            while len(self._loaded) > self.max_loaded:
+                victim = next((s for s in self._loaded if s != keep), None)
+                if victim is None:
+                    break
+                del self._loaded[victim]
+                self.stats[victim]['evictions'] += 1
+
+    def evict(self, service=None):
+        """Bỏ model khỏi RAM (service=None: tất cả), lần dùng sau sẽ load lại"""
+        with self._lru_lock:
+            services = [service] if service is not None else list(self._loaded)
+            for name in services:
+                if self._loaded.pop(name, None) is not None:
+                    self.stats[name]['evictions'] += 1
+
+    def load_stats(self):
+        """Load time / kích thước theo service, kèm RSS hiện tại của process"""
+        rss = _rss_bytes()
+        return {
+            'services': {service: dict(stats, loaded=service in self._loaded)
+                         for service, stats in self.stats.items()},
+            'process_rss_mb': round(rss / 1e6, 1) if rss is not None else None,
+        }
+
+    def report(self):
+        stats = self.load_stats()
+        print("\n📦 MODEL REGISTRY")
+        for service, info in stats['services'].items():
+            state = "loaded" if info['loaded'] else "evicted"
+            print(f"   {service:17} {state:8} load {info.get('load_ms', 0):8.1f} ms  "
+                  f"file {info.get('file_mb', 0):7.2f} MB  RSS +{info.get('rss_delta_mb', 0):7.1f} MB  "
+                  f"(loads={info['loads']}, evictions={info['evictions']})")
+        print(f"   process RSS: {stats['process_rss_mb']} MB")
+        return stats
+
+
+if __name__ == "__main__":
+    registry = ModelRegistry()
+    for service in SERVICE_FILES:
+        registry.get(service)
+    registry.report()
+
+    print("\n🔁 max_loaded=1 (memory-constrained worker)")
+    small = ModelRegistry(max_loaded=1)
+    for service in ['value_detector', 'recommender', 'value_detector']:
+        small.get(service)
+    print(f"   loaded: {small.loaded_services()}")
+    small.report()
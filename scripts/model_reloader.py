@@ -0,0 +1,251 @@
+import os
+import threading
+import time
+import numpy as np
+
+from model_registry import (ModelRegistry, SERVICE_FILES, REGISTRY_FILES, MODELS_DIR,
+                            FEATURES_RECOM, FEATURES_VALUE, FEATURES_CAMERA, FEATURES_MULTI)
+from precompute_predictions import PROCESSED_PATH
+
+SERVICE_FEATURES = {
+    'recommender': FEATURES_RECOM,
+    'value_detector': FEATURES_VALUE,
+    'camera_predictor': FEATURES_CAMERA,
+}
+
+# Model multi-output tuỳ chọn: hợp features của recommender + camera_predictor
+MULTI_OUTPUT_FEATURES = {
+    'recommender_camera': FEATURES_MULTI,
+}
+
+# Khoảng giá trị hợp lệ của output (giống thang điểm hiển thị trên UI)
+OUTPUT_RANGES = {
+    'recommender': (0, 100),
+    'camera_predictor': (0, 5),
+    'recommender_camera': ((0, 100), (0, 5)),
+}
+
+
+def load_validation_sample(processed_path=PROCESSED_PATH, n_rows=64):
+    """Vài phone thật từ catalog để warm-up + validate, fallback về 1 row toàn 0"""
+    import pandas as pd
+
+    columns = sorted(set(FEATURES_RECOM + FEATURES_VALUE + FEATURES_CAMERA))
+    if os.path.exists(processed_path):
+        catalog = pd.read_parquet(processed_path, columns=columns)
+        return catalog.head(n_rows).fillna(0)
+    return pd.DataFrame([[0.0] * len(columns)], columns=columns)
+
+
+def validate_registry(registry, sample, services):
+    """Warm-up từng model trên sample và kiểm tra output, raise ValueError nếu không hợp lệ"""
+    for service in services:
+        model, scaler = registry.get(service)
+        features = SERVICE_FEATURES.get(service) or MULTI_OUTPUT_FEATURES[service]
+        X_scaled = scaler.transform(sample[features])
+        predictions = np.asarray(model.predict(X_scaled), dtype=np.float64)
+
+        if len(predictions) != len(sample) or not np.isfinite(predictions).all():
+            raise ValueError(f"{service}: invalid predictions")
+        if service in OUTPUT_RANGES:
+            # Multi-output: 1 khoảng (low, high) cho mỗi cột
+            low, high = np.array(OUTPUT_RANGES[service]).T
+            if (predictions < low).any() or (predictions > high).any():
+                raise ValueError(f"{service}: predictions out of range [{low}, {high}]")
+        if service == 'value_detector':
+            proba = model.predict_proba(X_scaled)
+            if proba.shape != (len(sample), 2):
+                raise ValueError(f"{service}: predict_proba shape {proba.shape}")
+
+
+class ModelReloader:
+    """
+    Hot reload models cho một hoặc nhiều predictor (có attribute .registry).
+
+    reload(): load bộ model mới vào một ModelRegistry riêng ở thread hiện tại,
+    warm-up + validate, rồi gán predictor.registry = registry mới (1 phép gán,
+    atomic). Request đang chạy vẫn dùng registry cũ mà nó đã lấy ra, nên không
+    có request nào phải chờ load. Validate lỗi -> giữ nguyên registry cũ.
+    start_watching(): poll mtime của models/*.pkl, reload khi file đã ổn định
+    (không đổi trong debounce giây) để không đọc file đang được ghi dở.
+    """
+
+    def __init__(self, predictors, models_dir=MODELS_DIR, poll_interval=5, debounce=2, sample=None):
+        self.predictors = predictors if isinstance(predictors, (list, tuple)) else [predictors]
+        self.models_dir = models_dir
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.sample = sample
+
+        self.previous_registries = None
+        self.history = []
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watch_thread = None
+        self._signature = self._files_signature()
+
+    def _files_signature(self):
+        signature = []
+        for files in REGISTRY_FILES.values():
+            for file_name in files:
+                path = os.path.join(self.models_dir, file_name)
+                try:
+                    stat = os.stat(path)
+                    signature.append((file_name, stat.st_mtime_ns, stat.st_size))
+                except FileNotFoundError:
+                    signature.append((file_name, None, None))
+        return tuple(signature)
+
+    def _services_to_load(self, registry):
+        """
+        (services cần validate, services giữ lại trong RAM): validate mọi service để bộ model lỗi
+        không được swap vào chỉ vì service đó chưa được dùng, nhưng chỉ giữ những service đang được dùng
+        """
+        resident = registry.loaded_services() or list(SERVICE_FILES)
+        if registry.max_loaded is not None:
+            resident = resident[-registry.max_loaded:]
+        # Service không giữ lại validate trước: LRU của registry mới (max_loaded) giữ đúng các service resident
+        services = [s for s in SERVICE_FILES if s not in resident] + resident
+        return services, resident
+
+    def reload(self):
+        """Load + validate + swap. Trả về dict kết quả, không raise"""
+        with self._reload_lock:
+            start = time.perf_counter()
+            current = self.predictors[0].registry
+            services, resident = self._services_to_load(current)
+            try:
+                if self.sample is None:
+                    self.sample = load_validation_sample()
+                new_registry = ModelRegistry(models_dir=self.models_dir, max_loaded=current.max_loaded)
+                validate_registry(new_registry, self.sample, services)
+                for service in services:
+                    if service not in resident:
+                        new_registry.evict(service)
+            except Exception as e:
+                result = {'status': 'rolled_back', 'error': f"{type(e).__name__}: {e}",
+                          'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)}
+                self.history.append(result)
+                print(f"⚠️  Model reload failed, keeping current models: {result['error']}")
+                return result
+
+            # Swap: mỗi request lấy registry = self.registry một lần nên luôn thấy một bộ model nhất quán
+            self.previous_registries = [predictor.registry for predictor in self.predictors]
+            for predictor in self.predictors:
+                predictor.registry = new_registry
+            self._signature = self._files_signature()
+
+            result = {'status': 'swapped', 'services': services, 'resident': resident,
+                      'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)}
+            self.history.append(result)
+            print(f"🔄 Models reloaded ({', '.join(services)} validated, {', '.join(resident)} loaded) "
+                  f"in {result['elapsed_ms']} ms")
+            return result
+
+    def rollback(self):
+        """Quay lại bộ model trước lần swap gần nhất"""
+        with self._reload_lock:
+            if self.previous_registries is None:
+                return False
+            for predictor, registry in zip(self.predictors, self.previous_registries):
+                predictor.registry = registry
+            self.previous_registries = None
+            print("↩️  Rolled back to previous models")
+            return True
+
+    # ==================== WATCHER ====================
+
+    def _watch(self):
+        pending_since = None
+        pending_signature = None
+        while not self._stop.wait(self.poll_interval):
+            signature = self._files_signature()
+            if signature == self._signature:
+                pending_since = pending_signature = None
+                continue
+            # File còn đang thay đổi -> chờ tới khi ổn định debounce giây
+            if signature != pending_signature:
+                pending_signature = signature
+                pending_since = time.monotonic()
+                continue
+            if time.monotonic() - pending_since >= self.debounce:
+                self.reload()
+                # Reload lỗi: không thử lại cho tới khi file đổi tiếp
+                self._signature = signature
+                pending_since = pending_signature = None
+
+    def start_watching(self):
+        if self._watch_thread is None:
+            self._stop.clear()
+            self._watch_thread = threading.Thread(target=self._watch, name="model-reloader", daemon=True)
+            self._watch_thread.start()
+        return self
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join()
+            self._watch_thread = None
+
+
+def run_benchmark(duration=6.0, reload_at=2.0):
+    """Latency của predict_all trước / trong / sau khi reload (models được copy sang thư mục tạm)"""
+    import shutil
+    import tempfile
+    from predict_service import MultiModelPredictor
+
+    with tempfile.TemporaryDirectory() as models_dir:
+        for files in SERVICE_FILES.values():
+            for file_name in files:
+                shutil.copy(os.path.join(MODELS_DIR, file_name), models_dir)
+
+        predictor = MultiModelPredictor(use_snapshot=True, registry=ModelRegistry(models_dir=models_dir))
+        predictor.warm_up()
+        reloader = ModelReloader(predictor, models_dir=models_dir)
+        product_ids = [str(i).zfill(3) for i in range(1, 200)]
+
+        timings = []
+        reload_window = [None, None]
+
+        def trigger_reload():
+            time.sleep(reload_at)
+            reload_window[0] = time.perf_counter()
+            reloader.reload()
+            reload_window[1] = time.perf_counter()
+
+        thread = threading.Thread(target=trigger_reload)
+        thread.start()
+        end = time.perf_counter() + duration
+        i = 0
+        while time.perf_counter() < end:
+            start = time.perf_counter()
+            predictor.predict_all(product_ids[i % len(product_ids)])
+            timings.append((start, time.perf_counter() - start))
+            i += 1
+        thread.join()
+
+        def summary(rows):
+            values = np.array([elapsed for _, elapsed in rows]) * 1000
+            return f"n={len(values):5}  p50={np.percentile(values, 50):6.2f} ms  p99={np.percentile(values, 99):6.2f} ms"
+
+        print(f"\n📊 PREDICT LATENCY AROUND HOT RELOAD ({reloader.history[-1]['elapsed_ms']} ms reload)")
+        print(f"   before : {summary([t for t in timings if t[0] < reload_window[0]])}")
+        print(f"   during : {summary([t for t in timings if reload_window[0] <= t[0] <= reload_window[1]])}")
+        print(f"   after  : {summary([t for t in timings if t[0] > reload_window[1]])}")
+
+        # So sánh: restart kiểu cũ, request đầu tiên phải tự load models
+        predictor.registry = ModelRegistry(models_dir=models_dir)
+        start = time.perf_counter()
+        predictor.predict_all(product_ids[0])
+        print(f"   cold first request (restart without reload): {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        # Model hỏng -> validate fail, predictor vẫn dùng model cũ
+        with open(os.path.join(models_dir, "model_camera.pkl"), "wb") as f:
+            f.write(b"not a model")
+        old_registry = predictor.registry
+        result = reloader.reload()
+        print(f"   corrupt model -> {result['status']}, registry unchanged: {predictor.registry is old_registry}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import sys
+import pandas as pd
+import numpy as np
+import joblib
+from datetime import datetime, timedelta
+from model_registry import MULTI_OUTPUT_FILES, FEATURES_RECOM, FEATURES_VALUE, FEATURES_CAMERA, FEATURES_MULTI
+
+MODELS_DIR = "../models"
+FEAST_REPO_PATH = "../my_phone_features"
+PROCESSED_PATH = "../my_phone_features/data/processed/phone_data_processed.parquet"
+PREDICTIONS_PATH = "../my_phone_features/data/processed/phone_predictions.parquet"
+
+MODEL_FILES = [
+    "model_recommender.pkl", "scaler_recommender.pkl",
+    "model_value.pkl", "scaler_value.pkl",
+    "model_camera.pkl", "scaler_camera.pkl",
+]
+
+PREDICTION_FEATURE_REFS = [
+    "phone_predictions:predicted_overall_score",
+    "phone_predictions:predicted_is_premium",
+    "phone_predictions:premium_probability",
+    "phone_predictions:predicted_camera_rating",
+]
+MODEL_VERSION_REF = "phone_predictions:model_version"
+
+def compute_model_version(models_dir=MODELS_DIR, multi_output=False):
+    """
+    Hash nội dung các file model + scaler, đổi mỗi lần retrain.
+    multi_output: overall_score + camera_rating lấy từ model_recommender_camera.pkl nên hash cả file đó
+    """
+    digest = hashlib.sha1()
+    files = MODEL_FILES + list(MULTI_OUTPUT_FILES['recommender_camera']) if multi_output else MODEL_FILES
+    for file_name in files:
+        with open(os.path.join(models_dir, file_name), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def score_catalog(catalog, models_dir=MODELS_DIR, multi_output=False):
+    """
+    Score toàn bộ catalog: mỗi model chỉ predict một lần trên cả batch.
+    multi_output: overall_score + camera_rating từ model_recommender_camera.pkl, giống
+    MultiModelPredictor(multi_output=True)
+    """
+    model_value = joblib.load(os.path.join(models_dir, "model_value.pkl"))
+    scaler_value = joblib.load(os.path.join(models_dir, "scaler_value.pkl"))
+
+    predictions = pd.DataFrame({'product_id': catalog['product_id'].values})
+
+    if multi_output:
+        model_file, scaler_file = MULTI_OUTPUT_FILES['recommender_camera']
+        model_multi = joblib.load(os.path.join(models_dir, model_file))
+        scaler_multi = joblib.load(os.path.join(models_dir, scaler_file))
+        y_multi = model_multi.predict(scaler_multi.transform(catalog[FEATURES_MULTI]))
+        predictions['predicted_overall_score'] = y_multi[:, 0].astype(np.float32)
+    else:
+        model_recom = joblib.load(os.path.join(models_dir, "model_recommender.pkl"))
+        scaler_recom = joblib.load(os.path.join(models_dir, "scaler_recommender.pkl"))
+        predictions['predicted_overall_score'] = model_recom.predict(
+            scaler_recom.transform(catalog[FEATURES_RECOM])).astype(np.float32)
+
+    X_value_scaled = scaler_value.transform(catalog[FEATURES_VALUE])
+    predictions['predicted_is_premium'] = model_value.predict(X_value_scaled).astype(np.int64)
+    predictions['premium_probability'] = model_value.predict_proba(X_value_scaled)[:, 1].astype(np.float32)
+
+    if multi_output:
+        predictions['predicted_camera_rating'] = y_multi[:, 1].astype(np.float32)
+    else:
+        model_camera = joblib.load(os.path.join(models_dir, "model_camera.pkl"))
+        scaler_camera = joblib.load(os.path.join(models_dir, "scaler_camera.pkl"))
+        predictions['predicted_camera_rating'] = model_camera.predict(
+            scaler_camera.transform(catalog[FEATURES_CAMERA])).astype(np.float32)
+
+    predictions['model_version'] = compute_model_version(models_dir, multi_output=multi_output)
+    return predictions
+
+
+def create_prediction_data(processed_path=PROCESSED_PATH, output_path=PREDICTIONS_PATH, models_dir=MODELS_DIR,
+                           multi_output=False):
+    """
+    Score catalog đã transform và lưu parquet làm source cho phone_predictions view
+    (multi_output phải giống service đọc predictions, nếu không model_version sẽ không khớp)
+    """
+    print("📥 Loading processed catalog...")
+    catalog = pd.read_parquet(processed_path)
+    # Chỉ score bản ghi mới nhất của mỗi product
+    catalog = catalog.sort_values('event_timestamp').drop_duplicates('product_id', keep='last')
+    print(f"   Catalog: {len(catalog)} phones")
+
+    print("🤖 Scoring catalog with 3 models...")
+    predictions = score_catalog(catalog, models_dir, multi_output=multi_output)
+
+    now = datetime.now()
+    predictions['event_timestamp'] = now
+    predictions['created_timestamp'] = now
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    predictions.to_parquet(output_path, index=False)
+    print(f"✅ Saved predictions: {output_path} (model_version={predictions['model_version'].iloc[0]})")
+    return predictions
+
+
+def materialize_predictions(repo_path=FEAST_REPO_PATH):
+    """Bulk materialize riêng view phone_predictions vào online store"""
+    from feast import FeatureStore
+
+    fs = FeatureStore(repo_path=repo_path)
+    registered_views = [fv.name for fv in fs.list_feature_views()]
+    if "phone_predictions" not in registered_views:
+        # View chỉ được khai báo khi parquet đã có (create_prediction_data), nên apply tại đây
+        if not os.path.exists(os.path.join(repo_path, "data", "processed", "phone_predictions.parquet")):
+            print("⚠️  Chưa có phone_predictions.parquet, chạy create_prediction_data() trước")
+            return False
+        if repo_path not in sys.path:
+            sys.path.insert(0, repo_path)
+        from features.phone_features import phone, phone_predictions_objects
+        fs.apply([phone, *phone_predictions_objects()])
+        print("📝 Registered feature view phone_predictions")
+
+    end_date = datetime.now() + timedelta(minutes=1)
+    fs.materialize(end_date - timedelta(days=365), end_date, feature_views=["phone_predictions"])
+    print("✅ Materialized phone_predictions")
+    return True
+
+
+if __name__ == "__main__":
+    # python precompute_predictions.py --multi-output   (cho MultiModelPredictor(multi_output=True))
+    print("🚀 Precomputing predictions for the whole catalog")
+    create_prediction_data(multi_output="--multi-output" in sys.argv)
+    materialize_predictions()
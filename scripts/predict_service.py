@@ -1,24 +1,31 @@
-import pandas as pd
-import joblib
 import os
-from feast import FeatureStore
+import sys
+import threading
+import time
+from startup_profile import StartupTimer
+from model_registry import (ModelRegistry, SERVICE_FILES, FEATURES_RECOM, FEATURES_VALUE, FEATURES_CAMERA,
+                            FEATURES_MULTI)
+from serving_metrics import METRICS, start_exporter_from_env
+from request_profiler import PROFILER, profiled
+
+# 🆕 Không import feast / joblib / pandas và không load model lúc import module:
+# mọi thứ nặng được load ở request đầu tiên (hoặc warm_up())
 
 class PhonePredictor:
-    def __init__(self):
-        # Load Feast store
-        self.fs = FeatureStore(repo_path="../my_phone_features")
+    def __init__(self, use_snapshot=False, warm_up=False):
+        self.use_snapshot = use_snapshot
+        self._fs = None
+        self._load_lock = threading.Lock()
+        
+        # 🆕 Optional: giữ toàn bộ catalog trong RAM thay vì đọc SQLite mỗi request
+        self.snapshot = None
         
-        # Load model và scaler
-        self.model = joblib.load("../models/model_recommender.pkl")
-        self.scaler = joblib.load("../models/scaler_recommender.pkl")
+        # Model và scaler được load ở lần predict đầu tiên
+        self.model = None
+        self.scaler = None
         
         # 🆕 SỬA: CHỈ 11 FEATURES GIỐNG TRAINING (bỏ camera_rating)
-        self.features = [
-            'ScreenSize', 'PPI', 'total_resolution',
-            'camera_score', 'has_telephoto', 'has_ultrawide',
-            'popularity_score', 'value_score', 'price_segment',
-            'has_warranty', 'NumberOfReview'
-        ]
+        self.features = FEATURES_RECOM
         
         self.feature_refs = [
             "phone_display:ScreenSize", "phone_display:PPI", "phone_display:total_resolution",
@@ -27,14 +34,57 @@ class PhonePredictor:
             "phone_value:value_score", "phone_value:price_segment",
             "phone_product:has_warranty", "phone_product:NumberOfReview"
         ]
+        
+        if warm_up:
+            self.warm_up()
+    
+    @property
+    def fs(self):
+        if self._fs is None:
+            with self._load_lock:
+                if self._fs is None:
+                    from feast import FeatureStore
+                    self._fs = FeatureStore(repo_path="../my_phone_features")
+        return self._fs
+    
+    def _ensure_loaded(self):
+        if self.model is not None:
+            return
+        fs = self.fs
+        with self._load_lock:
+            if self.model is not None:
+                return
+            import joblib
+            if self.use_snapshot:
+                from feature_snapshot import FeatureSnapshot
+                self.snapshot = FeatureSnapshot(fs).start_background_refresh()
+            self.scaler = joblib.load("../models/scaler_recommender.pkl")
+            self.model = joblib.load("../models/model_recommender.pkl")
+    
+    def warm_up(self):
+        """Load model + chạy 1 prediction giả để request đầu tiên không bị chậm"""
+        import pandas as pd
+        self._ensure_loaded()
+        self.model.predict(self.scaler.transform(pd.DataFrame([[0.0] * len(self.features)], columns=self.features)))
+        return self
+    
+    def _get_feature_data(self, product_id):
+        if self.snapshot is not None:
+            feature_data = self.snapshot.get_features(product_id, self.features + ['overall_score'])
+            if feature_data is not None:
+                return feature_data
+        
+        # Lấy features từ Feast
+        return self.fs.get_online_features(
+            entity_rows=[{"product_id": product_id}],
+            features=self.feature_refs
+        ).to_df()
     
+    @profiled("predict_phone_score")
     def predict_phone_score(self, product_id):
         try:
-            # Lấy features từ Feast
-            feature_data = self.fs.get_online_features(
-                entity_rows=[{"product_id": product_id}],
-                features=self.feature_refs
-            ).to_df()
+            self._ensure_loaded()
+            feature_data = self._get_feature_data(product_id)
             
             # 🆕 CHỈ CHỌN ĐÚNG 11 FEATURES ĐÃ TRAINING
             X_pred = feature_data[self.features]
@@ -63,18 +113,37 @@ class PhonePredictor:
 
 # 🆕 SỬA: MultiModelPredictor với feature refs đúng
 class MultiModelPredictor:
-    def __init__(self):
-        self.fs = FeatureStore(repo_path="../my_phone_features")
+    def __init__(self, use_snapshot=False, lookup_only=False, warm_up=False, registry=None, multi_output=False,
+                 snapshot_refresh=True):
+        self.use_snapshot = use_snapshot
+        self.lookup_only = lookup_only
+        # snapshot_refresh=False: snapshot được build nhưng không start refresh thread
+        # (prefork_server: thread không sống qua fork, mỗi worker tự start sau khi fork)
+        self.snapshot_refresh = snapshot_refresh
+        # 🆕 multi_output: recommender + camera_predictor dùng chung model_recommender_camera.pkl
+        # (train_all_models.py --multi-output): 1 lần lấy features, 1 lần duyệt forest
+        self.multi_output = multi_output
+        if multi_output:
+            print("⚠️  multi_output=True: camera_rating kém chính xác hơn model riêng "
+                  "(R² test 0.993 -> 0.961), chỉ dùng khi cần giảm latency / RAM")
+        self._fs = None
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        
+        # 🆕 Model của từng service được load riêng khi dùng lần đầu
+        # (preload / eviction cấu hình qua PHONE_PRELOAD_SERVICES, PHONE_MAX_LOADED_SERVICES)
+        self.registry = registry if registry is not None else ModelRegistry.from_env()
         
-        # Load cả 3 models
-        self.model_recom = joblib.load("../models/model_recommender.pkl")
-        self.scaler_recom = joblib.load("../models/scaler_recommender.pkl")
+        self.snapshot = None
+        # 🆕 Lookup-only mode: đọc predictions đã precompute (view phone_predictions)
+        self.prediction_snapshot = None
         
-        self.model_value = joblib.load("../models/model_value.pkl")
-        self.scaler_value = joblib.load("../models/scaler_value.pkl")
+        # Top-K engine, build lần đầu khi gọi recommend_top_k
+        self.recommendation_engine = None
         
-        self.model_camera = joblib.load("../models/model_camera.pkl")
-        self.scaler_camera = joblib.load("../models/scaler_camera.pkl")
+        # 🆕 Per-stage latency / counters, exporter do process chạy server start
+        # (start_exporter_from_env: web app / main(), prefork_server start trong từng worker)
+        self.metrics = METRICS
         
         # 🆕 SỬA: Feature refs cố định cho từng model
         self.feature_refs_recom = [
@@ -102,102 +171,376 @@ class MultiModelPredictor:
             "phone_product:NumberOfReview"
         ]
         
-        # Feature mapping
-        self.features_recom = [
-            'ScreenSize', 'PPI', 'total_resolution', 'camera_score', 
-            'has_telephoto', 'has_ultrawide', 'popularity_score', 
-            'value_score', 'price_segment', 'has_warranty', 'NumberOfReview'
-        ]
+        # Feature mapping (model_registry, giống lúc training)
+        self.features_recom = FEATURES_RECOM
+        self.features_value = FEATURES_VALUE
+        self.features_camera = FEATURES_CAMERA
         
-        self.features_value = [
-            'value_score', 'price_segment', 'overall_score', 'display_score', 
-            'camera_rating', 'PPI', 'ScreenSize', 'camera_score', 
-            'main_camera_mp', 'NumberOfReview'
-        ]
+        # Multi-output: hợp features của recommender + camera (đúng thứ tự lúc training)
+        self.feature_refs_multi = list(dict.fromkeys(self.feature_refs_recom + self.feature_refs_camera))
+        self.features_multi = FEATURES_MULTI
         
-        self.features_camera = [
-            'main_camera_mp', 'num_cameras', 'has_telephoto', 'has_ultrawide', 
-            'has_ois', 'camera_feature_count', 'PPI', 'total_resolution', 
-            'ScreenSize', 'value_score', 'is_premium', 'NumberOfReview'
-        ]
+        if warm_up:
+            self.warm_up()
     
-    def predict_all(self, product_id):
-        try:
-            # Lấy features cho từng model
-            feature_data_recom = self.fs.get_online_features(
-                entity_rows=[{"product_id": product_id}],
-                features=self.feature_refs_recom
-            ).to_df()
+    @property
+    def fs(self):
+        if self._fs is None:
+            with self._load_lock:
+                if self._fs is None:
+                    from feast import FeatureStore
+                    self._fs = FeatureStore(repo_path="../my_phone_features")
+        return self._fs
+    
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        fs = self.fs
+        with self._load_lock:
+            if self._loaded:
+                return
+            from feature_snapshot import FeatureSnapshot
             
-            feature_data_value = self.fs.get_online_features(
-                entity_rows=[{"product_id": product_id}],
-                features=self.feature_refs_value
-            ).to_df()
+            if self.use_snapshot:
+                self.snapshot = FeatureSnapshot(fs)
             
-            feature_data_camera = self.fs.get_online_features(
+            if self.lookup_only:
+                from precompute_predictions import PREDICTION_FEATURE_REFS, MODEL_VERSION_REF, PREDICTIONS_PATH
+                self.prediction_snapshot = FeatureSnapshot(
+                    fs,
+                    feature_refs=PREDICTION_FEATURE_REFS,
+                    label_refs=[MODEL_VERSION_REF],
+                    processed_path=PREDICTIONS_PATH
+                )
+            if self.snapshot_refresh:
+                self.start_snapshot_refresh()
+            self._loaded = True
+    
+    def release_feature_store(self):
+        """
+        Bỏ FeatureStore đã mở (connection sqlite của online store): prefork_server gọi trong master
+        trước khi fork, worker tự mở connection riêng khi cần (Feast fallback, snapshot refresh)
+        """
+        self._fs = None
+        for snapshot in (self.snapshot, self.prediction_snapshot):
+            if snapshot is not None:
+                snapshot.fs = None
+    
+    def start_snapshot_refresh(self):
+        """Start thread refresh của các snapshot (không làm gì với snapshot đã có thread)"""
+        for snapshot in (self.snapshot, self.prediction_snapshot):
+            if snapshot is not None:
+                snapshot.start_background_refresh()
+    
+    def _service_features(self, service):
+        return {
+            'recommender': (self.feature_refs_recom, self.features_recom),
+            'value_detector': (self.feature_refs_value, self.features_value),
+            'camera_predictor': (self.feature_refs_camera, self.features_camera),
+            'recommender_camera': (self.feature_refs_multi, self.features_multi),
+        }[service]
+    
+    def _uses_multi_output(self, registry):
+        # registry.multi_output_available được kiểm tra 1 lần khi tạo registry (hot reload tạo registry mới)
+        return self.multi_output and registry.multi_output_available
+    
+    def _model_services(self, services, registry):
+        """
+        Services -> model cần chạy: recommender + camera_predictor gộp thành recommender_camera khi
+        multi_output và model đã được train, nếu chưa có file thì vẫn dùng 2 model riêng
+        """
+        if self._uses_multi_output(registry) and 'recommender' in services and 'camera_predictor' in services:
+            return ['recommender_camera'] + [s for s in services if s not in ('recommender', 'camera_predictor')]
+        return list(services)
+    
+    def warm_up(self, services=None):
+        """Load models + chạy 1 prediction giả cho mỗi service (mặc định cả 3)"""
+        import pandas as pd
+        self._ensure_loaded()
+        for service in self._model_services(services or list(SERVICE_FILES), self.registry):
+            model, scaler = self.registry.get(service)
+            _, features = self._service_features(service)
+            model.predict(scaler.transform(pd.DataFrame([[0.0] * len(features)], columns=features)))
+        return self
+    
+    def _get_feature_data(self, product_id, feature_refs, features, service="all"):
+        metrics = self.metrics
+        # Snapshot mode: lookup = 1 array index, fallback về Feast cho product mới
+        if self.snapshot is not None:
+            with metrics.stage("snapshot_lookup", service):
+                feature_data = self.snapshot.get_features(product_id, features)
+            metrics.count_lookup("snapshot", feature_data is not None)
+            if feature_data is not None:
+                return feature_data
+        
+        with metrics.stage("get_online_features", service):
+            response = self.fs.get_online_features(
                 entity_rows=[{"product_id": product_id}],
-                features=self.feature_refs_camera
-            ).to_df()
-            
-            # Predict từng model
+                features=feature_refs
+            )
+        with metrics.stage("to_df", service):
+            feature_data = response.to_df()
+        # Product không có trong online store -> Feast trả về toàn None
+        metrics.count_lookup("feast", not feature_data[features].isna().all(axis=None))
+        return feature_data
+    
+    def _lookup_prediction(self, product_id, services, registry):
+        """Prediction đã precompute của các services, "stale" nếu được tính bằng bộ model khác bộ đang load"""
+        row = self.prediction_snapshot.get_row(product_id)
+        if row is None:
+            return None
+        
+        model_version = self.prediction_snapshot.get_label(product_id, 'model_version')
+        # Sau hot reload (ModelReloader) prediction cũ không còn khớp model: chạy live cho tới lần precompute sau
+        if model_version != registry.model_version(multi_output=self._uses_multi_output(registry)):
+            return "stale"
+        
+        overall_score, is_premium, premium_prob, camera_rating = row
+        predictions = {}
+        if 'recommender' in services:
+            predictions['overall_score'] = round(float(overall_score), 1)
+        if 'value_detector' in services:
+            predictions['is_premium'] = int(is_premium)
+            predictions['premium_prob'] = round(float(premium_prob), 3)
+        if 'camera_predictor' in services:
+            predictions['camera_rating'] = round(float(camera_rating), 1)
+        return {
+            'product_id': product_id,
+            'predictions': predictions,
+            'model_version': model_version,
+            'source': 'precomputed',
+            'status': 'success'
+        }
+    
+    @profiled("predict_all")
+    def predict_all(self, product_id, services=None):
+        """Predict bằng các services được chọn (mặc định cả 3), chỉ load model của các service đó"""
+        requested = services or list(SERVICE_FILES)
+        # Lấy registry một lần: hot reload (ModelReloader) có thể swap self.registry giữa chừng
+        registry = self.registry
+        services = self._model_services(requested, registry)
+        try:
+            self._ensure_loaded()
+        except Exception as e:
+            return {
+                'product_id': product_id,
+                'error': str(e),
+                'status': 'error'
+            }
+        
+        # Lookup-only mode: O(1), chỉ chạy model cho product chưa có prediction
+        if self.prediction_snapshot is not None:
+            try:
+                cached = self._lookup_prediction(product_id, requested, registry)
+            except Exception as e:
+                return {
+                    'product_id': product_id,
+                    'error': str(e),
+                    'status': 'error'
+                }
+            if cached == "stale":
+                self.metrics.inc("feature_lookups_total", source="precomputed", result="stale")
+            else:
+                self.metrics.count_lookup("precomputed", cached is not None)
+            if isinstance(cached, dict):
+                self.metrics.count_request("precomputed", "success")
+                return cached
+        
+        metrics = self.metrics
+        service = None
+        
+        try:
             results = {}
             
+            # Model 1 + 3 chung 1 forest (multi_output=True)
+            if 'recommender_camera' in services:
+                service = 'recommender_camera'
+                model, scaler = registry.get(service)
+                feature_data = self._get_feature_data(product_id, self.feature_refs_multi, self.features_multi, service)
+                with metrics.stage("scaler_transform", service):
+                    X_multi_scaled = scaler.transform(feature_data[self.features_multi])
+                with metrics.stage("model_predict", service):
+                    overall_score, camera_rating = model.predict(X_multi_scaled)[0]
+                results['overall_score'] = round(overall_score, 1)
+                results['camera_rating'] = round(camera_rating, 1)
+                metrics.count_request(service, "success")
+            
             # Model 1: Smart Recommender
-            X_recom = feature_data_recom[self.features_recom]
-            X_recom_scaled = self.scaler_recom.transform(X_recom)
-            results['overall_score'] = round(self.model_recom.predict(X_recom_scaled)[0], 1)
+            if 'recommender' in services:
+                service = 'recommender'
+                model, scaler = registry.get(service)
+                feature_data = self._get_feature_data(product_id, self.feature_refs_recom, self.features_recom, service)
+                with metrics.stage("scaler_transform", service):
+                    X_recom_scaled = scaler.transform(feature_data[self.features_recom])
+                with metrics.stage("model_predict", service):
+                    results['overall_score'] = round(model.predict(X_recom_scaled)[0], 1)
+                metrics.count_request(service, "success")
             
             # Model 2: Value Detector
-            X_value = feature_data_value[self.features_value]
-            X_value_scaled = self.scaler_value.transform(X_value)
-            results['is_premium'] = int(self.model_value.predict(X_value_scaled)[0])
-            results['premium_prob'] = round(self.model_value.predict_proba(X_value_scaled)[0][1], 3)
+            if 'value_detector' in services:
+                service = 'value_detector'
+                model, scaler = registry.get(service)
+                feature_data = self._get_feature_data(product_id, self.feature_refs_value, self.features_value, service)
+                with metrics.stage("scaler_transform", service):
+                    X_value_scaled = scaler.transform(feature_data[self.features_value])
+                with metrics.stage("model_predict", service):
+                    results['is_premium'] = int(model.predict(X_value_scaled)[0])
+                with metrics.stage("predict_proba", service):
+                    results['premium_prob'] = round(model.predict_proba(X_value_scaled)[0][1], 3)
+                metrics.count_request(service, "success")
             
             # Model 3: Camera Predictor
-            X_camera = feature_data_camera[self.features_camera]
-            X_camera_scaled = self.scaler_camera.transform(X_camera)
-            results['camera_rating'] = round(self.model_camera.predict(X_camera_scaled)[0], 1)
+            if 'camera_predictor' in services:
+                service = 'camera_predictor'
+                model, scaler = registry.get(service)
+                feature_data = self._get_feature_data(product_id, self.feature_refs_camera, self.features_camera, service)
+                with metrics.stage("scaler_transform", service):
+                    X_camera_scaled = scaler.transform(feature_data[self.features_camera])
+                with metrics.stage("model_predict", service):
+                    results['camera_rating'] = round(model.predict(X_camera_scaled)[0], 1)
+                metrics.count_request(service, "success")
             
             return {
                 'product_id': product_id,
                 'predictions': results,
+                'source': 'live',
                 'status': 'success'
             }
             
         except Exception as e:
+            metrics.count_request(service or "unknown", "error")
             return {
                 'product_id': product_id,
                 'error': str(e),
                 'status': 'error'
             }
+    
+    def recommend_top_k(self, k=10, sort_by='overall_score', min_price=None, max_price=None,
+                        price_segments=None, **filters):
+        """Top K điện thoại theo score với filter, vd. max_price=10000000, has_ultrawide=1, has_ois=1"""
+        try:
+            if self.recommendation_engine is None:
+                from recommendation_engine import RecommendationEngine
+                self.recommendation_engine = RecommendationEngine.from_parquet()
+            
+            result = self.recommendation_engine.top_k(
+                k=k, sort_by=sort_by, min_price=min_price, max_price=max_price,
+                price_segments=price_segments, **filters
+            )
+            result['status'] = 'success'
+            return result
+            
+        except Exception as e:
+            return {
+                'error': str(e),
+                'status': 'error'
+            }
 
-# Test prediction
-print("🚀 Testing Phone Prediction Service...")
-predictor = PhonePredictor()
-multi_predictor = MultiModelPredictor()
+def _forest_bytes(model):
+    """Bytes của mảng node + value của mọi cây (TransformedTargetRegressor: forest bên trong)"""
+    forest = getattr(model, 'regressor_', model)
+    return sum(tree.tree_.__getstate__()['nodes'].nbytes + tree.tree_.value.nbytes
+               for tree in forest.estimators_)
 
-# Test với 3 điện thoại
-test_phones = ["001", "050", "100"]
 
-print("\n📱 SINGLE MODEL PREDICTION (Smart Recommender):")
-for phone_id in test_phones:
-    result = predictor.predict_phone_score(phone_id)
-    if result['status'] == 'success':
-        actual_info = f", Actual Score = {result['actual_score']}" if result['actual_score'] != 'N/A' else ""
-        print(f"   Phone {phone_id}: Predicted Score = {result['predicted_score']}{actual_info}")
-    else:
-        print(f"   ❌ Phone {phone_id}: Error - {result['error']}")
+def run_multi_output_benchmark(n_requests=300):
+    """predict_all(recommender + camera_predictor): 2 forest riêng vs 1 forest multi-output"""
+    from feature_snapshot import FeatureSnapshot
+    
+    print(f"\n🔗 MULTI-OUTPUT vs SEPARATE ({n_requests} requests, offline snapshot)")
+    # Features đọc thẳng từ parquet: không phụ thuộc online store đã materialize hay chưa
+    snapshot = FeatureSnapshot(source="offline")
+    catalog_ids = sorted(snapshot._state.row_index)
+    product_ids = [catalog_ids[i % len(catalog_ids)] for i in range(n_requests)]
+    services = ['recommender', 'camera_predictor']
+    results = {}
+    for label, multi_output in [('separate', False), ('multi', True)]:
+        predictor = MultiModelPredictor(registry=ModelRegistry(), multi_output=multi_output)
+        predictor.warm_up(services)
+        predictor.snapshot = snapshot
+        loaded = predictor.registry.loaded_services()
+        latencies = []
+        for product_id in product_ids:
+            start = time.perf_counter()
+            result = predictor.predict_all(product_id, services)
+            latencies.append(time.perf_counter() - start)
+            if result['status'] != 'success':
+                raise RuntimeError(f"{label} {product_id}: {result['error']}")
+            results.setdefault(product_id, {})[label] = result['predictions']
+        stats = predictor.registry.load_stats()['services']
+        latencies.sort()
+        print(f"   {label:9} models={loaded}  p50 {latencies[len(latencies) // 2] * 1000:6.2f} ms  "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:6.2f} ms  "
+              f"forest {sum(_forest_bytes(predictor.registry.get(s)[0]) for s in loaded) / 1e6:6.2f} MB  "
+              f"file {sum(stats[s]['file_mb'] for s in loaded):5.2f} MB  "
+              f"RSS +{sum(stats[s].get('rss_delta_mb', 0) for s in loaded):5.1f} MB")
+    
+    for target in ['overall_score', 'camera_rating']:
+        diffs = [abs(r['separate'][target] - r['multi'][target]) for r in results.values()]
+        print(f"   |separate - multi| {target}: mean {sum(diffs) / len(diffs):.3f}, max {max(diffs):.3f}")
+
+def main():
+    startup_timer = StartupTimer("predict_service")
+    warm_up = "--warmup" in sys.argv
+    if "--multi-output-benchmark" in sys.argv:
+        run_multi_output_benchmark()
+        return
+    
+    # Test prediction
+    print("🚀 Testing Phone Prediction Service...")
+    with startup_timer.phase("init predictors"):
+        predictor = PhonePredictor()
+        multi_predictor = MultiModelPredictor()
+    
+    if warm_up:
+        with startup_timer.phase("warm-up models"):
+            predictor.warm_up()
+            multi_predictor.warm_up()
+    startup_timer.mark_ready()
+    startup_timer.report()
+    start_exporter_from_env()
+    
+    # PHONE_PROFILE=1: kill -USR1 / USR2 <pid> như web app, và ghi request chậm nhất khi thoát
+    if PROFILER.enabled:
+        PROFILER.install_signal_handlers()
+        PROFILER.install_exit_hook()
+        print(f"🔥 Profiler on (pid {os.getpid()}): SIGUSR1 = slowest stacks, SIGUSR2 = memory diff")
+
+    # Test với 3 điện thoại
+    test_phones = ["001", "050", "100"]
 
-print("\n🎯 MULTI-MODEL PREDICTION (All 3 Models):")
-for phone_id in test_phones:
-    result = multi_predictor.predict_all(phone_id)
+    print("\n📱 SINGLE MODEL PREDICTION (Smart Recommender):")
+    for phone_id in test_phones:
+        result = predictor.predict_phone_score(phone_id)
+        if result['status'] == 'success':
+            actual_info = f", Actual Score = {result['actual_score']}" if result['actual_score'] != 'N/A' else ""
+            print(f"   Phone {phone_id}: Predicted Score = {result['predicted_score']}{actual_info}")
+        else:
+            print(f"   ❌ Phone {phone_id}: Error - {result['error']}")
+
+    print("\n🎯 MULTI-MODEL PREDICTION (All 3 Models):")
+    for phone_id in test_phones:
+        result = multi_predictor.predict_all(phone_id)
+        if result['status'] == 'success':
+            preds = result['predictions']
+            print(f"   Phone {phone_id}:")
+            print(f"      🤖 Overall Score: {preds['overall_score']}")
+            print(f"      💰 Premium: {preds['is_premium']} (prob: {preds['premium_prob']})")
+            print(f"      📸 Camera Rating: {preds['camera_rating']}")
+        else:
+            print(f"   ❌ Phone {phone_id}: Error - {result['error']}")
+
+    multi_predictor.registry.report()
+
+    print("\n🏆 TOP-K RECOMMENDATION (dưới 10 triệu, có ultrawide + OIS):")
+    result = multi_predictor.recommend_top_k(k=5, max_price=10000000, has_ultrawide=1, has_ois=1)
     if result['status'] == 'success':
-        preds = result['predictions']
-        print(f"   Phone {phone_id}:")
-        print(f"      🤖 Overall Score: {preds['overall_score']}")
-        print(f"      💰 Premium: {preds['is_premium']} (prob: {preds['premium_prob']})")
-        print(f"      📸 Camera Rating: {preds['camera_rating']}")
+        for item in result['results']:
+            print(f"   Phone {item['product_id']}: Score = {item['score']}, Giá = {item['price']}")
     else:
-        print(f"   ❌ Phone {phone_id}: Error - {result['error']}")
+        print(f"   ❌ Error - {result['error']}")
+
+    print("\n🎉 Prediction Service is ready!")
 
-print("\n🎉 Prediction Service is ready!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+"""
+Pre-fork prediction server: master load models + feature snapshot một lần rồi fork
+worker, các worker dùng chung page bộ nhớ của master (copy-on-write).
+
+    python prefork_server.py --workers 4 --port 8700
+    python prefork_server.py --benchmark                   # throughput + USS theo số worker
+
+Endpoint (JSON):
+    GET  /health
+    POST /predict           {"product_id": "001", "services": [...]}
+    POST /predict_features  {"services": [...], "features": {...}}   (giống predict_from_features của web app)
+    POST /predict_batch     {"services": [...], "columns": {feature: [values]}}
+
+Gradio app dùng server này khi đặt PHONE_PREDICT_BACKEND=http://127.0.0.1:8700.
+
+Models chỉ được load trong master trước khi fork và không hot reload (PHONE_MODEL_WATCH của
+Gradio bỏ qua RemotePredictor): retrain xong phải restart prefork_server để dùng model mới.
+Feature snapshot thì mỗi worker tự refresh khi có materialization mới.
+
+PHONE_METRICS_PORT=9108: worker slot i export metrics của nó trên port 9108 + i.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from multiprocessing.sharedctypes import RawArray
+
+from model_reloader import SERVICE_FEATURES, load_validation_sample
+from request_profiler import PROFILER
+from serving_metrics import start_exporter_from_env
+
+def score_frame(registry, services, frame):
+    """Giống MultiModelPredictor.predict_batch của web app: mỗi model predict 1 lần trên cả frame"""
+    import pandas as pd
+
+    missing = sorted({f for service in services for f in SERVICE_FEATURES[service] if f not in frame.columns})
+    if missing:
+        raise ValueError(f"Thiếu cột: {', '.join(missing)}")
+
+    results = pd.DataFrame(index=frame.index)
+    if 'recommender' in services:
+        model, scaler = registry.get('recommender')
+        results['predicted_overall_score'] = model.predict(scaler.transform(frame[SERVICE_FEATURES['recommender']])).round(1)
+    if 'value_detector' in services:
+        model, scaler = registry.get('value_detector')
+        X_scaled = scaler.transform(frame[SERVICE_FEATURES['value_detector']])
+        results['predicted_is_premium'] = model.predict(X_scaled).astype(int)
+        results['premium_probability'] = model.predict_proba(X_scaled)[:, 1].round(3)
+    if 'camera_predictor' in services:
+        model, scaler = registry.get('camera_predictor')
+        results['predicted_camera_rating'] = model.predict(scaler.transform(frame[SERVICE_FEATURES['camera_predictor']])).round(1)
+    return results
+
+
+def memory_usage(pid="self"):
+    """USS / PSS / RSS (bytes) từ /proc/<pid>/smaps_rollup, USS = page chỉ process này dùng"""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].isdigit():
+                    fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    except OSError:
+        return None
+    return {
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+        'pss': fields.get('Pss', 0),
+        'rss': fields.get('Rss', 0),
+    }
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    # HTTP/1.0: 1 request / connection, worker không bị giữ bởi một client keep-alive
+    server_version = "PhonePrefork/1.0"
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json({'status': 'error', 'error': 'not found'}, 404)
+            return
+        worker = self.server.worker
+        self._send_json({
+            'status': 'ok',
+            'pid': os.getpid(),
+            'worker': worker.slot,
+            'served': worker.served,
+            'loaded_services': worker.predictor.registry.loaded_services(),
+        })
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            services = payload.get('services') or list(SERVICE_FEATURES)
+            predictor = self.server.worker.predictor
+
+            if self.path == "/predict":
+                result = predictor.predict_all(payload['product_id'], services=services)
+            elif self.path == "/predict_features":
+                result = self._predict_features(predictor.registry, services, payload['features'])
+            elif self.path == "/predict_batch":
+                import pandas as pd
+                scored = score_frame(predictor.registry, services, pd.DataFrame(payload['columns']))
+                result = {'columns': scored.to_dict('list'), 'status': 'success'}
+            else:
+                self._send_json({'status': 'error', 'error': 'not found'}, 404)
+                return
+            self._send_json(result)
+        except Exception as e:
+            self._send_json({'status': 'error', 'error': str(e)}, 500)
+
+    @staticmethod
+    def _predict_features(registry, services, features):
+        import pandas as pd
+        scored = score_frame(registry, services, pd.DataFrame([features]))
+        names = {
+            'predicted_overall_score': 'overall_score',
+            'predicted_is_premium': 'is_premium',
+            'premium_probability': 'premium_probability',
+            'predicted_camera_rating': 'camera_rating',
+        }
+        # Lấy từng cột (không dùng iloc[0]: row lẫn int / float bị ép hết về float)
+        predictions = {names[column]: scored[column].iloc[0].item() for column in scored.columns}
+        return {'predictions': predictions, 'status': 'success', 'services_used': services}
+
+    def log_message(self, *args):
+        pass
+
+
+class _Worker:
+    def __init__(self, slot, predictor):
+        self.slot = slot
+        self.predictor = predictor
+        self.served = 0
+
+
+class PreforkServer:
+    """
+    Master: bind socket, load MultiModelPredictor (snapshot + 3 models), gc.freeze() rồi fork.
+
+    - Copy-on-write: sau gc.freeze() các object load trước khi fork nằm trong permanent
+      generation, GC của worker không ghi gc header lên các page đó. Dữ liệu lớn (node
+      array của cây, snapshot) là buffer numpy: đọc không đổi refcount của page dữ liệu.
+    - Health check: mỗi worker ghi heartbeat vào shared memory sau mỗi request / mỗi
+      heartbeat_interval; worker không heartbeat quá `timeout` giây (treo trong request)
+      bị SIGKILL và fork lại.
+    - Recycling: worker tự thoát sau max_requests (+ jitter để không thoát cùng lúc),
+      master fork worker mới từ bộ nhớ sạch của master.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8700, workers=None, max_requests=10000,
+                 max_requests_jitter=1000, timeout=30.0, heartbeat_interval=1.0, services=None):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.timeout = timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.services = services or list(SERVICE_FEATURES)
+        self.predictor = None
+        self.socket = None
+        self.children = {}
+        self.stats = {'spawned': 0, 'recycled': 0, 'killed': 0, 'crashed': 0}
+        self._heartbeats = RawArray('d', self.workers)
+        self._stopping = False
+
+    # ==================== MASTER ====================
+
+    def preload(self):
+        """Load mọi thứ worker cần trước khi fork (không để worker tự load = mỗi worker 1 bản copy)"""
+        from predict_service import MultiModelPredictor
+
+        # Tắt GC trong lúc load: tránh object bị dời qua các generation rồi freeze ở trạng thái lẫn lộn
+        gc.disable()
+        started = time.perf_counter()
+        # Không start refresh thread trong master: thread không tồn tại trong worker sau fork, và fork
+        # lúc thread đang đọc sqlite / pyarrow (đang giữ lock) có thể làm worker deadlock
+        self.predictor = MultiModelPredictor(use_snapshot=True, snapshot_refresh=False)
+        self.predictor.warm_up(self.services)
+        # Chạy thử batch path một lần: import + cache nội bộ của pandas / sklearn nằm sẵn trong master
+        score_frame(self.predictor.registry, self.services, load_validation_sample(n_rows=8))
+        # Snapshot được build qua fs.get_online_features: không để worker kế thừa connection sqlite
+        # (đang mở) của master, mỗi worker tự mở FeatureStore khi cần
+        self.predictor.release_feature_store()
+        gc.collect()
+        gc.freeze()
+        # Object đã freeze không bị GC quét nữa, object tạo sau này (master và worker) vẫn được thu gom
+        gc.enable()
+        print(f"📦 Master preloaded {self.services} in {(time.perf_counter() - started) * 1000:.0f} ms, "
+              f"{gc.get_freeze_count()} objects frozen")
+        return self
+
+    def bind(self):
+        self.socket = socket.create_server((self.host, self.port), backlog=1024)
+        # Non-blocking: các worker cùng select() trên 1 socket, worker accept trượt thì quay lại chờ
+        self.socket.setblocking(False)
+        self.port = self.socket.getsockname()[1]
+        return self
+
+    def _spawn(self, slot):
+        self._heartbeats[slot] = time.time()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._worker_loop(slot)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = slot
+        self.stats['spawned'] += 1
+        return pid
+
+    def _reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot = self.children.pop(pid, None)
+            if slot is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if code == 0:
+                self.stats['recycled'] += 1
+            elif code != -signal.SIGKILL:
+                self.stats['crashed'] += 1
+                print(f"⚠️  Worker {slot} (pid {pid}) exited with {code}")
+            if not self._stopping:
+                self._spawn(slot)
+
+    def _check_heartbeats(self):
+        now = time.time()
+        for pid, slot in list(self.children.items()):
+            if now - self._heartbeats[slot] > self.timeout:
+                print(f"⏱️  Worker {slot} (pid {pid}) không phản hồi {self.timeout:.0f}s, kill")
+                self.stats['killed'] += 1
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def _stop(self, *args):
+        self._stopping = True
+
+    def serve_forever(self):
+        if self.predictor is None:
+            self.preload()
+        if self.socket is None:
+            self.bind()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        for slot in range(self.workers):
+            self._spawn(slot)
+        print(f"🚀 Prefork server http://{self.host}:{self.port} ({self.workers} workers, master pid {os.getpid()})")
+
+        while not self._stopping:
+            time.sleep(self.heartbeat_interval)
+            self._reap()
+            self._check_heartbeats()
+        self.shutdown()
+
+    def shutdown(self, grace=5.0):
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.time() + grace
+        while self.children and time.time() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            self._reap()
+        self.socket.close()
+
+    def memory_report(self):
+        master = memory_usage(os.getpid())
+        workers = {pid: memory_usage(pid) for pid in self.children}
+        return {'master': master, 'workers': workers}
+
+    # ==================== WORKER ====================
+
+    def _worker_loop(self, slot):
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        random.seed()
+        gc.enable()
+        # PHONE_PROFILE=1: mỗi worker có sampler riêng (thread của master không sống qua fork),
+        # kill -USR1 <worker pid> hoặc worker thoát (recycle / SIGTERM) -> ghi request chậm nhất
+        if PROFILER.enabled:
+            PROFILER.install_signal_handlers()
+
+        # METRICS của worker (master không serve request): port PHONE_METRICS_PORT + slot
+        start_exporter_from_env(worker=slot)
+        worker = _Worker(slot, self.predictor)
+        # Refresh thread riêng của worker: snapshot theo kịp materialize / price ingestion
+        # thay vì giữ bản lúc fork tới khi worker bị recycle
+        self.predictor.start_snapshot_refresh()
+        server = HTTPServer((self.host, self.port), PredictionHandler, bind_and_activate=False)
+        server.socket.close()
+        server.socket = self.socket
+        server.worker = worker
+        limit = self.max_requests + random.randint(0, self.max_requests_jitter)
+
+        while not stopping and worker.served < limit:
+            self._heartbeats[slot] = time.time()
+            try:
+                ready, _, _ = select.select([self.socket], [], [], self.heartbeat_interval)
+            except InterruptedError:
+                continue
+            if not ready:
+                continue
+            try:
+                request, client_address = self.socket.accept()
+            except (BlockingIOError, InterruptedError):
+                # Worker khác đã accept connection này
+                continue
+            request.setblocking(True)
+            request.settimeout(self.timeout)
+            try:
+                server.finish_request(request, client_address)
+                worker.served += 1
+            except (BrokenPipeError, ConnectionResetError):
+                # Client đã đóng connection (timeout phía client) trước khi nhận response
+                pass
+            except Exception:
+                server.handle_error(request, client_address)
+            finally:
+                server.shutdown_request(request)
+        # _spawn thoát bằng os._exit (không chạy atexit): ghi profile trước khi worker kết thúc
+        if PROFILER.enabled and not PROFILER.sample_every:
+            PROFILER.dump_slowest()
+
+
+# ==================== BENCHMARK ====================
+
+def _client_load(port, duration, concurrency, sample):
+    """N client gửi /predict_features liên tục, trả về (requests, errors)"""
+    import threading
+    import http.client
+
+    rows = sample.to_dict('records')
+    counts = {'ok': 0, 'errors': 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def client(index):
+        i = index
+        while time.perf_counter() < stop:
+            body = json.dumps({'features': rows[i % len(rows)]})
+            i += 1
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                conn.request("POST", "/predict_features", body, {"Content-Type": "application/json"})
+                ok = conn.getresponse().status == 200
+                conn.close()
+            except OSError:
+                ok = False
+            with lock:
+                counts['ok' if ok else 'errors'] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def run_benchmark(workers_list=(1, 2, 4), duration=10.0, concurrency=8):
+    """
+    Throughput tổng + bộ nhớ theo số worker. So sánh USS của mỗi worker (phần không
+    chia sẻ được) với RSS của master (= chi phí nếu chạy N process độc lập).
+    """
+    sample = load_validation_sample(n_rows=64)
+    print(f"\n📊 PREFORK BENCHMARK ({duration:.0f}s, {concurrency} clients, {os.cpu_count()} CPU)")
+    print(f"   {'workers':>7} {'req/s':>8} {'errors':>7} {'master RSS':>11} {'worker USS':>11} "
+          f"{'total PSS':>10} {'N x RSS':>9}")
+
+    for n_workers in workers_list:
+        server = PreforkServer(port=0, workers=n_workers).bind()
+        pid = os.fork()
+        if pid == 0:
+            sys.stdout = open(os.devnull, "w")
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+
+        port = server.port
+        server.socket.close()
+        # Chờ master preload + fork xong
+        deadline = time.time() + 120
+        while time.time() < deadline:
+            try:
+                import urllib.request
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=60).read()
+                break
+            except OSError:
+                time.sleep(0.2)
+        time.sleep(1.0)
+
+        _client_load(port, 1.0, concurrency, sample)
+        counts = _client_load(port, duration, concurrency, sample)
+
+        master = memory_usage(pid)
+        worker_pids = [int(p) for p in open(f"/proc/{pid}/task/{pid}/children").read().split()]
+        workers = [m for m in (memory_usage(p) for p in worker_pids) if m]
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+
+        mb = 1024 * 1024
+        worker_uss = sum(m['uss'] for m in workers) / max(len(workers), 1)
+        total_pss = master['pss'] + sum(m['pss'] for m in workers)
+        print(f"   {n_workers:>7} {counts['ok'] / duration:>8.1f} {counts['errors']:>7} "
+              f"{master['rss'] / mb:>9.0f}MB {worker_uss / mb:>9.1f}MB {total_pss / mb:>8.0f}MB "
+              f"{master['rss'] * n_workers / mb:>7.0f}MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-fork prediction server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--workers", type=int, default=None, help="Mặc định = số CPU")
+    parser.add_argument("--max-requests", type=int, default=10000, help="Recycle worker sau N request")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Kill worker không heartbeat sau N giây")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        run_benchmark(duration=args.duration)
+        return
+
+    PreforkServer(host=args.host, port=args.port, workers=args.workers,
+                  max_requests=args.max_requests, timeout=args.timeout).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 from feast import FeatureStore
 import pandas as pd
 import os
-from transformer import MobilePhoneTransformer  # THÊM IMPORT NÀY
+from training_set_builder import TrainingSetBuilder
+from model_registry import (FEATURES_RECOM, TARGET_RECOM, FEATURES_VALUE, TARGET_VALUE,
+                            FEATURES_CAMERA, TARGET_CAMERA)
 
 # Path đến Feast repo
 feast_repo_path = "../my_phone_features"
@@ -9,38 +11,27 @@ fs = FeatureStore(repo_path=feast_repo_path)
 
 print("📥 Preparing COMPLETE training data...")
 
-# 🆕 SỬA: Load data GỐC và transform
-source_path = "../Data/raw/final_data_phone.csv"  # ĐƯỜNG DẪN ĐẾN DATA GỐC
-raw_data = pd.read_csv(source_path)
+# Entity DataFrame: mỗi sản phẩm tại event_timestamp của nó trong offline store
+entity_path = "../my_phone_features/data/processed/phone_data_processed.parquet"
+entity_df = pd.read_parquet(entity_path, columns=['product_id', 'event_timestamp'])
 
-print(f"📊 Raw data shape: {raw_data.shape}")
+print(f"📊 Entity rows: {entity_df.shape}")
 
-# 🆕 SỬA: Transform data với transformer
-transformer = MobilePhoneTransformer()
-data = transformer.fit_transform(raw_data)
-
-print(f"🎯 Transformed data shape: {data.shape}")
-print(f"📋 All available columns: {data.columns.tolist()}")
+# 🆕 TẤT CẢ TARGETS CHO 3 MODELS
+all_targets = [TARGET_RECOM, TARGET_VALUE, TARGET_CAMERA]
 
-# 🆕 TẤT CẢ FEATURES CHO 3 MODELS
-all_features = [
-    'ScreenSize', 'PPI', 'total_resolution',
-    'camera_score', 'has_telephoto', 'has_ultrawide', 'popularity_score', 
-    'value_score', 'price_segment',
-    'has_warranty', 'NumberOfReview',
-    'main_camera_mp', 'num_cameras', 'has_ois', 'camera_feature_count',
-    'display_score'
-]
+# 🆕 TẤT CẢ FEATURES CHO 3 MODELS (target của model này là feature của model khác: chỉ lấy 1 lần)
+all_features = [f for f in dict.fromkeys(FEATURES_RECOM + FEATURES_VALUE + FEATURES_CAMERA) if f not in all_targets]
 
-# 🆕 TẤT CẢ TARGETS CHO 3 MODELS
-all_targets = ['overall_score', 'is_premium', 'camera_rating']
+# Kiểm tra features có trong feature view nào không
+builder = TrainingSetBuilder(fs=fs, repo_path=feast_repo_path)
+view_features = {f for spec in builder.view_specs().values() for f in spec.features}
 
-# Kiểm tra features có tồn tại
-available_features = [f for f in all_features if f in data.columns]
-missing_features = [f for f in all_features if f not in data.columns]
+available_features = [f for f in all_features if f in view_features]
+missing_features = [f for f in all_features if f not in view_features]
 
-available_targets = [t for t in all_targets if t in data.columns]
-missing_targets = [t for t in all_targets if t not in data.columns]
+available_targets = [t for t in all_targets if t in view_features]
+missing_targets = [t for t in all_targets if t not in view_features]
 
 print(f"✅ Available features: {len(available_features)}")
 print(f"✅ Available targets: {available_targets}")
@@ -50,9 +41,12 @@ if missing_features:
 if missing_targets:
     print(f"❌ Missing targets: {missing_targets}")
 
-# 🆕 TẠO TRAINING DATA VỚI TẤT CẢ FEATURES & TARGETS
+# 🆕 TẠO TRAINING DATA VỚI TẤT CẢ FEATURES & TARGETS (point-in-time join, theo TTL của từng view)
+data = builder.build(entity_df, available_features + available_targets)
 training_data = data[available_features + available_targets]
 
+print(f"🎯 Joined data shape: {data.shape}")
+
 print(f"✅ Complete training data shape: {training_data.shape}")
 print(f"🎯 Features: {len(available_features)}, Targets: {len(available_targets)}")
 
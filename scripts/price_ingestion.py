@@ -0,0 +1,392 @@
+"""
+Ingest thay đổi giá theo stream: chỉ tính lại phone_value (is_premium, price_segment,
+value_score) cho các product bị đổi giá và ghi thẳng vào online store, không cần chạy
+lại transformer.py + feast materialize.
+
+    python price_ingestion.py --tail ../Data/price_events.jsonl
+    python price_ingestion.py --benchmark --events 20000 --rate 5000
+
+Mỗi event là 1 dòng JSON: {"product_id": "001", "price": 12990000, "ts": 1760000000.0}
+(ts = thời điểm giá đổi, epoch giây; thiếu ts thì lấy lúc nhận event).
+
+Chỉ ghi vào online store: phone_data_processed.parquet (offline source) không được cập nhật,
+nên lần `feast materialize` / `materialize_incremental.py --full` tiếp theo sẽ ghi đè giá
+stream bằng giá cũ trong parquet. Giá mới phải được đưa vào raw data + chạy lại transformer.py
+trước khi materialize lại.
+"""
+import argparse
+import json
+import os
+import queue
+import signal
+import threading
+import time
+from collections import deque
+import numpy as np
+
+FEAST_REPO_PATH = "../my_phone_features"
+PROCESSED_PATH = "../my_phone_features/data/processed/phone_data_processed.parquet"
+VALUE_VIEW = "phone_value"
+# Freshness percentiles tính trên N event được ghi gần nhất (process chạy lâu không giữ mọi event)
+FRESHNESS_WINDOW = 100000
+
+# Ngưỡng giá giống MobilePhoneTransformer._create_all_features
+DEFAULT_PRICE = 8000000
+BUDGET_MAX_PRICE = 8000000
+PREMIUM_MIN_PRICE = 15000000
+
+
+class ValueFeatureNormalizer:
+    """
+    Hằng số chuẩn hoá của value_score tại lần transform gần nhất.
+
+    Trong transformer.py value_score được chia cho max của cả catalog, nên nếu tính lại
+    max theo từng event thì 1 thay đổi giá có thể đổi value_score của mọi product.
+    Ingestion giữ nguyên camera_max / value_max của catalog, value_score vượt thang
+    được clip về 10 và đếm lại (nhiều overflow = nên chạy lại transform đầy đủ).
+    """
+
+    def __init__(self, camera_max, value_max):
+        self.camera_max = camera_max
+        self.value_max = value_max
+
+    @staticmethod
+    def _raw_value(prices, camera_score, display_score, camera_max):
+        feature_value = np.clip(camera_score / camera_max * 50 + display_score / 100 * 50, 0, 100)
+        price_in_millions = prices / 1000000
+        raw = np.zeros(len(prices))
+        valid = price_in_millions > 0.1
+        raw[valid] = np.round(feature_value[valid] / price_in_millions[valid], 2)
+        return raw
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        camera_score = catalog['camera_score'].fillna(0).to_numpy(dtype=float)
+        display_score = catalog['display_score'].fillna(0).to_numpy(dtype=float)
+        prices = catalog['DiscountedPrice'].fillna(DEFAULT_PRICE).to_numpy(dtype=float)
+        camera_max = max(float(camera_score.max()), 1.0)
+        raw = cls._raw_value(prices, camera_score, display_score, camera_max)
+        return cls(camera_max, float(raw.max()))
+
+    def transform(self, prices, camera_score, display_score):
+        prices = np.where(np.isnan(prices), DEFAULT_PRICE, prices)
+        raw = self._raw_value(prices, camera_score, display_score, self.camera_max)
+        value_score = np.round(raw / self.value_max * 10, 2) if self.value_max > 0 else raw
+        overflow = int((value_score > 10).sum())
+        return {
+            'value_score': np.clip(value_score, 0, 10).astype(np.float32),
+            'is_premium': (prices > PREMIUM_MIN_PRICE).astype(np.int64),
+            'price_segment': np.where(prices <= BUDGET_MAX_PRICE, 0,
+                                      np.where(prices <= PREMIUM_MIN_PRICE, 1, 2)).astype(np.int64),
+        }, overflow
+
+
+# ==================== SOURCES ====================
+
+def tail_file(path, poll_interval=0.05, from_start=False, stop=None):
+    """Đọc event mới ghi thêm vào file (giống tail -f), yield None khi chưa có gì mới"""
+    while not os.path.exists(path):
+        if stop is not None and stop.is_set():
+            return
+        yield None
+        time.sleep(poll_interval)
+
+    with open(path, "r") as f:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        buffer = ""
+        while stop is None or not stop.is_set():
+            chunk = f.readline()
+            if not chunk:
+                yield None
+                time.sleep(poll_interval)
+                continue
+            buffer += chunk
+            # Dòng đang ghi dở: chờ phần còn lại
+            if not buffer.endswith("\n"):
+                continue
+            line, buffer = buffer.strip(), ""
+            if line:
+                yield line
+
+
+def queue_source(events, poll_interval=0.05, stop=None):
+    """Event từ queue.Queue (dict hoặc JSON string), None trong queue = kết thúc"""
+    while stop is None or not stop.is_set():
+        try:
+            event = events.get(timeout=poll_interval)
+        except queue.Empty:
+            yield None
+            continue
+        if event is None:
+            return
+        yield event
+
+
+# ==================== WORKER ====================
+
+class PriceIngestionWorker:
+    """
+    Gom event giá và ghi phone_value theo lô (write-behind): flush mỗi flush_interval
+    giây hoặc khi đủ max_batch event. Nhiều event của cùng product trong 1 lô được gộp
+    lại, chỉ giá mới nhất được ghi.
+
+    Online store của Feast upsert không so event_timestamp, nên worker giữ ts đã ghi của
+    từng product (khởi tạo từ catalog) và bỏ event cũ hơn, kể cả khi nó đến ở lô sau.
+    Ghi lỗi: lô được đưa lại vào hàng đợi và thử lại sau flush_interval.
+    """
+
+    def __init__(self, fs=None, repo_path=FEAST_REPO_PATH, processed_path=PROCESSED_PATH,
+                 flush_interval=0.5, max_batch=1000, writer=None):
+        import pandas as pd
+
+        self.repo_path = repo_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._fs = fs
+        self._writer = writer
+
+        catalog = pd.read_parquet(processed_path)
+        catalog = catalog.sort_values('event_timestamp').drop_duplicates('product_id', keep='last')
+        self.normalizer = ValueFeatureNormalizer.from_catalog(catalog)
+        self._row_index = {product_id: i for i, product_id in enumerate(catalog['product_id'])}
+        self._camera_score = catalog['camera_score'].fillna(0).to_numpy(dtype=float)
+        self._display_score = catalog['display_score'].fillna(0).to_numpy(dtype=float)
+        # ts (epoch giây) của giá đang nằm trong online store, event_timestamp naive = UTC
+        catalog_times = pd.to_datetime(catalog['event_timestamp']).astype('int64') / 1e9
+        self._last_written = dict(zip(catalog['product_id'], catalog_times.tolist()))
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pending_event_times = []
+        self._last_flush = time.perf_counter()
+        self._retry_after = 0.0
+        self._freshness = deque(maxlen=FRESHNESS_WINDOW)
+        self.stats = {'events': 0, 'rows_written': 0, 'batches': 0, 'coalesced': 0, 'stale_event': 0,
+                      'unknown_product': 0, 'bad_event': 0, 'normalizer_overflow': 0, 'write_errors': 0,
+                      'flush_seconds': 0.0}
+        self._started_at = None
+
+    @property
+    def fs(self):
+        if self._fs is None:
+            from feast import FeatureStore
+            self._fs = FeatureStore(repo_path=self.repo_path)
+        return self._fs
+
+    def _write(self, frame):
+        if self._writer is not None:
+            self._writer(frame)
+        else:
+            self.fs.write_to_online_store(VALUE_VIEW, frame)
+
+    def submit(self, event):
+        """Nhận 1 event (dict hoặc JSON string), trả về True nếu cần flush ngay"""
+        received_at = time.time()
+        try:
+            if isinstance(event, str):
+                event = json.loads(event)
+            product_id = str(event['product_id'])
+            price = float(event['price']) if event.get('price') is not None else np.nan
+            event_time = float(event.get('ts') or received_at)
+        except (ValueError, KeyError, TypeError):
+            with self._lock:
+                self.stats['bad_event'] += 1
+            return False
+
+        with self._lock:
+            if self._started_at is None:
+                self._started_at = time.perf_counter()
+            self.stats['events'] += 1
+            # Product mới chưa có specs trong catalog: cần transform đầy đủ, không xử lý ở đây
+            if product_id not in self._row_index:
+                self.stats['unknown_product'] += 1
+                return False
+            newest = self._last_written.get(product_id, -np.inf)
+            if product_id in self._pending:
+                self.stats['coalesced'] += 1
+                newest = max(newest, self._pending[product_id][1])
+            # Event đến trễ (ts cũ hơn giá đang chờ ghi hoặc đã ghi) không được ghi đè giá mới hơn
+            if event_time < newest:
+                self.stats['stale_event'] += 1
+                return False
+            self._pending[product_id] = (price, event_time)
+            self._pending_event_times.append(event_time)
+            return len(self._pending_event_times) >= self.max_batch
+
+    def due(self):
+        return bool(self._pending) and time.perf_counter() - self._last_flush >= self.flush_interval
+
+    def _requeue(self, pending, event_times):
+        """Đưa lô ghi lỗi về hàng đợi, không đè event mới hơn đã đến trong lúc ghi"""
+        with self._lock:
+            for product_id, (price, event_time) in pending.items():
+                current = self._pending.get(product_id)
+                if current is None or current[1] < event_time:
+                    self._pending[product_id] = (price, event_time)
+            self._pending_event_times[:0] = event_times
+
+    def flush(self, force=False):
+        """
+        Tính lại features cho các product trong lô và ghi 1 lần vào online store.
+        Sau 1 lần ghi lỗi, các flush trong flush_interval tiếp theo bị bỏ qua (trừ force).
+        """
+        import pandas as pd
+
+        with self._lock:
+            if not force and time.perf_counter() < self._retry_after:
+                return 0
+            pending, self._pending = self._pending, {}
+            event_times, self._pending_event_times = self._pending_event_times, []
+            self._last_flush = time.perf_counter()
+        if not pending:
+            return 0
+
+        start = time.perf_counter()
+        product_ids = list(pending)
+        rows = np.fromiter((self._row_index[p] for p in product_ids), dtype=np.int64, count=len(product_ids))
+        prices = np.fromiter((pending[p][0] for p in product_ids), dtype=float, count=len(product_ids))
+        features, overflow = self.normalizer.transform(prices, self._camera_score[rows], self._display_score[rows])
+
+        frame = pd.DataFrame({'product_id': product_ids, **features})
+        frame['event_timestamp'] = pd.to_datetime([pending[p][1] for p in product_ids], unit='s', utc=True)
+        frame['created_timestamp'] = pd.Timestamp.now(tz='UTC')
+        try:
+            self._write(frame)
+        except Exception as e:
+            self._requeue(pending, event_times)
+            with self._lock:
+                self.stats['write_errors'] += 1
+                self._retry_after = time.perf_counter() + self.flush_interval
+            print(f"❌ Ghi {VALUE_VIEW} lỗi ({len(frame)} rows), thử lại sau {self.flush_interval}s: {e}")
+            return 0
+
+        written_at = time.time()
+        with self._lock:
+            for product_id in product_ids:
+                self._last_written[product_id] = max(self._last_written.get(product_id, -np.inf),
+                                                     pending[product_id][1])
+            self._freshness.extend(written_at - t for t in event_times)
+            self.stats['rows_written'] += len(frame)
+            self.stats['batches'] += 1
+            self.stats['normalizer_overflow'] += overflow
+            self.stats['flush_seconds'] += time.perf_counter() - start
+        return len(frame)
+
+    def run(self, source):
+        """Chạy tới khi source kết thúc, flush theo thời gian hoặc kích thước lô"""
+        for event in source:
+            if event is not None and self.submit(event):
+                self.flush()
+            elif self.due():
+                self.flush()
+        self.flush(force=True)
+        return self.report()
+
+    def report(self):
+        with self._lock:
+            freshness = np.array(self._freshness) * 1000
+            stats = dict(self.stats, pending_rows=len(self._pending))
+            elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+
+        result = {
+            **stats,
+            'flush_seconds': round(stats['flush_seconds'], 3),
+            'elapsed_s': round(elapsed, 2),
+            'events_per_s': round(stats['events'] / elapsed, 1) if elapsed > 0 else 0,
+            'mean_batch_rows': round(stats['rows_written'] / stats['batches'], 1) if stats['batches'] else 0,
+            'normalizer': {'camera_max': self.normalizer.camera_max, 'value_max': self.normalizer.value_max},
+        }
+        if len(freshness):
+            result['freshness_ms'] = {
+                'p50': round(float(np.percentile(freshness, 50)), 1),
+                'p95': round(float(np.percentile(freshness, 95)), 1),
+                'p99': round(float(np.percentile(freshness, 99)), 1),
+                'max': round(float(freshness.max()), 1),
+            }
+        return result
+
+
+# ==================== BENCHMARK ====================
+
+def run_benchmark(n_events=20000, rate=5000.0, repo_path=FEAST_REPO_PATH, processed_path=PROCESSED_PATH,
+                  flush_interval=0.5, max_batch=1000):
+    """
+    Producer thread phát event giá với tốc độ cố định vào queue, worker ghi vào online store.
+    Giá được phát lại đúng bằng giá trong catalog nên nội dung online store không đổi.
+    """
+    import pandas as pd
+
+    catalog = pd.read_parquet(processed_path, columns=['product_id', 'DiscountedPrice'])
+    product_ids = catalog['product_id'].tolist()
+    prices = catalog['DiscountedPrice'].fillna(DEFAULT_PRICE).tolist()
+    rng = np.random.default_rng(42)
+    picks = rng.integers(len(product_ids), size=n_events)
+
+    worker = PriceIngestionWorker(repo_path=repo_path, processed_path=processed_path,
+                                  flush_interval=flush_interval, max_batch=max_batch)
+    worker.fs.list_feature_views()
+    events = queue.Queue()
+
+    def producer():
+        start = time.perf_counter()
+        for i, pick in enumerate(picks):
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            events.put({'product_id': product_ids[pick], 'price': prices[pick], 'ts': time.time()})
+        events.put(None)
+
+    threading.Thread(target=producer, daemon=True).start()
+    report = worker.run(queue_source(events))
+
+    print(f"\n📊 PRICE INGESTION ({n_events} events @ {rate:.0f}/s, flush {flush_interval}s / {max_batch} events)")
+    print(json.dumps(report, indent=2))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming price ingestion -> phone_value online features")
+    parser.add_argument("--tail", help="File JSON lines để theo dõi")
+    parser.add_argument("--from-start", action="store_true", help="Đọc cả các dòng đã có trong file")
+    parser.add_argument("--repo-path", default=FEAST_REPO_PATH)
+    parser.add_argument("--processed-path", default=PROCESSED_PATH)
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    parser.add_argument("--max-batch", type=int, default=1000)
+    parser.add_argument("--report-every", type=float, default=10.0, help="In report mỗi N giây")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=5000.0)
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        return run_benchmark(args.events, args.rate, args.repo_path, args.processed_path,
+                             args.flush_interval, args.max_batch)
+    if not args.tail:
+        parser.error("--tail hoặc --benchmark")
+
+    worker = PriceIngestionWorker(repo_path=args.repo_path, processed_path=args.processed_path,
+                                  flush_interval=args.flush_interval, max_batch=args.max_batch)
+    # Load Feast trước khi đọc event: lần flush đầu không phải chờ import + registry
+    worker.fs.get_feature_view(VALUE_VIEW)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+
+    def print_reports():
+        while not stop.wait(args.report_every):
+            print(json.dumps(worker.report()))
+
+    threading.Thread(target=print_reports, daemon=True).start()
+    print(f"👀 Tailing {args.tail} -> {VALUE_VIEW}")
+    try:
+        # SIGTERM: tail_file dừng, run() flush phần còn lại rồi trả về
+        worker.run(tail_file(args.tail, from_start=args.from_start, stop=stop))
+    except KeyboardInterrupt:
+        worker.flush()
+    finally:
+        stop.set()
+        print(json.dumps(worker.report(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
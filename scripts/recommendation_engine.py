@@ -0,0 +1,239 @@
+import time
+import numpy as np
+import pandas as pd
+
+PROCESSED_PATH = "../my_phone_features/data/processed/phone_data_processed.parquet"
+
+# Phân khúc giá giống MobilePhoneTransformer (0: budget, 1: mid_range, 2: premium)
+SEGMENT_PRICE_RANGES = {
+    0: (0, 8000000),
+    1: (8000000, 15000000),
+    2: (15000000, np.inf),
+}
+
+SORTABLE_SCORES = ['overall_score', 'value_score']
+
+FILTER_COLUMNS = [
+    'has_telephoto', 'has_ultrawide', 'has_ois', 'has_warranty',
+    'main_camera_mp', 'num_cameras', 'ScreenSize', 'camera_rating', 'price_segment'
+]
+
+
+class RecommendationEngine:
+    """
+    Top-K phone query engine over the processed catalog.
+
+    Catalog được giữ dạng columnar (1 numpy array / cột). Với mỗi price_segment
+    có sẵn index đã sort giảm dần theo overall_score và value_score, nên query
+    "top K theo score + filter" chỉ cần duyệt prefix của các segment phù hợp
+    cho đến khi đủ K kết quả thay vì scan cả catalog.
+    """
+
+    def __init__(self, catalog):
+        # Giữ bản ghi mới nhất của mỗi product
+        if 'event_timestamp' in catalog.columns:
+            catalog = catalog.sort_values('event_timestamp').drop_duplicates('product_id', keep='last')
+
+        self.size = len(catalog)
+        self.product_ids = catalog['product_id'].to_numpy(dtype=object)
+        self.names = catalog['Name'].to_numpy(dtype=object) if 'Name' in catalog.columns else None
+
+        self.columns = {}
+        for col in SORTABLE_SCORES + FILTER_COLUMNS + ['DiscountedPrice']:
+            if col in catalog.columns:
+                self.columns[col] = np.ascontiguousarray(catalog[col].to_numpy(dtype=np.float64, na_value=np.nan))
+        # Giá Liên Hệ: transformer điền 0 -> coi như chưa có giá (NaN), không thỏa filter giá nào
+        price = self.columns['DiscountedPrice']
+        price[price <= 0] = np.nan
+
+        # Sorted index cho từng (score, segment): row ids giảm dần theo score
+        segments = self.columns['price_segment'].astype(np.int64)
+        self.sorted_index = {}
+        for score in SORTABLE_SCORES:
+            for segment in SEGMENT_PRICE_RANGES:
+                rows = np.flatnonzero(segments == segment)
+                order = np.argsort(-self.columns[score][rows], kind='stable')
+                self.sorted_index[(score, segment)] = rows[order]
+        # Segment có product chưa có giá luôn phải check giá từng dòng khi có filter giá
+        self.unpriced_segments = set(np.unique(segments[np.isnan(price)]).tolist())
+
+    @classmethod
+    def from_parquet(cls, path=PROCESSED_PATH):
+        return cls(pd.read_parquet(path))
+
+    def _candidate_segments(self, min_price, max_price, price_segments):
+        """Segment nào có thể chứa kết quả, và segment đó có cần check giá từng dòng không"""
+        candidates = []
+        for segment, (low, high) in SEGMENT_PRICE_RANGES.items():
+            if price_segments is not None and segment not in price_segments:
+                continue
+            if max_price is not None and low >= max_price:
+                continue
+            if min_price is not None and high < min_price:
+                continue
+            # Segment nằm trọn trong khoảng giá và mọi product đều có giá -> không cần check giá
+            needs_price_check = (
+                (max_price is not None and high > max_price) or
+                (min_price is not None and low < min_price) or
+                ((max_price is not None or min_price is not None) and segment in self.unpriced_segments)
+            )
+            candidates.append((segment, needs_price_check))
+        return candidates
+
+    def _match_mask(self, rows, filters, price_range):
+        mask = np.ones(len(rows), dtype=bool)
+        if price_range is not None:
+            min_price, max_price = price_range
+            price = self.columns['DiscountedPrice'][rows]
+            # Giá NaN (Giá Liên Hệ, kể cả giá 0 từ transformer) so sánh luôn False: không thỏa filter giá
+            if max_price is not None:
+                mask &= price <= max_price
+            if min_price is not None:
+                mask &= price >= min_price
+        for col, (low, high) in filters.items():
+            values = self.columns[col][rows]
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return mask
+
+    def top_k(self, k=10, sort_by='overall_score', min_price=None, max_price=None,
+              price_segments=None, **filters):
+        """
+        Top K phones by sort_by that satisfy all filters.
+
+        filters: column=value (bằng) hoặc column=(min, max), vd. has_ois=1, main_camera_mp=(48, None)
+        """
+        if sort_by not in SORTABLE_SCORES:
+            raise ValueError(f"sort_by must be one of {SORTABLE_SCORES}")
+
+        range_filters = {}
+        for col, value in filters.items():
+            if value is None:
+                continue
+            if col not in self.columns:
+                raise ValueError(f"Unknown filter column: {col}")
+            range_filters[col] = tuple(value) if isinstance(value, (tuple, list)) else (value, value)
+
+        scores = self.columns[sort_by]
+        matched_rows = []
+        scanned = 0
+
+        for segment, needs_price_check in self._candidate_segments(min_price, max_price, price_segments):
+            index = self.sorted_index[(sort_by, segment)]
+            price_range = (min_price, max_price) if needs_price_check else None
+
+            # Duyệt prefix theo từng chunk (tăng dần) cho tới khi đủ k kết quả
+            found = []
+            n_found = 0
+            start = 0
+            chunk = max(4 * k, 64)
+            while start < len(index) and n_found < k:
+                rows = index[start:start + chunk]
+                hits = rows[self._match_mask(rows, range_filters, price_range)]
+                found.append(hits)
+                n_found += len(hits)
+                scanned += len(rows)
+                start += chunk
+                chunk *= 2
+
+            if found:
+                matched_rows.append(np.concatenate(found)[:k])
+
+        if not matched_rows:
+            return {'results': [], 'scanned': scanned, 'catalog_size': self.size}
+
+        # Merge top-k của từng segment
+        rows = np.concatenate(matched_rows)
+        rows = rows[np.argsort(-scores[rows], kind='stable')[:k]]
+
+        results = []
+        for row in rows:
+            item = {
+                'product_id': self.product_ids[row],
+                'score': round(float(scores[row]), 2),
+                'price': None if np.isnan(self.columns['DiscountedPrice'][row]) else int(self.columns['DiscountedPrice'][row]),
+            }
+            if self.names is not None:
+                item['name'] = self.names[row]
+            results.append(item)
+
+        return {'results': results, 'scanned': scanned, 'catalog_size': self.size}
+
+
+def make_synthetic_catalog(n_rows, seed=42):
+    """Catalog giả lập với phân phối gần giống data thật"""
+    rng = np.random.default_rng(seed)
+    price = rng.lognormal(mean=np.log(9000000), sigma=0.7, size=n_rows).round(-4)
+    return pd.DataFrame({
+        'product_id': np.char.zfill(np.arange(1, n_rows + 1).astype(str), 3).astype(object),
+        'DiscountedPrice': price,
+        'price_segment': np.select([price <= 8000000, price <= 15000000], [0, 1], default=2),
+        'overall_score': rng.normal(60, 10, n_rows).round(1),
+        'value_score': rng.gamma(2.0, 1.0, n_rows).round(2),
+        'has_telephoto': (rng.random(n_rows) < 0.25).astype(int),
+        'has_ultrawide': (rng.random(n_rows) < 0.6).astype(int),
+        'has_ois': (rng.random(n_rows) < 0.4).astype(int),
+        'has_warranty': (rng.random(n_rows) < 0.3).astype(int),
+        'main_camera_mp': rng.choice([12, 48, 50, 64, 108, 200], n_rows).astype(float),
+        'num_cameras': rng.integers(1, 5, n_rows),
+        'ScreenSize': rng.uniform(5.5, 7.0, n_rows).round(2),
+        'camera_rating': rng.uniform(1, 5, n_rows).round(1),
+    })
+
+
+def run_benchmark(sizes=(2000, 200000, 2000000), n_queries=50):
+    queries = {
+        "under 10M + ultrawide + OIS": dict(max_price=10000000, has_ultrawide=1, has_ois=1),
+        "premium + telephoto (value)": dict(sort_by='value_score', price_segments=[2], has_telephoto=1),
+        "camera >= 108MP": dict(main_camera_mp=(108, None)),
+    }
+
+    print(f"\n📊 TOP-10 QUERY LATENCY (ms, median of {n_queries})")
+    print(f"   {'rows':>9}  {'query':32} {'engine':>8} {'full scan':>10} {'scanned':>9}")
+    for n_rows in sizes:
+        catalog = make_synthetic_catalog(n_rows)
+        build_start = time.perf_counter()
+        engine = RecommendationEngine(catalog)
+        build_time = time.perf_counter() - build_start
+
+        for name, query in queries.items():
+            timings = []
+            for _ in range(n_queries):
+                start = time.perf_counter()
+                result = engine.top_k(k=10, **query)
+                timings.append(time.perf_counter() - start)
+
+            # Baseline: pandas boolean mask trên toàn catalog + nlargest
+            sort_by = query.get('sort_by', 'overall_score')
+            baseline = []
+            for _ in range(max(n_queries // 10, 3)):
+                start = time.perf_counter()
+                mask = np.ones(len(catalog), dtype=bool)
+                if 'max_price' in query:
+                    mask &= catalog['DiscountedPrice'] <= query['max_price']
+                if 'price_segments' in query:
+                    mask &= catalog['price_segment'].isin(query['price_segments'])
+                for col in ['has_ultrawide', 'has_ois', 'has_telephoto']:
+                    if col in query:
+                        mask &= catalog[col] == query[col]
+                if 'main_camera_mp' in query:
+                    mask &= catalog['main_camera_mp'] >= query['main_camera_mp'][0]
+                catalog[mask].nlargest(10, sort_by)
+                baseline.append(time.perf_counter() - start)
+
+            print(f"   {n_rows:>9,}  {name:32} {np.median(timings) * 1000:>8.3f} "
+                  f"{np.median(baseline) * 1000:>10.3f} {result['scanned']:>9,}")
+        print(f"   {n_rows:>9,}  (index build: {build_time:.2f}s)")
+
+
+if __name__ == "__main__":
+    engine = RecommendationEngine.from_parquet()
+    result = engine.top_k(k=5, max_price=10000000, has_ultrawide=1, has_ois=1)
+    print("📱 Best phones under 10M VND with ultrawide + OIS:")
+    for item in result['results']:
+        print(f"   {item['product_id']}: {item.get('name')} - {item['price']:,} VND (score {item['score']})")
+    print(f"   Scanned {result['scanned']}/{result['catalog_size']} rows")
+
+    run_benchmark()
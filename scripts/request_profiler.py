@@ -0,0 +1,267 @@
+"""
+Profiling opt-in cho process chạy lâu (Gradio app, prediction service).
+
+    PHONE_PROFILE=1                  bật (tắt: chỉ tốn 1 lần check bool / request)
+    PHONE_PROFILE_DIR=../profiles    nơi ghi file
+    PHONE_PROFILE_EVERY=K            profile 1 / K request, ghi file ngay sau mỗi request
+    PHONE_PROFILE_SLOWEST=N          (mặc định khi không đặt EVERY) giữ stack của N request chậm nhất
+    PHONE_PROFILE_INTERVAL=0.005     chu kỳ lấy mẫu (giây)
+
+Stack được ghi dạng collapsed ("a;b;c <count>"), dùng trực tiếp với flamegraph.pl / speedscope.
+kill -USR1 <pid>: ghi N request chậm nhất, kill -USR2 <pid>: tracemalloc snapshot + diff.
+Process gọi install_exit_hook() còn tự ghi N request chậm nhất khi thoát.
+"""
+import atexit
+import functools
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "profiles")
+
+
+def _collapse(frame):
+    """Stack từ root -> frame hiện tại, mỗi frame là file:function"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class RequestSample:
+    def __init__(self, name):
+        self.name = name
+        self.stacks = Counter()
+        self.duration = None
+
+
+class RequestProfiler:
+    """
+    Sampling profiler theo request: một thread nền đọc sys._current_frames()
+    của các thread đang xử lý request đã được chọn, không dùng sys.setprofile
+    nên code được profile chạy ở tốc độ gần như bình thường.
+    """
+
+    def __init__(self, output_dir=DEFAULT_PROFILE_DIR, enabled=True, sample_every=None,
+                 keep_slowest=5, interval=0.005):
+        self.output_dir = output_dir
+        self.enabled = enabled
+        self.sample_every = sample_every
+        self.keep_slowest = keep_slowest
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active = {}
+        self._slowest = []
+        self._counter = itertools.count()
+        self._sampler = None
+        self._tracemalloc_baseline = None
+        self._tracemalloc_previous = None
+
+    @classmethod
+    def from_env(cls):
+        every = os.environ.get("PHONE_PROFILE_EVERY")
+        return cls(
+            output_dir=os.environ.get("PHONE_PROFILE_DIR", DEFAULT_PROFILE_DIR),
+            enabled=os.environ.get("PHONE_PROFILE") == "1",
+            sample_every=int(every) if every else None,
+            keep_slowest=int(os.environ.get("PHONE_PROFILE_SLOWEST", 5)),
+            interval=float(os.environ.get("PHONE_PROFILE_INTERVAL", 0.005))
+        )
+
+    # ==================== SAMPLING ====================
+
+    def _ensure_sampler(self):
+        if self._sampler is None:
+            with self._lock:
+                if self._sampler is None:
+                    self._sampler = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+                    self._sampler.start()
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.interval)
+            if not self._active:
+                continue
+            with self._lock:
+                active = list(self._active.items())
+            frames = sys._current_frames()
+            for ident, sample in active:
+                frame = frames.get(ident)
+                if frame is not None:
+                    sample.stacks[_collapse(frame)] += 1
+            del frames
+
+    def _should_sample(self, seq):
+        if self.sample_every:
+            return seq % self.sample_every == 0
+        # Chế độ N chậm nhất: phải lấy mẫu mọi request vì chưa biết request nào sẽ chậm
+        return self.keep_slowest > 0
+
+    def call(self, name, fn, *args, **kwargs):
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        seq = next(self._counter)
+        if not self._should_sample(seq):
+            return fn(*args, **kwargs)
+
+        self._ensure_sampler()
+        ident = threading.get_ident()
+        sample = RequestSample(name)
+        start = time.perf_counter()
+        with self._lock:
+            self._active[ident] = sample
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            sample.duration = time.perf_counter() - start
+            with self._lock:
+                self._active.pop(ident, None)
+            self._finish(seq, sample)
+
+    def _finish(self, seq, sample):
+        if self.sample_every:
+            self.write_collapsed(sample, f"{sample.name}_req{seq}")
+            return
+        with self._lock:
+            entry = (sample.duration, seq, sample)
+            if len(self._slowest) < self.keep_slowest:
+                heapq.heappush(self._slowest, entry)
+            elif sample.duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    # ==================== OUTPUT ====================
+
+    def _path(self, label, suffix):
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}_{label}.{suffix}")
+
+    def write_collapsed(self, sample, label):
+        path = self._path(f"{label}_{sample.duration * 1000:.0f}ms", "folded")
+        with open(path, "w") as f:
+            for stack, count in sample.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def dump_slowest(self):
+        """Ghi stack của N request chậm nhất (mỗi request 1 file + 1 file gộp), rồi reset"""
+        with self._lock:
+            slowest = sorted(self._slowest, reverse=True)
+            self._slowest = []
+        if not slowest:
+            return []
+
+        paths = []
+        merged = RequestSample("slowest")
+        merged.duration = sum(duration for duration, _, _ in slowest)
+        for rank, (duration, seq, sample) in enumerate(slowest, 1):
+            paths.append(self.write_collapsed(sample, f"slow{rank}_{sample.name}_req{seq}"))
+            merged.stacks.update(sample.stacks)
+        paths.append(self.write_collapsed(merged, f"slowest{len(slowest)}_merged"))
+        print(f"🔥 Profiler: {len(slowest)} request chậm nhất -> {self.output_dir}")
+        return paths
+
+    # ==================== MEMORY ====================
+
+    def memory_snapshot(self, top=30, frames=10):
+        """
+        tracemalloc snapshot + diff. Lần gọi đầu chỉ bật tracing và lấy baseline
+        (tracemalloc không thấy allocation trước khi bật), các lần sau ghi
+        snapshot và diff so với baseline và lần trước. Khi đang trace, code cấp phát
+        nhiều (predict RandomForest) chậm đi rõ rệt: chỉ bật trong lúc điều tra.
+        """
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._tracemalloc_baseline = self._tracemalloc_previous = tracemalloc.take_snapshot()
+            print(f"🧠 tracemalloc bật ({frames} frames), gửi lại để lấy diff")
+            return None
+
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        snapshot.dump(self._path("memory", "tracemalloc"))
+        current, peak = tracemalloc.get_traced_memory()
+
+        path = self._path("memory_diff", "txt")
+        with open(path, "w") as f:
+            f.write(f"traced current={current / 1e6:.1f} MB peak={peak / 1e6:.1f} MB\n")
+            for title, reference in (("since previous", self._tracemalloc_previous),
+                                     ("since baseline", self._tracemalloc_baseline)):
+                f.write(f"\n== Top {top} {title} ==\n")
+                for stat in snapshot.compare_to(reference, "lineno")[:top]:
+                    f.write(f"{stat}\n")
+        self._tracemalloc_previous = snapshot
+        print(f"🧠 Memory diff -> {path}")
+        return path
+
+    def install_exit_hook(self):
+        """Ghi N request chậm nhất khi process thoát bình thường (không có tác dụng với os._exit)"""
+        if self.enabled and not self.sample_every:
+            atexit.register(self.dump_slowest)
+        return self.enabled
+
+    def reset_after_fork(self):
+        """
+        Trong process con sau fork: thread lấy mẫu của process cha không tồn tại, lock có thể
+        đang bị giữ, sample là của cha. Tạo lại trạng thái, sampler start ở request đầu tiên
+        """
+        self._lock = threading.Lock()
+        self._active = {}
+        self._slowest = []
+        self._sampler = None
+
+    def install_signal_handlers(self):
+        """SIGUSR1: dump N request chậm nhất, SIGUSR2: memory snapshot (chỉ gọi từ main thread)"""
+        import signal
+
+        if not hasattr(signal, "SIGUSR1") or threading.current_thread() is not threading.main_thread():
+            return False
+        # Ghi file ở thread riêng: signal handler chạy chen giữa code của main thread
+        signal.signal(signal.SIGUSR1, lambda *_: threading.Thread(target=self.dump_slowest).start())
+        signal.signal(signal.SIGUSR2, lambda *_: threading.Thread(target=self.memory_snapshot).start())
+        return True
+
+
+PROFILER = RequestProfiler.from_env()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=PROFILER.reset_after_fork)
+
+
+def profiled(name):
+    """Decorator: profile hàm theo PROFILER (không làm gì khi PHONE_PROFILE != 1)"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return fn(*args, **kwargs)
+            return PROFILER.call(name, fn, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def measure_overhead(n=200000):
+    """Chi phí thêm cho mỗi lần gọi hàm đã decorate khi profiler tắt"""
+    def noop():
+        return None
+
+    wrapped = profiled("noop")(noop)
+    start = time.perf_counter()
+    for _ in range(n):
+        noop()
+    base = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(n):
+        wrapped()
+    return (time.perf_counter() - start - base) / n
+
+
+if __name__ == "__main__":
+    print(f"⏱️  Overhead khi tắt: {measure_overhead() * 1e9:.0f} ns / request")
@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Bucket (giây) cho latency: 50µs -> 10s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        # Bucket counts không cộng dồn, cộng dồn khi render
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class ServingMetrics:
+    """
+    Metrics in-process cho serving path, render theo Prometheus text format.
+
+    - {prefix}_stage_latency_seconds{stage, service}: histogram từng bước
+      (get_online_features, to_df, scaler_transform, model_predict, predict_proba, ...)
+    - {prefix}_requests_total{service, status}
+    - {prefix}_feature_lookups_total{source, result}: snapshot / feast / precomputed, hit / miss
+      (precomputed: stale khi model_version khác model đang load)
+
+    Mỗi observe chỉ là một bisect + vài phép cộng dưới một lock (~1-2 µs).
+    """
+
+    def __init__(self, prefix="phone", enabled=True):
+        self.prefix = prefix
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, stage, service, seconds):
+        if not self.enabled:
+            return
+        key = (('service', service), ('stage', stage))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def stage(self, stage, service="all"):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, service, time.perf_counter() - start)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def count_request(self, service, status):
+        self.inc("requests_total", service=service, status=status)
+
+    def count_lookup(self, source, hit):
+        self.inc("feature_lookups_total", source=source, result="hit" if hit else "miss")
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    # ==================== EXPORT ====================
+
+    def render(self):
+        """Prometheus text exposition format"""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        name = f"{self.prefix}_stage_latency_seconds"
+        lines.append(f"# HELP {name} Latency of each serving stage")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, (counts, total, count, buckets) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for counter_name in sorted({key[0] for key in counters}):
+            name = f"{self.prefix}_{counter_name}"
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == counter_name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Ghi ra file (node_exporter textfile collector), rename để không bị đọc dở"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def start_http_server(self, port=9108, host="127.0.0.1"):
+        """GET /metrics trên một thread nền"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"📈 Metrics: http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+    def start_textfile_writer(self, path, interval=15):
+        def loop():
+            while True:
+                self.write_textfile(path)
+                time.sleep(interval)
+
+        threading.Thread(target=loop, name="metrics-textfile", daemon=True).start()
+
+
+# Instance dùng chung cho cả process (PHONE_METRICS_DISABLED=1 để tắt)
+METRICS = ServingMetrics(enabled=os.environ.get("PHONE_METRICS_DISABLED") != "1")
+
+_exporter_started = False
+
+
+def start_exporter_from_env(worker=None):
+    """
+    PHONE_METRICS_PORT: mở /metrics, PHONE_METRICS_FILE: ghi file định kỳ.
+    
+    worker: slot của prefork worker, mỗi worker export METRICS của chính nó trên
+    port PHONE_METRICS_PORT + slot và file <PHONE_METRICS_FILE>.worker<slot>.prom
+    """
+    global _exporter_started
+    if _exporter_started:
+        return
+    _exporter_started = True
+    if os.environ.get("PHONE_METRICS_PORT"):
+        METRICS.start_http_server(int(os.environ["PHONE_METRICS_PORT"]) + (worker or 0))
+    if os.environ.get("PHONE_METRICS_FILE"):
+        path = os.environ["PHONE_METRICS_FILE"]
+        if worker is not None:
+            path = f"{os.path.splitext(path)[0]}.worker{worker}.prom"
+        METRICS.start_textfile_writer(path)
+
+
+def measure_overhead(n=200000):
+    """Chi phí của một lần đo stage (context manager + observe)"""
+    metrics = ServingMetrics()
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics.stage("noop", "bench"):
+            pass
+    return (time.perf_counter() - start) / n
+
+
+if __name__ == "__main__":
+    print(f"⏱️  Overhead per stage: {measure_overhead() * 1e6:.2f} µs")
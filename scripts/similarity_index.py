@@ -0,0 +1,289 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.neighbors import KDTree
+
+from model_registry import FEATURES_RECOM, FEATURES_CAMERA, MODELS_DIR
+from precompute_predictions import PROCESSED_PATH
+
+INDEX_PATH = "../models/similarity_index.pkl"
+
+# Camera/display features chưa có trong input của scaler_recommender
+EXTRA_CAMERA_FEATURES = ['main_camera_mp', 'num_cameras', 'has_ois', 'camera_feature_count']
+
+
+def build_catalog_vectors(catalog, models_dir=MODELS_DIR):
+    """
+    Vector chuẩn hóa cho mỗi phone: input của scaler_recommender + các camera
+    features bổ sung (chuẩn hóa bằng scaler_camera)
+    """
+    scaler_recom = joblib.load(os.path.join(models_dir, "scaler_recommender.pkl"))
+    scaler_camera = joblib.load(os.path.join(models_dir, "scaler_camera.pkl"))
+
+    recom_part = scaler_recom.transform(catalog[FEATURES_RECOM])
+    camera_scaled = scaler_camera.transform(catalog[FEATURES_CAMERA])
+    camera_cols = [FEATURES_CAMERA.index(f) for f in EXTRA_CAMERA_FEATURES]
+
+    vectors = np.hstack([recom_part, camera_scaled[:, camera_cols]])
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+class SimilarPhoneIndex:
+    """
+    Nearest-neighbour index over phone feature vectors.
+
+    method="exact": KDTree, dùng cho catalog nhỏ.
+    method="ivf": approximate, k-means coarse quantizer + int8 scalar quantization,
+    probe n_probe cluster gần nhất rồi rerank bằng vector float32.
+    method="auto": exact nếu catalog < exact_threshold.
+
+    add() cập nhật index tăng dần: exact mode giữ buffer brute-force và rebuild
+    KDTree khi buffer vượt rebuild_ratio, ivf mode gán vector mới vào cluster gần nhất.
+    Row cũ của product được cập nhật thành tombstone (query phải lấy dư bù lại), khi số
+    tombstone vượt rebuild_ratio số row còn dùng thì compact() build lại index.
+    """
+
+    def __init__(self, method="auto", exact_threshold=50000, n_probe=8, rerank_factor=4, rebuild_ratio=0.1):
+        self.method = method
+        self.exact_threshold = exact_threshold
+        self.n_probe = n_probe
+        self.rerank_factor = rerank_factor
+        self.rebuild_ratio = rebuild_ratio
+
+        self.product_ids = []
+        self.row_index = {}
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.deleted = np.zeros(0, dtype=bool)
+        self.n_deleted = 0
+        self.active_method = None
+
+        # exact
+        self.tree = None
+        self.tree_size = 0
+
+        # ivf
+        self.centroids = None
+        self.lists = None
+        self.codes = None
+        self.code_offset = None
+        self.code_scale = None
+
+    # ==================== BUILD ====================
+
+    def build(self, product_ids, vectors):
+        self.product_ids = list(product_ids)
+        self.row_index = {pid: row for row, pid in enumerate(self.product_ids)}
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.deleted = np.zeros(len(self.product_ids), dtype=bool)
+        self.n_deleted = 0
+
+        if self.method == "auto":
+            self.active_method = "exact" if len(self.product_ids) < self.exact_threshold else "ivf"
+        else:
+            self.active_method = self.method
+
+        if self.active_method == "exact":
+            self._build_tree()
+        else:
+            self._build_ivf()
+        return self
+
+    def _build_tree(self):
+        self.tree = KDTree(self.vectors, leaf_size=40)
+        self.tree_size = len(self.vectors)
+
+    def _build_ivf(self):
+        n_lists = max(int(np.sqrt(len(self.vectors))), 1)
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, batch_size=4096, n_init=3, random_state=42)
+        assignments = kmeans.fit_predict(self.vectors)
+        self.centroids = kmeans.cluster_centers_.astype(np.float32)
+
+        # Scalar quantization int8 theo từng chiều
+        self.code_offset = self.vectors.min(axis=0)
+        self.code_scale = np.maximum(self.vectors.max(axis=0) - self.code_offset, 1e-6) / 255.0
+        self.codes = self._encode(self.vectors)
+
+        order = np.argsort(assignments, kind="stable")
+        boundaries = np.searchsorted(assignments[order], np.arange(n_lists + 1))
+        self.lists = [order[boundaries[i]:boundaries[i + 1]] for i in range(n_lists)]
+
+    def _encode(self, vectors):
+        codes = np.round((vectors - self.code_offset) / self.code_scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def _decode(self, codes):
+        return codes.astype(np.float32) * self.code_scale + self.code_offset
+
+    # ==================== INCREMENTAL UPDATE ====================
+
+    def add(self, product_ids, vectors):
+        """Thêm (hoặc cập nhật) products mà không rebuild toàn bộ index"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        start = len(self.product_ids)
+
+        for pid in product_ids:
+            # Product đã tồn tại -> đánh dấu row cũ là deleted
+            old_row = self.row_index.get(pid)
+            if old_row is not None and not self.deleted[old_row]:
+                self.deleted[old_row] = True
+                self.n_deleted += 1
+
+        self.product_ids.extend(product_ids)
+        for offset, pid in enumerate(product_ids):
+            self.row_index[pid] = start + offset
+        self.vectors = np.vstack([self.vectors, vectors]) if len(self.vectors) else vectors
+        self.deleted = np.concatenate([self.deleted, np.zeros(len(product_ids), dtype=bool)])
+
+        if self.n_deleted > self.rebuild_ratio * (len(self.vectors) - self.n_deleted):
+            return self.compact()
+        if self.active_method == "exact":
+            pending = len(self.vectors) - self.tree_size
+            if pending > self.rebuild_ratio * self.tree_size:
+                self._build_tree()
+        else:
+            new_rows = np.arange(start, start + len(product_ids))
+            assignments = self._nearest_centroids(vectors, 1)[:, 0]
+            self.codes = np.vstack([self.codes, self._encode(vectors)])
+            for list_id in np.unique(assignments):
+                self.lists[list_id] = np.concatenate([self.lists[list_id], new_rows[assignments == list_id]])
+        return self
+
+    def compact(self):
+        """Bỏ các row deleted và build lại index trên các row còn dùng"""
+        live = np.flatnonzero(~self.deleted)
+        return self.build([self.product_ids[row] for row in live], self.vectors[live])
+
+    # ==================== QUERY ====================
+
+    def _nearest_centroids(self, vectors, n):
+        distances = ((vectors[:, np.newaxis, :] - self.centroids[np.newaxis, :, :]) ** 2).sum(axis=2)
+        n = min(n, len(self.centroids))
+        return np.argpartition(distances, n - 1, axis=1)[:, :n]
+
+    def _query_exact(self, vector, k):
+        n_tree = min(k, self.tree_size)
+        distances, rows = self.tree.query(vector[np.newaxis, :], k=n_tree)
+        rows, distances = rows[0], distances[0]
+
+        # Buffer các vector thêm sau lần build KDTree cuối: brute force
+        if len(self.vectors) > self.tree_size:
+            pending = np.arange(self.tree_size, len(self.vectors))
+            pending_dist = np.sqrt(((self.vectors[pending] - vector) ** 2).sum(axis=1))
+            rows = np.concatenate([rows, pending])
+            distances = np.concatenate([distances, pending_dist])
+        return rows, distances
+
+    def _query_ivf(self, vector, k):
+        probe = self._nearest_centroids(vector[np.newaxis, :], self.n_probe)[0]
+        candidates = np.concatenate([self.lists[list_id] for list_id in probe])
+        if len(candidates) == 0:
+            return candidates, np.empty(0)
+
+        # Khoảng cách xấp xỉ trên vector int8, rồi rerank exact top candidates
+        approx = ((self._decode(self.codes[candidates]) - vector) ** 2).sum(axis=1)
+        n_rerank = min(k * self.rerank_factor, len(candidates))
+        shortlist = candidates[np.argpartition(approx, n_rerank - 1)[:n_rerank]]
+        distances = np.sqrt(((self.vectors[shortlist] - vector) ** 2).sum(axis=1))
+        return shortlist, distances
+
+    def query_vector(self, vector, k=10, exclude_row=None):
+        vector = np.asarray(vector, dtype=np.float32)
+        # Lấy dư để bù cho các row deleted / chính product đang query
+        n_fetch = k + 1 + self.n_deleted
+        if self.active_method == "exact":
+            rows, distances = self._query_exact(vector, n_fetch)
+        else:
+            rows, distances = self._query_ivf(vector, n_fetch)
+
+        keep = ~self.deleted[rows]
+        if exclude_row is not None:
+            keep &= rows != exclude_row
+        rows, distances = rows[keep], distances[keep]
+        order = np.argsort(distances, kind="stable")[:k]
+        return [(self.product_ids[row], round(float(distance), 4))
+                for row, distance in zip(rows[order], distances[order])]
+
+    def similar(self, product_id, k=10):
+        """k phones gần nhất với product_id: list (product_id, distance)"""
+        row = self.row_index.get(product_id)
+        if row is None:
+            raise KeyError(f"Unknown product_id: {product_id}")
+        return self.query_vector(self.vectors[row], k=k, exclude_row=row)
+
+    # ==================== PERSISTENCE ====================
+
+    def save(self, path=INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump(self, path)
+        print(f"💾 Saved similarity index: {path} ({len(self.product_ids)} phones, {self.active_method})")
+
+    @staticmethod
+    def load(path=INDEX_PATH):
+        return joblib.load(path)
+
+
+def build_catalog_index(processed_path=PROCESSED_PATH, index_path=INDEX_PATH, method="auto"):
+    catalog = pd.read_parquet(processed_path)
+    catalog = catalog.sort_values('event_timestamp').drop_duplicates('product_id', keep='last')
+
+    vectors = build_catalog_vectors(catalog)
+    index = SimilarPhoneIndex(method=method).build(catalog['product_id'].tolist(), vectors)
+    index.save(index_path)
+    return index
+
+
+def _brute_force(vectors, query, k, exclude_row):
+    distances = ((vectors - query) ** 2).sum(axis=1)
+    distances[exclude_row] = np.inf
+    top = np.argpartition(distances, k)[:k]
+    return set(top[np.argsort(distances[top])].tolist())
+
+
+def run_benchmark(sizes=(2000, 200000), k=10, n_queries=200, dim=15):
+    print(f"\n📊 SIMILARITY BENCHMARK (k={k}, {n_queries} queries, dim={dim})")
+    print(f"   {'rows':>8} {'method':>6} {'build (s)':>10} {'recall@k':>9} {'index (ms)':>11} {'brute (ms)':>11}")
+    rng = np.random.default_rng(42)
+
+    for n_rows in sizes:
+        # Gaussian mixture: giống cụm các dòng máy trong catalog thật
+        centers = rng.normal(0, 2, (50, dim))
+        vectors = (centers[rng.integers(0, 50, n_rows)] + rng.normal(0, 0.5, (n_rows, dim))).astype(np.float32)
+        product_ids = [str(i).zfill(3) for i in range(n_rows)]
+        query_rows = rng.choice(n_rows, n_queries, replace=False)
+
+        methods = ["exact", "ivf"] if n_rows <= 50000 else ["ivf"]
+        for method in methods:
+            start = time.perf_counter()
+            index = SimilarPhoneIndex(method=method).build(product_ids, vectors)
+            build_time = time.perf_counter() - start
+
+            recalls, index_times, brute_times = [], [], []
+            for row in query_rows:
+                start = time.perf_counter()
+                result = index.similar(product_ids[row], k=k)
+                index_times.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                truth = _brute_force(vectors, vectors[row], k, row)
+                brute_times.append(time.perf_counter() - start)
+
+                found = {int(pid) for pid, _ in result}
+                recalls.append(len(found & truth) / k)
+
+            print(f"   {n_rows:>8,} {method:>6} {build_time:>10.2f} {np.mean(recalls):>9.3f} "
+                  f"{np.median(index_times) * 1000:>11.3f} {np.median(brute_times) * 1000:>11.3f}")
+
+
+if __name__ == "__main__":
+    print("🚀 Building similar-phone index...")
+    index = build_catalog_index()
+
+    for phone_id in ["001", "050"]:
+        print(f"\n📱 Phones similar to {phone_id}:")
+        for pid, distance in index.similar(phone_id, k=5):
+            print(f"   {pid}: distance={distance}")
+
+    run_benchmark()
@@ -0,0 +1,47 @@
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """
+    Đo thời gian từng bước khởi động (import, load model, build UI, ...)
+    và in bảng breakdown tới lúc service "ready".
+    """
+
+    def __init__(self, name="startup"):
+        self.name = name
+        self.started_at = time.perf_counter()
+        self.phases = []
+        self.ready_after = None
+
+    @contextmanager
+    def phase(self, label):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((label, time.perf_counter() - start))
+
+    def mark_ready(self):
+        self.ready_after = time.perf_counter() - self.started_at
+        return self.ready_after
+
+    def as_dict(self):
+        total = self.ready_after if self.ready_after is not None else time.perf_counter() - self.started_at
+        return {
+            'name': self.name,
+            'phases_ms': {label: round(elapsed * 1000, 1) for label, elapsed in self.phases},
+            'ready_ms': round(total * 1000, 1),
+        }
+
+    def report(self):
+        total = self.ready_after if self.ready_after is not None else time.perf_counter() - self.started_at
+        measured = sum(elapsed for _, elapsed in self.phases)
+
+        print(f"\n⏱️  STARTUP BREAKDOWN ({self.name})")
+        for label, elapsed in self.phases:
+            share = elapsed / total * 100 if total > 0 else 0
+            print(f"   {label:30} {elapsed * 1000:9.1f} ms  {share:5.1f}%")
+        print(f"   {'(other)':30} {max(total - measured, 0) * 1000:9.1f} ms")
+        print(f"   {'READY after':30} {total * 1000:9.1f} ms")
+        return self.as_dict()
@@ -6,33 +6,33 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error, r2_score, accuracy_score, classification_report
 import joblib
 import os
+import sys
+from training_loader import load_model_data
+from model_registry import (FEATURES_RECOM, TARGET_RECOM, FEATURES_VALUE, TARGET_VALUE,
+                            FEATURES_CAMERA, TARGET_CAMERA)
 
 os.makedirs("../models", exist_ok=True)
 
 print("🚀 Training All 3 Phone Prediction Models...")
 
-# Load training data
+# Mỗi model chỉ đọc cột của nó (column projection) thẳng vào mảng float32
 data_path = "../my_phone_features/data/training_data.parquet"
-data = pd.read_parquet(data_path)
-print(f"📊 Training data: {data.shape}")
+print(f"📊 Training data: {data_path}")
 
 # ==================== MODEL 1: SMART RECOMMENDER ====================
 print("\n🤖 1. Training Smart Recommender...")
 
-recommender_features = [
-    'ScreenSize', 'PPI', 'total_resolution',
-    'camera_score', 'has_telephoto', 'has_ultrawide',
-    'popularity_score', 'value_score', 'price_segment',
-    'has_warranty', 'NumberOfReview'
-]
-recommender_target = 'overall_score'
+recommender_features = FEATURES_RECOM
+recommender_target = TARGET_RECOM
 
 print(f"   🎯 Predicting: {recommender_target}")
 print(f"   📊 Features: {len(recommender_features)}")
 
 # Prepare data
-X_recom = data[recommender_features]
-y_recom = data[recommender_target]
+recom_data = load_model_data(data_path, recommender_features, recommender_target)
+X_recom = recom_data.as_frame()
+y_recom = recom_data.y
+print(f"   📥 Read {recom_data.stats['bytes_read'] / 1024:.0f} KB, X {X_recom.shape} float32")
 
 print(f"   📈 Target stats: min={y_recom.min():.1f}, max={y_recom.max():.1f}, mean={y_recom.mean():.1f}")
 
@@ -73,22 +73,19 @@ print("   💾 Saved: model_recommender.pkl")
 print("\n💰 2. Training Value Detector...")
 
 # Features cho value detection
-value_features = [
-    'value_score', 'price_segment', 'overall_score', 
-    'display_score', 'camera_rating', 'PPI', 'ScreenSize',
-    'camera_score', 'main_camera_mp', 'NumberOfReview'
-]
-value_target = 'is_premium'
+value_features = FEATURES_VALUE
+value_target = TARGET_VALUE
 
 # Filter available features
-available_value_features = [f for f in value_features if f in data.columns]
+value_data = load_model_data(data_path, value_features, value_target, drop_missing=True, target_dtype=np.int64)
+available_value_features = value_data.features
 
-X_value = data[available_value_features]
-y_value = data[value_target]
+X_value = value_data.as_frame()
+y_value = value_data.y
 
 print(f"   🎯 Predicting: {value_target}")
 print(f"   📊 Features: {len(available_value_features)}")
-print(f"   📈 Class balance: {y_value.value_counts().to_dict()}")
+print(f"   📈 Class balance: {pd.Series(y_value).value_counts().to_dict()}")
 
 # Train/test split
 X_train_val, X_test_val, y_train_val, y_test_val = train_test_split(
@@ -121,19 +118,15 @@ print("   💾 Saved: model_value.pkl")
 print("\n📸 3. Training Camera Predictor...")
 
 # Features cho camera prediction
-camera_features = [
-    'main_camera_mp', 'num_cameras', 'has_telephoto', 
-    'has_ultrawide', 'has_ois', 'camera_feature_count',
-    'PPI', 'total_resolution', 'ScreenSize',
-    'value_score', 'is_premium', 'NumberOfReview'
-]
-camera_target = 'camera_rating'
+camera_features = FEATURES_CAMERA
+camera_target = TARGET_CAMERA
 
 # Filter available features
-available_camera_features = [f for f in camera_features if f in data.columns]
+camera_data = load_model_data(data_path, camera_features, camera_target, drop_missing=True)
+available_camera_features = camera_data.features
 
-X_camera = data[available_camera_features]
-y_camera = data[camera_target]
+X_camera = camera_data.as_frame()
+y_camera = camera_data.y
 
 print(f"   🎯 Predicting: {camera_target}")
 print(f"   📊 Features: {len(available_camera_features)}")
@@ -165,6 +158,60 @@ joblib.dump(model_camera, "../models/model_camera.pkl")
 joblib.dump(scaler_camera, "../models/scaler_camera.pkl")
 print("   💾 Saved: model_camera.pkl")
 
+# ==================== MODEL 4 (TUỲ CHỌN): RECOMMENDER + CAMERA MULTI-OUTPUT ====================
+# python train_all_models.py --multi-output
+# 1 forest trên hợp features của model 1 và 3, predict overall_score + camera_rating trong 1 lần duyệt
+if "--multi-output" in sys.argv:
+    from sklearn.compose import TransformedTargetRegressor
+
+    print("\n🔗 4. Training Recommender + Camera (multi-output)...")
+
+    multi_features = list(dict.fromkeys(recommender_features + available_camera_features))
+    multi_targets = [recommender_target, camera_target]
+    multi_data = load_model_data(data_path, multi_features, multi_targets)
+    X_multi = multi_data.as_frame()
+    y_multi = multi_data.y
+
+    print(f"   🎯 Predicting: {multi_targets}")
+    print(f"   📊 Features: {len(multi_features)}")
+
+    # Cùng test_size / random_state -> cùng test rows với model 1 và 3
+    X_train_multi, X_test_multi, y_train_multi, y_test_multi = train_test_split(
+        X_multi, y_multi, test_size=0.2, random_state=42
+    )
+
+    scaler_multi = StandardScaler()
+    X_train_multi_scaled = scaler_multi.fit_transform(X_train_multi)
+    X_test_multi_scaled = scaler_multi.transform(X_test_multi)
+
+    # Chuẩn hóa cả 2 target: split criterion cộng MSE của các output, không chuẩn hóa thì
+    # overall_score (std ~9) lấn át camera_rating (std ~0.6)
+    model_multi = TransformedTargetRegressor(
+        regressor=RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42, n_jobs=-1),
+        transformer=StandardScaler()
+    )
+    model_multi.fit(X_train_multi_scaled, y_train_multi)
+
+    y_pred_multi = model_multi.predict(X_test_multi_scaled)
+    r2_multi_recom = r2_score(y_test_multi[:, 0], y_pred_multi[:, 0])
+    r2_multi_camera = r2_score(y_test_multi[:, 1], y_pred_multi[:, 1])
+
+    nodes_separate = sum(tree.tree_.node_count for tree in model_recom.estimators_ + model_camera.estimators_)
+    nodes_multi = sum(tree.tree_.node_count for tree in model_multi.regressor_.estimators_)
+
+    print(f"   {'':16} {'separate':>10} {'multi':>10}")
+    print(f"   {'R² overall':16} {r2_recom:10.3f} {r2_multi_recom:10.3f}")
+    print(f"   {'R² camera':16} {r2_camera:10.3f} {r2_multi_camera:10.3f}")
+    print(f"   {'Trees':16} {200:10d} {100:10d}")
+    print(f"   {'Tree nodes':16} {nodes_separate:10,} {nodes_multi:10,}")
+
+    joblib.dump(model_multi, "../models/model_recommender_camera.pkl")
+    joblib.dump(scaler_multi, "../models/scaler_recommender_camera.pkl")
+    size_separate = sum(os.path.getsize(f"../models/{f}") for f in ["model_recommender.pkl", "model_camera.pkl"])
+    size_multi = os.path.getsize("../models/model_recommender_camera.pkl")
+    print(f"   {'File MB':16} {size_separate / 1e6:10.2f} {size_multi / 1e6:10.2f}")
+    print("   💾 Saved: model_recommender_camera.pkl (dùng với MultiModelPredictor(multi_output=True))")
+
 print(f"\n🎉 ALL 3 MODELS TRAINED SUCCESSFULLY!")
 print("   🤖 Smart Recommender - overall_score prediction")
 print("   💰 Value Detector - is_premium classification") 
@@ -0,0 +1,248 @@
+"""
+Đọc training data theo từng model: chỉ các cột feature + target của model đó (Parquet column
+projection), thẳng vào mảng float32 liên tục thay vì đọc cả file vào 1 DataFrame rồi slice / copy.
+
+    recom = load_model_data(TRAINING_DATA_PATH, *MODEL_COLUMNS['recommender'])
+    recent = load_model_data(path, features, target, filters=[('event_timestamp', '>=', cutoff)])
+
+    python training_loader.py --benchmark --rows 1000000
+"""
+import argparse
+import operator
+import os
+import time
+import numpy as np
+from model_registry import (FEATURES_RECOM, TARGET_RECOM, FEATURES_VALUE, TARGET_VALUE,
+                            FEATURES_CAMERA, TARGET_CAMERA)
+
+TRAINING_DATA_PATH = "../my_phone_features/data/training_data.parquet"
+
+# Features + target của từng model
+MODEL_COLUMNS = {
+    'recommender': (FEATURES_RECOM, TARGET_RECOM),
+    'value': (FEATURES_VALUE, TARGET_VALUE),
+    'camera': (FEATURES_CAMERA, TARGET_CAMERA),
+}
+
+_OPERATORS = {
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt,
+    '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+}
+_COMPUTE_FUNCTIONS = {
+    '==': 'equal', '!=': 'not_equal', '<': 'less',
+    '<=': 'less_equal', '>': 'greater', '>=': 'greater_equal',
+}
+
+
+class ModelData:
+    def __init__(self, X, y, features, target, stats):
+        self.X = X
+        self.y = y
+        self.features = features
+        self.target = target
+        self.stats = stats
+
+    def as_frame(self):
+        """X dạng DataFrame không copy (1 block float32), để scaler giữ feature_names_in_ như trước"""
+        import pandas as pd
+        return pd.DataFrame(self.X, columns=self.features, copy=False)
+
+
+def _row_group_may_match(row_group, schema_index, filters):
+    """False khi min/max của row group chắc chắn không thoả filter (bỏ qua không đọc)"""
+    for column, op, value in filters:
+        statistics = row_group.column(schema_index[column]).statistics
+        if statistics is None or not statistics.has_min_max:
+            continue
+        low, high = statistics.min, statistics.max
+        if op == 'in':
+            if not any(low <= v <= high for v in value):
+                return False
+        elif op == '==' and not low <= value <= high:
+            return False
+        elif op in ('<', '<=') and not _OPERATORS[op](low, value):
+            return False
+        elif op in ('>', '>=') and not _OPERATORS[op](high, value):
+            return False
+    return True
+
+
+def _bytes_read(metadata, schema_index, row_groups, columns):
+    """Footer + column chunk (đã nén) của các cột / row group được đọc = số byte đọc từ disk"""
+    total = metadata.serialized_size + 8
+    for i in row_groups:
+        row_group = metadata.row_group(i)
+        total += sum(row_group.column(schema_index[column]).total_compressed_size for column in columns)
+    return total
+
+
+def _filter_mask(table, filters):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    mask = None
+    for column, op, value in filters:
+        if op == 'in':
+            condition = pc.is_in(table[column], value_set=pa.array(value))
+        else:
+            compare = getattr(pc, _COMPUTE_FUNCTIONS[op])
+            condition = compare(table[column], pa.scalar(value, type=table.schema.field(column).type))
+        mask = condition if mask is None else pc.and_(mask, condition)
+    return mask
+
+
+def load_model_data(path, features, target, filters=None, drop_missing=False, target_dtype=np.float32):
+    """
+    Đọc features + target của 1 model. X: float32 C-contiguous (n_rows, n_features).
+    target: 1 cột, hoặc list cột cho model multi-output (y shape (n_rows, n_targets)).
+
+    filters: [(column, op, value)], op trong ==, !=, <, <=, >, >=, in. Row group bị loại theo
+    statistics min/max (không đọc từ disk), các dòng còn lại được lọc chính xác sau khi đọc.
+    drop_missing: bỏ feature không có trong file thay vì báo lỗi.
+    """
+    import pyarrow.parquet as pq
+
+    filters = list(filters or [])
+    targets = [target] if isinstance(target, str) else list(target)
+    started = time.perf_counter()
+    with pq.ParquetFile(path) as parquet_file:
+        metadata = parquet_file.metadata
+        names = parquet_file.schema_arrow.names
+
+        missing = [f for f in features + targets if f not in names]
+        if missing and (not drop_missing or any(t in missing for t in targets)):
+            raise KeyError(f"{path}: thiếu cột {missing}")
+        features = [f for f in features if f in names]
+        for column, op, _ in filters:
+            if column not in names or (op not in _OPERATORS and op != 'in'):
+                raise ValueError(f"Filter không hợp lệ: {column} {op}")
+
+        schema_index = {name: i for i, name in enumerate(parquet_file.schema.names)}
+        row_groups = [i for i in range(metadata.num_row_groups)
+                      if _row_group_may_match(metadata.row_group(i), schema_index, filters)]
+        filter_columns = [column for column, _, _ in filters if column not in features and column not in targets]
+        columns = list(dict.fromkeys(features + targets + filter_columns))
+        table = parquet_file.read_row_groups(row_groups, columns=columns)
+
+    if filters:
+        table = table.filter(_filter_mask(table, filters))
+
+    # Ghi từng cột vào mảng float32 đã cấp phát sẵn: không qua DataFrame, không có bản float64 trung gian
+    X = np.empty((table.num_rows, len(features)), dtype=np.float32)
+    for j, feature in enumerate(features):
+        X[:, j] = table.column(feature).to_numpy()
+    if isinstance(target, str):
+        y = np.ascontiguousarray(table.column(target).to_numpy(), dtype=target_dtype)
+    else:
+        y = np.empty((table.num_rows, len(targets)), dtype=target_dtype)
+        for j, column in enumerate(targets):
+            y[:, j] = table.column(column).to_numpy()
+
+    stats = {
+        'rows': table.num_rows,
+        'row_groups_read': len(row_groups),
+        'row_groups_total': metadata.num_row_groups,
+        'bytes_read': _bytes_read(metadata, schema_index, row_groups, columns),
+        'file_bytes': os.path.getsize(path),
+        'array_bytes': X.nbytes + y.nbytes,
+        'elapsed_s': time.perf_counter() - started,
+    }
+    return ModelData(X, y, features, target, stats)
+
+
+# ==================== BENCHMARK ====================
+
+def write_synthetic_training_data(path, n_rows, extra_columns=40, row_group_size=100000, seed=42):
+    """
+    Training data giả lập catalog lớn: các cột của 3 model + extra_columns cột không model nào
+    dùng + event_timestamp tăng dần (mỗi row group ~ 1 khoảng thời gian, giống partition theo ngày).
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for features, target in MODEL_COLUMNS.values():
+        for column in features + [target]:
+            columns[column] = rng.random(n_rows) * 100
+    columns['is_premium'] = rng.integers(0, 2, size=n_rows)
+    for i in range(extra_columns):
+        columns[f'extra_{i}'] = rng.random(n_rows)
+    frame = pd.DataFrame(columns)
+    frame['event_timestamp'] = pd.Timestamp('2025-01-01') + pd.to_timedelta(
+        np.sort(rng.random(n_rows)) * 365, unit='D')
+    frame.to_parquet(path, index=False, row_group_size=row_group_size)
+    return frame['event_timestamp'].quantile(0.75)
+
+
+def _load_full(path, features, target):
+    """Cách cũ của train_all_models.py: đọc cả file, slice, StandardScaler copy ra float64"""
+    import pandas as pd
+
+    data = pd.read_parquet(path)
+    X = data[features].to_numpy(dtype=np.float64)
+    y = data[target].to_numpy()
+    return X, y
+
+
+def _measure(mode, path, model, filters):
+    """Chạy trong process riêng (spawn) để peak memory của mỗi lần đọc không lẫn nhau"""
+    import tracemalloc
+    import pyarrow as pa
+
+    features, target = MODEL_COLUMNS[model]
+    pool = pa.default_memory_pool()
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mode == 'full':
+        X, y = _load_full(path, features, target)
+        bytes_read = os.path.getsize(path)
+    else:
+        data = load_model_data(path, features, target, filters=filters)
+        X, bytes_read = data.X, data.stats['bytes_read']
+    elapsed = time.perf_counter() - start
+    _, numpy_peak = tracemalloc.get_traced_memory()
+    return {
+        'rows': len(X), 'elapsed_s': elapsed, 'bytes_read': bytes_read,
+        'arrow_peak': pool.max_memory(), 'numpy_peak': numpy_peak,
+    }
+
+
+def run_benchmark(n_rows=1000000, extra_columns=40, path="/tmp/training_data_benchmark.parquet"):
+    import multiprocessing
+
+    print(f"\n📦 TRAINING DATA LOADER ({n_rows:,} rows, {extra_columns} cột không dùng)")
+    cutoff = write_synthetic_training_data(path, n_rows, extra_columns)
+    print(f"   File: {os.path.getsize(path) / 1e6:.1f} MB")
+
+    cases = [('full', None, 'pandas full read'), ('projected', None, 'projection'),
+             ('projected', [('event_timestamp', '>=', cutoff)], 'projection + 25% mới nhất')]
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for model in MODEL_COLUMNS:
+            print(f"\n   {model}")
+            for mode, filters, label in cases:
+                r = pool.apply(_measure, (mode, path, model, filters))
+                print(f"   {label:<28} {r['rows']:>9,} rows {r['elapsed_s']:6.2f}s  "
+                      f"read {r['bytes_read'] / 1e6:7.1f} MB  peak arrow {r['arrow_peak'] / 1e6:7.1f} MB  "
+                      f"peak numpy {r['numpy_peak'] / 1e6:6.1f} MB")
+    os.remove(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đọc training data theo từng model (column projection)")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--extra-columns", type=int, default=40)
+    parser.add_argument("--path", default=TRAINING_DATA_PATH)
+    args = parser.parse_args(argv)
+    if args.benchmark:
+        run_benchmark(args.rows, args.extra_columns)
+        return
+    for model, (features, target) in MODEL_COLUMNS.items():
+        data = load_model_data(args.path, features, target, drop_missing=True)
+        print(f"{model}: X={data.X.shape} {data.X.dtype}, read {data.stats['bytes_read']:,} / "
+              f"{data.stats['file_bytes']:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Point-in-time join để build training set từ offline store (FileSource của các feature view).
+
+Với mỗi dòng (product_id, event_timestamp, labels...) của entity DataFrame, lấy giá trị
+feature mới nhất có timestamp <= event_timestamp và không cũ hơn TTL của view, giống
+get_historical_features của Feast nhưng chạy vectorized trên cột NumPy:
+
+    builder = TrainingSetBuilder()
+    training = builder.build(entity_df, ["phone_display:PPI", "camera_score", ...])
+
+    python training_set_builder.py --benchmark --rows 1000000
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+
+FEAST_REPO_PATH = "../my_phone_features"
+ENTITY_KEY = "product_id"
+TIMESTAMP_FIELD = "event_timestamp"
+
+
+def _to_ns(values):
+    """datetime (naive = UTC, hoặc có timezone) -> int64 nanoseconds UTC"""
+    series = pd.to_datetime(pd.Series(values))
+    if series.dt.tz is not None:
+        series = series.dt.tz_convert("UTC").dt.tz_localize(None)
+    return series.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+
+
+class ViewSpec:
+    def __init__(self, name, features, ttl, source_path, timestamp_field, created_timestamp_column):
+        self.name = name
+        self.features = features
+        # TTL 0 / None = không giới hạn (giống Feast)
+        self.ttl_ns = int(ttl.total_seconds() * 1e9) if ttl else None
+        self.source_path = source_path
+        self.timestamp_field = timestamp_field
+        self.created_timestamp_column = created_timestamp_column
+
+
+class _SortedSource:
+    """
+    Một FileSource đã sort theo (product code, timestamp), dùng chung cho mọi view đọc từ source đó.
+    Mỗi (product, timestamp) chỉ giữ bản ghi có created_timestamp mới nhất.
+    """
+
+    def __init__(self, frame, timestamp_field, created_timestamp_column):
+        sort_columns = [ENTITY_KEY, timestamp_field]
+        if created_timestamp_column and created_timestamp_column in frame.columns:
+            sort_columns.append(created_timestamp_column)
+        frame = frame.sort_values(sort_columns, kind="stable")
+        frame = frame.drop_duplicates([ENTITY_KEY, timestamp_field], keep="last").reset_index(drop=True)
+
+        self.frame = frame
+        self.keys = pd.Index(frame[ENTITY_KEY].astype(str).unique())
+        self.codes = self.keys.get_indexer(frame[ENTITY_KEY].astype(str))
+        self.timestamps = _to_ns(frame[timestamp_field])
+
+    def asof_index(self, entity_codes, entity_timestamps):
+        """
+        Vị trí bản ghi mới nhất có cùng product và timestamp <= entity timestamp, -1 nếu không có.
+
+        Timestamp đổi ra rank = số timestamp của source <= nó, nên source_ts <= entity_ts
+        tương đương rank <= rank và (code, rank) gộp được thành một khoá int64 đã sort:
+        một lần np.searchsorted cho toàn bộ entity rows.
+        """
+        source_timestamps = np.unique(self.timestamps)
+        stride = len(source_timestamps) + 1
+        source_keys = self.codes.astype(np.int64) * stride + np.searchsorted(source_timestamps, self.timestamps, side="right")
+        entity_keys = entity_codes.astype(np.int64) * stride + np.searchsorted(source_timestamps, entity_timestamps, side="right")
+
+        positions = np.searchsorted(source_keys, entity_keys, side="right") - 1
+        valid = (entity_codes >= 0) & (positions >= 0)
+        valid[valid] &= self.codes[positions[valid]] == entity_codes[valid]
+        return np.where(valid, positions, -1)
+
+
+class TrainingSetBuilder:
+    def __init__(self, fs=None, repo_path=FEAST_REPO_PATH):
+        self.repo_path = repo_path
+        self._fs = fs
+        self._specs = None
+        self._sources = {}
+
+    @property
+    def fs(self):
+        if self._fs is None:
+            from feast import FeatureStore
+            self._fs = FeatureStore(repo_path=self.repo_path)
+        return self._fs
+
+    def view_specs(self):
+        """Feature view + TTL + FileSource từ registry của Feast"""
+        if self._specs is None:
+            self._specs = {}
+            for feature_view in self.fs.list_feature_views():
+                source = feature_view.batch_source
+                path = getattr(source, "path", None)
+                if path is None:
+                    continue
+                if not os.path.isabs(path) and "://" not in path:
+                    path = os.path.join(self.repo_path, path)
+                self._specs[feature_view.name] = ViewSpec(
+                    feature_view.name, [field.name for field in feature_view.features], feature_view.ttl,
+                    path, source.timestamp_field, source.created_timestamp_column
+                )
+        return self._specs
+
+    def resolve_features(self, features=None):
+        """"view:feature" hoặc chỉ "feature" (tìm view chứa nó) -> {view: [features]}"""
+        specs = self.view_specs()
+        if features is None:
+            return {name: list(spec.features) for name, spec in specs.items()}
+
+        by_view = {}
+        for ref in features:
+            if ":" in ref:
+                view, feature = ref.split(":", 1)
+                if view not in specs or feature not in specs[view].features:
+                    raise ValueError(f"Unknown feature: {ref}")
+            else:
+                feature = ref
+                views = [name for name, spec in specs.items() if feature in spec.features]
+                if not views:
+                    raise ValueError(f"Unknown feature: {ref}")
+                view = views[0]
+            by_view.setdefault(view, []).append(feature)
+        return by_view
+
+    def _source(self, spec):
+        key = (spec.source_path, spec.timestamp_field, spec.created_timestamp_column)
+        if key not in self._sources:
+            # Đọc 1 lần cho tất cả view của source (5 view đều đọc phone_data_processed.parquet)
+            columns = sorted({f for s in self.view_specs().values() if s.source_path == spec.source_path
+                              for f in s.features})
+            columns += [ENTITY_KEY, spec.timestamp_field]
+            if spec.created_timestamp_column:
+                columns.append(spec.created_timestamp_column)
+            frame = pd.read_parquet(spec.source_path, columns=list(dict.fromkeys(columns)))
+            self._sources[key] = _SortedSource(frame, spec.timestamp_field, spec.created_timestamp_column)
+        return self._sources[key]
+
+    def build(self, entity_df, features=None, full_feature_names=False):
+        """
+        entity_df: product_id, event_timestamp (+ labels). Trả về entity_df (giữ thứ tự dòng)
+        + các cột feature, NaN khi không có giá trị trong khoảng TTL.
+        """
+        specs = self.view_specs()
+        entity_timestamps = _to_ns(entity_df[TIMESTAMP_FIELD])
+        entity_keys = entity_df[ENTITY_KEY].astype(str).to_numpy()
+
+        columns = {}
+        positions_cache = {}
+        for view, view_features in self.resolve_features(features).items():
+            spec = specs[view]
+            source = self._source(spec)
+            if id(source) not in positions_cache:
+                entity_codes = source.keys.get_indexer(entity_keys)
+                positions_cache[id(source)] = source.asof_index(entity_codes, entity_timestamps)
+            positions = positions_cache[id(source)]
+
+            valid = positions >= 0
+            if spec.ttl_ns is not None:
+                age = entity_timestamps - source.timestamps[np.where(valid, positions, 0)]
+                valid &= age <= spec.ttl_ns
+            take = np.where(valid, positions, 0)
+
+            for feature in view_features:
+                values = source.frame[feature].to_numpy()
+                column = values[take]
+                if not valid.all():
+                    column = column.astype(np.float64) if column.dtype.kind in "biuf" else column.astype(object)
+                    column[~valid] = np.nan
+                columns[f"{view}__{feature}" if full_feature_names else feature] = column
+        # Dựng DataFrame từ dict array (copy=False): không copy / gộp block 1M x N lần nữa
+        entity_columns = {column: entity_df[column].to_numpy() for column in entity_df.columns}
+        return pd.DataFrame({**entity_columns, **columns}, copy=False)
+
+
+# ==================== BENCHMARK ====================
+
+def synthetic_entity_df(source_path, n_rows, seed=42):
+    """n_rows (product_id, event_timestamp, label) rải đều quanh khoảng thời gian của source"""
+    rng = np.random.default_rng(seed)
+    source = pd.read_parquet(source_path, columns=[ENTITY_KEY, TIMESTAMP_FIELD])
+    start, end = source[TIMESTAMP_FIELD].min(), source[TIMESTAMP_FIELD].max()
+    span = (end - start) + pd.Timedelta(days=365)
+    product_ids = source[ENTITY_KEY].unique()
+    return pd.DataFrame({
+        ENTITY_KEY: product_ids[rng.integers(len(product_ids), size=n_rows)],
+        TIMESTAMP_FIELD: start + pd.to_timedelta(rng.random(n_rows) * span.total_seconds(), unit="s"),
+        'label': rng.random(n_rows),
+    })
+
+
+def _merge_asof_join(builder, entity_df, by_view):
+    """Baseline: pandas merge_asof(by=product_id) cho từng view"""
+    specs = builder.view_specs()
+    result = entity_df.reset_index(drop=True).assign(_row=np.arange(len(entity_df))).sort_values(TIMESTAMP_FIELD)
+    result[ENTITY_KEY] = result[ENTITY_KEY].astype(str)
+    for view, features in by_view.items():
+        spec = specs[view]
+        source = builder._source(spec).frame[[ENTITY_KEY, spec.timestamp_field] + features]
+        source = source.rename(columns={spec.timestamp_field: "_feature_ts"}).sort_values("_feature_ts")
+        source[ENTITY_KEY] = source[ENTITY_KEY].astype(str)
+        tolerance = pd.Timedelta(spec.ttl_ns, unit="ns") if spec.ttl_ns else None
+        result = pd.merge_asof(result, source, left_on=TIMESTAMP_FIELD, right_on="_feature_ts",
+                               by=ENTITY_KEY, tolerance=tolerance).drop(columns="_feature_ts")
+    return result.sort_values("_row").drop(columns="_row").reset_index(drop=True)
+
+
+def run_benchmark(n_rows=1000000, feast_rows=10000, repo_path=FEAST_REPO_PATH):
+    builder = TrainingSetBuilder(repo_path=repo_path)
+    by_view = builder.resolve_features()
+    source_path = next(iter(builder.view_specs().values())).source_path
+    n_features = sum(len(v) for v in by_view.values())
+    print(f"\n📊 POINT-IN-TIME JOIN ({len(by_view)} views, {n_features} features)")
+
+    entity_df = synthetic_entity_df(source_path, n_rows)
+    builder.build(entity_df.head(10))
+
+    start = time.perf_counter()
+    built = builder.build(entity_df)
+    elapsed = time.perf_counter() - start
+    print(f"   searchsorted : {n_rows:>9,} rows {elapsed:7.2f}s  {n_rows / elapsed:>12,.0f} rows/s")
+
+    start = time.perf_counter()
+    baseline = _merge_asof_join(builder, entity_df, by_view)
+    elapsed_asof = time.perf_counter() - start
+    print(f"   merge_asof   : {n_rows:>9,} rows {elapsed_asof:7.2f}s  {n_rows / elapsed_asof:>12,.0f} rows/s")
+
+    features = [f for view_features in by_view.values() for f in view_features]
+    same = np.allclose(built[features].to_numpy(dtype=float), baseline[features].to_numpy(dtype=float), equal_nan=True)
+    print(f"   kết quả giống merge_asof: {same}, tỉ lệ dòng có feature: {built[features[0]].notna().mean():.1%}")
+
+    if feast_rows:
+        small = entity_df.head(feast_rows)
+        refs = [f"{view}:{f}" for view, view_features in by_view.items() for f in view_features]
+        start = time.perf_counter()
+        builder.fs.get_historical_features(entity_df=small, features=refs).to_df()
+        elapsed_feast = time.perf_counter() - start
+        print(f"   feast get_historical_features: {feast_rows:>9,} rows {elapsed_feast:7.2f}s  "
+              f"{feast_rows / elapsed_feast:>12,.0f} rows/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Point-in-time join cho training set")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--feast-rows", type=int, default=10000, help="Số dòng so sánh với Feast (0 = bỏ qua)")
+    parser.add_argument("--repo-path", default=FEAST_REPO_PATH)
+    args = parser.parse_args(argv)
+    if args.benchmark:
+        run_benchmark(args.rows, args.feast_rows, args.repo_path)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ from sklearn.preprocessing import StandardScaler
 import warnings
 from datetime import datetime, timedelta
 import os
+from deduplicator import assign_canonical_ids
 
 warnings.filterwarnings('ignore')
 
@@ -242,6 +243,8 @@ class MobilePhoneTransformer(BaseEstimator, TransformerMixin):
         # Popularity score
         if 'NumberOfReview' in df_processed.columns:
             reviews_clean = df_processed['NumberOfReview'].fillna(0).clip(lower=0)
+            if 'canonical_product_id' in df_processed.columns:
+                reviews_clean = self._reviews_per_product(df_processed, reviews_clean)
             current_max = float(reviews_clean.max())
             if current_max > 0:
                 df_processed['popularity_score'] = (
@@ -314,6 +317,17 @@ class MobilePhoneTransformer(BaseEstimator, TransformerMixin):
         
         return df_processed
 
+    def _reviews_per_product(self, df, reviews):
+        """
+        Số review theo product (canonical_product_id) thay vì theo listing: listing trùng trong cùng
+        nguồn (khác màu) hiện cùng số review nên lấy max, các nguồn khác nhau thì cộng lại.
+        Mọi listing của 1 product nhận cùng popularity_score
+        """
+        sources = df['data_source'].fillna('') if 'data_source' in df.columns else ''
+        frame = pd.DataFrame({'product': df['canonical_product_id'], 'source': sources, 'reviews': reviews})
+        per_product = frame.groupby(['product', 'source'])['reviews'].max().groupby(level='product').sum()
+        return df['canonical_product_id'].map(per_product)
+    
     def get_feature_names_out(self, input_features=None):
         """
         Get all feature names for the 5 Feature Views
@@ -423,6 +437,10 @@ def create_feast_processed_data(raw_data_path, output_path, add_timestamps=True)
     # 2. Add product_id
     raw_data['product_id'] = (raw_data.index + 1).astype(str).str.zfill(3)
     
+    # Listing trùng (khác nguồn / màu / cách ghi tên) -> canonical_product_id, dùng khi tính popularity
+    raw_data, dedup_stats = assign_canonical_ids(raw_data)
+    print(f"   Dedup: {dedup_stats['listings']} listings -> {dedup_stats['clusters']} products")
+    
     # 3. Transform with all new features
     print("🔄 Transforming data...")
     transformer = MobilePhoneTransformer()
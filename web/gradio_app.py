@@ -1,28 +1,32 @@
 # web/gradio_app.py
-import gradio as gr
-import pandas as pd
-import plotly.graph_objects as go
+import os
+import sys
+import threading
 from typing import Dict, List
-import joblib
-from feast import FeatureStore
 
-print("🚀 Loading Phone Prediction Models...")
+# Dùng chung các module trong scripts/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from startup_profile import StartupTimer
+from model_registry import ModelRegistry, FEATURES_RECOM, FEATURES_VALUE, FEATURES_CAMERA
+from inference_pool import InferencePool, InferenceCancelled, InferenceRejected, InferenceTimeout, env_int
+from serving_metrics import METRICS, start_exporter_from_env
+from request_profiler import PROFILER, profiled
+
+startup_timer = StartupTimer("gradio_app")
+
+# pandas / plotly / joblib / feast được import khi cần, chỉ gradio là bắt buộc để build UI
+with startup_timer.phase("import gradio"):
+    import gradio as gr
 
 class MultiModelPredictor:
-    def __init__(self):
+    def __init__(self, registry=None):
         try:
-            # Load Feast store
-            self.fs = FeatureStore(repo_path="../my_phone_features")
-            
-            # Load cả 3 models
-            self.model_recom = joblib.load("../models/model_recommender.pkl")
-            self.scaler_recom = joblib.load("../models/scaler_recommender.pkl")
+            self._fs = None
             
-            self.model_value = joblib.load("../models/model_value.pkl")
-            self.scaler_value = joblib.load("../models/scaler_value.pkl")
-            
-            self.model_camera = joblib.load("../models/model_camera.pkl")
-            self.scaler_camera = joblib.load("../models/scaler_camera.pkl")
+            # Model của từng service được load khi service đó được chọn lần đầu (hoặc warm_up())
+            # PHONE_PRELOAD_SERVICES / PHONE_MAX_LOADED_SERVICES: preload và giới hạn RAM
+            self.registry = registry if registry is not None else ModelRegistry.from_env()
+            self.metrics = METRICS
             
             # Feature refs cho từng model
             self.feature_refs_recom = [
@@ -50,54 +54,89 @@ class MultiModelPredictor:
                 "phone_product:NumberOfReview"
             ]
             
-            # Feature mapping
-            self.features_recom = [
-                'ScreenSize', 'PPI', 'total_resolution', 'camera_score', 
-                'has_telephoto', 'has_ultrawide', 'popularity_score', 
-                'value_score', 'price_segment', 'has_warranty', 'NumberOfReview'
-            ]
-            
-            self.features_value = [
-                'value_score', 'price_segment', 'overall_score', 'display_score', 
-                'camera_rating', 'PPI', 'ScreenSize', 'camera_score', 
-                'main_camera_mp', 'NumberOfReview'
-            ]
-            
-            self.features_camera = [
-                'main_camera_mp', 'num_cameras', 'has_telephoto', 'has_ultrawide', 
-                'has_ois', 'camera_feature_count', 'PPI', 'total_resolution', 
-                'ScreenSize', 'value_score', 'is_premium', 'NumberOfReview'
-            ]
-            
-            print("✅ All models loaded successfully!")
+            # Feature mapping (model_registry, giống lúc training)
+            self.features_recom = FEATURES_RECOM
+            self.features_value = FEATURES_VALUE
+            self.features_camera = FEATURES_CAMERA
             
         except Exception as e:
-            print(f"❌ Error loading models: {e}")
+            print(f"❌ Error creating predictor: {e}")
             raise
     
-    def predict_from_features(self, services: List[str], manual_features: Dict):
-        """Dự đoán từ manual features"""
+    @property
+    def fs(self):
+        if self._fs is None:
+            from feast import FeatureStore
+            self._fs = FeatureStore(repo_path="../my_phone_features")
+        return self._fs
+    
+    def warm_up(self, services=None):
+        """Load models + chạy 1 prediction giả để request đầu tiên không bị chậm"""
+        features = set(self.features_recom + self.features_value + self.features_camera)
+        self.predict_from_features(services or ["recommender", "value_detector", "camera_predictor"],
+                                   {feature: 0.0 for feature in features})
+        return self
+    
+    @profiled("predict_from_features")
+    def predict_from_features(self, services: List[str], manual_features: Dict, sweep: Dict = None):
+        """
+        Dự đoán từ manual features.
+        
+        sweep: {feature: list giá trị} cho 1 hoặc 2 feature thay đổi. Cả lưới giá trị
+        được dựng thành một matrix và mỗi model chỉ predict một lần.
+        """
+        if sweep:
+            return self._predict_sweep(services, manual_features, sweep)
+        service = None
         try:
+            import pandas as pd
+            # Lấy registry một lần: hot reload có thể swap self.registry giữa chừng
+            registry = self.registry
+            metrics = self.metrics
             results = {}
             
+            # Feature thiếu / để trống trong form (model vẫn chạy nếu đủ cột)
+            missing = [f for f in set(self.features_recom + self.features_value + self.features_camera)
+                       if manual_features.get(f) is None]
+            metrics.count_lookup("manual", not missing)
+            
             # Model 1: Smart Recommender
             if "recommender" in services:
-                X_recom = pd.DataFrame([manual_features])[self.features_recom]
-                X_recom_scaled = self.scaler_recom.transform(X_recom)
-                results['overall_score'] = round(self.model_recom.predict(X_recom_scaled)[0], 1)
+                service = "recommender"
+                model, scaler = registry.get(service)
+                with metrics.stage("build_frame", service):
+                    X_recom = pd.DataFrame([manual_features])[self.features_recom]
+                with metrics.stage("scaler_transform", service):
+                    X_recom_scaled = scaler.transform(X_recom)
+                with metrics.stage("model_predict", service):
+                    results['overall_score'] = round(model.predict(X_recom_scaled)[0], 1)
+                metrics.count_request(service, "success")
             
             # Model 2: Value Detector
             if "value_detector" in services:
-                X_value = pd.DataFrame([manual_features])[self.features_value]
-                X_value_scaled = self.scaler_value.transform(X_value)
-                results['is_premium'] = int(self.model_value.predict(X_value_scaled)[0])
-                results['premium_probability'] = round(self.model_value.predict_proba(X_value_scaled)[0][1], 3)
+                service = "value_detector"
+                model, scaler = registry.get(service)
+                with metrics.stage("build_frame", service):
+                    X_value = pd.DataFrame([manual_features])[self.features_value]
+                with metrics.stage("scaler_transform", service):
+                    X_value_scaled = scaler.transform(X_value)
+                with metrics.stage("model_predict", service):
+                    results['is_premium'] = int(model.predict(X_value_scaled)[0])
+                with metrics.stage("predict_proba", service):
+                    results['premium_probability'] = round(model.predict_proba(X_value_scaled)[0][1], 3)
+                metrics.count_request(service, "success")
             
             # Model 3: Camera Predictor
             if "camera_predictor" in services:
-                X_camera = pd.DataFrame([manual_features])[self.features_camera]
-                X_camera_scaled = self.scaler_camera.transform(X_camera)
-                results['camera_rating'] = round(self.model_camera.predict(X_camera_scaled)[0], 1)
+                service = "camera_predictor"
+                model, scaler = registry.get(service)
+                with metrics.stage("build_frame", service):
+                    X_camera = pd.DataFrame([manual_features])[self.features_camera]
+                with metrics.stage("scaler_transform", service):
+                    X_camera_scaled = scaler.transform(X_camera)
+                with metrics.stage("model_predict", service):
+                    results['camera_rating'] = round(model.predict(X_camera_scaled)[0], 1)
+                metrics.count_request(service, "success")
             
             return {
                 'predictions': results,
@@ -106,79 +145,367 @@ class MultiModelPredictor:
             }
             
         except Exception as e:
+            self.metrics.count_request(service or "unknown", "error")
             return {
                 'error': f"Prediction error: {str(e)}",
                 'status': 'error'
             }
+    
+    def _predict_sweep(self, services: List[str], manual_features: Dict, sweep: Dict):
+        """What-if: lưới 1D / 2D quanh manual_features, trả về predictions dạng array theo lưới"""
+        try:
+            import numpy as np
+            import pandas as pd
+            
+            if not 1 <= len(sweep) <= 2:
+                raise ValueError("Sweep cần 1 hoặc 2 feature")
+            features = list(sweep)
+            values = [np.asarray(sweep[feature], dtype=float) for feature in features]
+            
+            # Mỗi điểm trên lưới = base features, chỉ thay các feature đang sweep
+            grid = np.meshgrid(*values, indexing='ij')
+            frame = pd.DataFrame({feature: [value] * grid[0].size for feature, value in manual_features.items()})
+            for feature, axis_values in zip(features, grid):
+                frame[feature] = axis_values.ravel()
+            
+            scored = self.predict_batch(services, frame)
+            shape = grid[0].shape
+            output_names = {
+                'predicted_overall_score': 'overall_score',
+                'premium_probability': 'premium_probability',
+                'predicted_camera_rating': 'camera_rating',
+            }
+            predictions = {output_names[column]: scored[column].to_numpy().reshape(shape)
+                           for column in scored.columns if column in output_names}
+            
+            return {
+                'sweep': {
+                    'features': features,
+                    'values': values,
+                    'predictions': predictions
+                },
+                'status': 'success',
+                'services_used': services
+            }
+        
+        except Exception as e:
+            return {
+                'error': f"Sweep error: {str(e)}",
+                'status': 'error'
+            }
+
+    def predict_batch(self, services: List[str], frame):
+        """Dự đoán cho nhiều dòng: mỗi model được gọi đúng 1 lần trên cả frame"""
+        import pandas as pd
+        registry = self.registry
+        service_features = {
+            "recommender": self.features_recom,
+            "value_detector": self.features_value,
+            "camera_predictor": self.features_camera,
+        }
+        
+        missing = sorted({f for service in services for f in service_features[service] if f not in frame.columns})
+        if missing:
+            raise ValueError(f"Thiếu cột: {', '.join(missing)}")
+        
+        results = pd.DataFrame(index=frame.index)
+        
+        # Model 1: Smart Recommender
+        if "recommender" in services:
+            model, scaler = registry.get("recommender")
+            X_scaled = scaler.transform(frame[self.features_recom])
+            results['predicted_overall_score'] = model.predict(X_scaled).round(1)
+        
+        # Model 2: Value Detector
+        if "value_detector" in services:
+            model, scaler = registry.get("value_detector")
+            X_scaled = scaler.transform(frame[self.features_value])
+            results['predicted_is_premium'] = model.predict(X_scaled).astype(int)
+            results['premium_probability'] = model.predict_proba(X_scaled)[:, 1].round(3)
+        
+        # Model 3: Camera Predictor
+        if "camera_predictor" in services:
+            model, scaler = registry.get("camera_predictor")
+            X_scaled = scaler.transform(frame[self.features_camera])
+            results['predicted_camera_rating'] = model.predict(X_scaled).round(1)
+        
+        return results
+
+class RemotePredictor(MultiModelPredictor):
+    """
+    Gửi inference sang prefork_server (PHONE_PREDICT_BACKEND=http://host:port):
+    models chỉ nằm trong các worker của server, process Gradio không load model.
+    """
+    def __init__(self, url, timeout=10.0):
+        super().__init__()
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+    
+    def _request(self, path, payload=None):
+        import json
+        import urllib.error
+        import urllib.request
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            # Server trả lỗi dạng {'status': 'error', 'error': ...} kèm HTTP 500
+            return json.loads(e.read())
+    
+    def warm_up(self, services=None):
+        print(f"🔗 Prediction backend: {self._request('/health')}")
+        return self
+    
+    def predict_from_features(self, services: List[str], manual_features: Dict, sweep: Dict = None):
+        if sweep:
+            # Lưới what-if đi qua predict_batch -> 1 request cho cả lưới
+            return self._predict_sweep(services, manual_features, sweep)
+        try:
+            result = self._request("/predict_features", {'services': services, 'features': manual_features})
+        except Exception as e:
+            return {'error': f"Prediction error: {str(e)}", 'status': 'error'}
+        if result.get('status') == 'error':
+            return {'error': f"Prediction error: {result['error']}", 'status': 'error'}
+        return result
+    
+    def predict_batch(self, services: List[str], frame):
+        import pandas as pd
+        result = self._request("/predict_batch", {'services': services, 'columns': frame.to_dict('list')})
+        if result.get('status') == 'error':
+            raise ValueError(result['error'])
+        return pd.DataFrame(result['columns'], index=frame.index)
+
+# ==================== BATCH SCORING ====================
+
+# Số dòng mỗi lần gọi model: mỗi chunk = 1 lần predict vectorized / model
+BATCH_CHUNK_ROWS = int(os.environ.get("PHONE_BATCH_CHUNK_ROWS", 2000))
+# Số dòng hiển thị trên bảng preview (file tải về có đủ tất cả)
+BATCH_PREVIEW_ROWS = 200
+# Số batch job chạy song song, tách khỏi hàng đợi của các tab khác
+BATCH_CONCURRENCY = int(os.environ.get("PHONE_BATCH_CONCURRENCY", 1))
+# Số dòng tối đa của 1 file upload (file lớn hơn thì chia nhỏ hoặc chạy precompute_predictions.py)
+BATCH_MAX_ROWS = int(os.environ.get("PHONE_BATCH_MAX_ROWS", 200000))
+
+def read_feature_file(path):
+    """Đọc file CSV / Parquet upload"""
+    import pandas as pd
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        return pd.read_parquet(path)
+    if extension == ".csv":
+        return pd.read_csv(path)
+    raise ValueError(f"Định dạng không hỗ trợ: {extension} (chỉ nhận .csv hoặc .parquet)")
+
+def write_scored_file(scored, source_path):
+    """Ghi kết quả ra file tạm cùng định dạng với file upload"""
+    import tempfile
+    extension = os.path.splitext(source_path)[1].lower()
+    base_name = os.path.splitext(os.path.basename(source_path))[0]
+    output_path = os.path.join(tempfile.mkdtemp(prefix="phone_batch_"), f"{base_name}_scored{extension}")
+    if extension == ".parquet":
+        scored.to_parquet(output_path, index=False)
+    else:
+        scored.to_csv(output_path, index=False)
+    return output_path
 
 # ==================== VISUALIZATION ====================
 
+# Spec của 3 biểu đồ được dựng sẵn một lần dưới dạng dict, mỗi request chỉ thay value.
+# Template plotly mặc định (~7 KB JSON / biểu đồ) được thay bằng template tối giản giữ font + nền.
+VIZ_LAYOUT = {
+    'height': 300,
+    'margin': {'t': 50, 'b': 10},
+    'template': {'layout': {'font': {'color': "#2a3f5f"}, 'paper_bgcolor': "white"}},
+}
+
+VIZ_TEMPLATES = {
+    'overall_score': {
+        'type': "indicator",
+        'mode': "gauge+number",
+        'domain': {'x': [0, 1], 'y': [0, 1]},
+        'title': {'text': "ĐIỂM TỔNG QUAN", 'font': {'size': 16}},
+        'gauge': {
+            'axis': {'range': [None, 100]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [0, 40], 'color': "lightcoral"},
+                {'range': [40, 70], 'color': "lightyellow"},
+                {'range': [70, 100], 'color': "lightgreen"}
+            ]
+        }
+    },
+    'premium_probability': {
+        'type': "indicator",
+        'mode': "gauge+number",
+        'domain': {'x': [0, 1], 'y': [0, 1]},
+        'title': {'text': "XÁC SUẤT FLAGSHIP", 'font': {'size': 16}},
+        'gauge': {'axis': {'range': [None, 100]}}
+    },
+    'camera_rating': {
+        'type': "indicator",
+        'mode': "number+delta",
+        'number': {'suffix': "/5", 'font': {'size': 40}},
+        'title': {'text': "ĐÁNH GIÁ CAMERA", 'font': {'size': 16}},
+        'delta': {'reference': 3}
+    },
+}
+
+def render_figure(name, **trace_updates):
+    """
+    Payload cho gr.Plot từ template đã dựng sẵn: chỉ json.dumps một dict nhỏ,
+    không tạo go.Figure (bỏ qua validate + serialize của plotly)
+    """
+    import json
+    from gradio.components.plot import PlotData
+    trace = dict(VIZ_TEMPLATES[name], **trace_updates)
+    return PlotData(type="plotly", plot=json.dumps({'data': [trace], 'layout': VIZ_LAYOUT}))
+
 def create_visualizations(predictions):
     """Tạo biểu đồ trực quan cho 3 features chính"""
     viz_figures = []
     
     # 1. Overall Score Gauge Chart
     if 'overall_score' in predictions:
-        score = predictions['overall_score']
-        overall_fig = go.Figure(go.Indicator(
-            mode="gauge+number",
-            value=score,
-            domain={'x': [0, 1], 'y': [0, 1]},
-            title={'text': "ĐIỂM TỔNG QUAN", 'font': {'size': 16}},
-            gauge={
-                'axis': {'range': [None, 100]},
-                'bar': {'color': "darkblue"},
-                'steps': [
-                    {'range': [0, 40], 'color': "lightcoral"},
-                    {'range': [40, 70], 'color': "lightyellow"},
-                    {'range': [70, 100], 'color': "lightgreen"}
-                ]
-            }
-        ))
-        overall_fig.update_layout(height=300, margin=dict(t=50, b=10))
-        viz_figures.append(overall_fig)
+        viz_figures.append(render_figure('overall_score', value=float(predictions['overall_score'])))
     
     # 2. Flagship Probability Gauge
     if 'premium_probability' in predictions:
-        prob = predictions['premium_probability'] * 100
-        flagship_fig = go.Figure(go.Indicator(
-            mode="gauge+number",
-            value=prob,
-            domain={'x': [0, 1], 'y': [0, 1]},
-            title={'text': "XÁC SUẤT FLAGSHIP", 'font': {'size': 16}},
-            gauge={
-                'axis': {'range': [None, 100]},
-                'bar': {'color': "green" if prob > 50 else "red"},
-            }
-        ))
-        flagship_fig.update_layout(height=300, margin=dict(t=50, b=10))
-        viz_figures.append(flagship_fig)
+        prob = float(predictions['premium_probability']) * 100
+        gauge = dict(VIZ_TEMPLATES['premium_probability']['gauge'], bar={'color': "green" if prob > 50 else "red"})
+        viz_figures.append(render_figure('premium_probability', value=prob, gauge=gauge))
     
     # 3. Camera Rating
     if 'camera_rating' in predictions:
-        rating = predictions['camera_rating']
-        camera_fig = go.Figure(go.Indicator(
-            mode="number+delta",
-            value=rating,
-            number={'suffix': "/5", 'font': {'size': 40}},
-            title={'text': "ĐÁNH GIÁ CAMERA", 'font': {'size': 16}},
-            delta={'reference': 3}
-        ))
-        camera_fig.update_layout(height=300, margin=dict(t=50, b=10))
-        viz_figures.append(camera_fig)
+        viz_figures.append(render_figure('camera_rating', value=float(predictions['camera_rating'])))
     
     return viz_figures
 
-def create_gradio_interface():
-    # Khởi tạo predictor
+# Feature cho phép sweep: feature -> (nhãn, có phải số nguyên không)
+SWEEP_FEATURES = {
+    'main_camera_mp': ("Camera chính (MP)", False),
+    'camera_score': ("Điểm camera", False),
+    'PPI': ("Mật độ điểm ảnh (PPI)", False),
+    'ScreenSize': ("Kích thước màn hình (inch)", False),
+    'value_score': ("Điểm giá trị", False),
+    'popularity_score': ("Điểm phổ biến", False),
+    'NumberOfReview': ("Số lượng đánh giá", True),
+    'num_cameras': ("Số lượng camera", True),
+    'price_segment': ("Phân khúc giá", True),
+}
+
+# Output -> (nhãn, service cần chạy)
+SWEEP_OUTPUTS = {
+    'overall_score': ("Điểm tổng quan", "recommender"),
+    'premium_probability': ("Xác suất flagship", "value_detector"),
+    'camera_rating': ("Đánh giá camera", "camera_predictor"),
+}
+
+# Giới hạn lưới sweep: mỗi trục tối đa SWEEP_MAX_STEPS điểm, cả lưới 2D tối đa SWEEP_MAX_POINTS
+SWEEP_MAX_STEPS = 200
+SWEEP_MAX_POINTS = 10000
+
+def sweep_values(feature, start, stop, steps):
+    """Giá trị của 1 trục sweep, ValueError khi input thiếu / không hợp lệ"""
+    import math
+    import numpy as np
+    label = SWEEP_FEATURES[feature][0]
+    if any(v is None or not math.isfinite(v) for v in (start, stop, steps)):
+        raise ValueError(f"Nhập đủ Từ / Đến / Số điểm cho {label}")
+    steps = min(max(int(steps), 2), SWEEP_MAX_STEPS)
+    values = np.linspace(start, stop, steps)
+    if SWEEP_FEATURES[feature][1]:
+        values = np.unique(np.round(values))
+    return values
+
+def create_sweep_figure(sweep, output):
+    """Đường cong (1 feature) hoặc heatmap (2 features) cho kết quả sweep"""
+    import plotly.graph_objects as go
+    features, values = sweep['features'], sweep['values']
+    z = sweep['predictions'][output]
+    output_label = SWEEP_OUTPUTS[output][0]
+    
+    if len(features) == 1:
+        fig = go.Figure(go.Scatter(x=values[0], y=z, mode="lines+markers", line={'color': "darkblue"}))
+        fig.update_layout(xaxis_title=SWEEP_FEATURES[features[0]][0], yaxis_title=output_label)
+    else:
+        # Heatmap: hàng = feature thứ 2 (trục y), cột = feature thứ 1 (trục x)
+        fig = go.Figure(go.Heatmap(x=values[0], y=values[1], z=z.T, colorscale="RdYlGn",
+                                   colorbar={'title': output_label}))
+        fig.update_layout(xaxis_title=SWEEP_FEATURES[features[0]][0], yaxis_title=SWEEP_FEATURES[features[1]][0])
+    
+    fig.update_layout(title=f"{output_label} khi thay đổi {' & '.join(features)}", height=400, margin=dict(t=50, b=10))
+    return fig
+
+# ==================== CONCURRENCY ====================
+
+# Hàng đợi Gradio: số event chạy song song / event và số request tối đa trong hàng đợi
+QUEUE_CONCURRENCY = env_int("PHONE_QUEUE_CONCURRENCY", 8)
+QUEUE_MAX_SIZE = env_int("PHONE_QUEUE_MAX_SIZE", 100)
+
+_inference_pool = None
+
+def get_inference_pool():
+    """Pool dùng chung cho mọi handler predict (PHONE_INFERENCE_WORKERS / _MAX_PENDING / _TIMEOUT)"""
+    global _inference_pool
+    if _inference_pool is None:
+        _inference_pool = InferencePool.from_env()
+    return _inference_pool
+
+def session_key(request, handler):
+    """
+    Khoá cancel của InferencePool: (session, handler). Request mới chỉ thay request cũ của cùng
+    handler, bấm sweep không cancel dự đoán đơn đang chạy và ngược lại
+    """
+    session = getattr(request, 'session_hash', None) if request is not None else None
+    return (session, handler) if session is not None else None
+
+def pool_error_message(error):
+    if isinstance(error, InferenceTimeout):
+        return "⏱️ Dự đoán quá thời gian, vui lòng thử lại"
+    if isinstance(error, InferenceRejected):
+        return "🚦 Hệ thống đang quá tải, vui lòng thử lại sau giây lát"
+    return f"❌ Lỗi dự đoán: {str(error)}"
+
+# ==================== RECOMMENDATION ====================
+
+_recommendation_engine = None
+
+def get_recommendation_engine():
+    """Build top-K engine lần đầu sử dụng"""
+    global _recommendation_engine
+    if _recommendation_engine is None:
+        from recommendation_engine import RecommendationEngine
+        _recommendation_engine = RecommendationEngine.from_parquet(
+            "../my_phone_features/data/processed/phone_data_processed.parquet"
+        )
+    return _recommendation_engine
+
+def create_gradio_interface(warm_up=False):
+    # Khởi tạo predictor (chưa load models)
     try:
-        predictor = MultiModelPredictor()
+        # PHONE_PREDICT_BACKEND: dùng prefork_server (nhiều worker chung model) thay vì predict in-process
+        backend = os.environ.get("PHONE_PREDICT_BACKEND")
+        predictor = RemotePredictor(backend) if backend else MultiModelPredictor()
         print("✅ Predictor initialized successfully!")
     except Exception as e:
         print(f"❌ Failed to initialize predictor: {e}")
         # Fallback: tạo predictor rỗng
         predictor = None
     
+    # Warm-up chạy nền trong lúc build UI / start server
+    if warm_up and predictor is not None:
+        threading.Thread(target=predictor.warm_up, name="model-warmup", daemon=True).start()
+    
+    # PHONE_METRICS_PORT / PHONE_METRICS_FILE: export latency + counters dạng Prometheus
+    start_exporter_from_env()
+    
+    # PHONE_MODEL_WATCH=1: tự reload khi models/*.pkl thay đổi (retrain) mà không restart app
+    if os.environ.get("PHONE_MODEL_WATCH") == "1" and predictor is not None and not isinstance(predictor, RemotePredictor):
+        from model_reloader import ModelReloader
+        ModelReloader(predictor).start_watching()
+    
     with gr.Blocks(
         title="Hệ Thống Dự Đoán Điện Thoại",
         theme=gr.themes.Soft()
@@ -187,102 +514,217 @@ def create_gradio_interface():
         gr.Markdown("# 📱 Hệ Thống Dự Đoán Điện Thoại")
         gr.Markdown("Nhập thông số điện thoại để xem kết quả dự đoán với biểu đồ trực quan")
         
-        with gr.Row():
-            # Cột trái: Input - Nhập liệu chuyên sâu
-            with gr.Column(scale=1):
-                gr.Markdown("### ⌨️ Nhập Thông Số")
+        with gr.Tabs():
+            with gr.Tab("🎯 Dự đoán"):
+                with gr.Row():
+                    # Cột trái: Input - Nhập liệu chuyên sâu
+                    with gr.Column(scale=1):
+                        gr.Markdown("### ⌨️ Nhập Thông Số")
                 
-                # Service selection
-                services = gr.CheckboxGroup(
-                    choices=[
-                        ("Đề xuất tổng quan", "recommender"),
-                        ("Phát hiện flagship", "value_detector"), 
-                        ("Đánh giá camera", "camera_predictor")
-                    ],
-                    label="Dịch vụ dự đoán",
-                    value=["recommender", "value_detector", "camera_predictor"]
-                )
+                        # Service selection
+                        services = gr.CheckboxGroup(
+                            choices=[
+                                ("Đề xuất tổng quan", "recommender"),
+                                ("Phát hiện flagship", "value_detector"), 
+                                ("Đánh giá camera", "camera_predictor")
+                            ],
+                            label="Dịch vụ dự đoán",
+                            value=["recommender", "value_detector", "camera_predictor"]
+                        )
                 
-                # Expert inputs với accordion
-                with gr.Accordion("📱 Thông số màn hình", open=True):
-                    with gr.Row():
-                        screen_size = gr.Number(label="Kích thước màn hình (inch)", value=6.1)
-                        ppi = gr.Number(label="Mật độ điểm ảnh (PPI)", value=460)
-                    total_resolution = gr.Number(label="Độ phân giải tổng", value=2430000)
+                        # Expert inputs với accordion
+                        with gr.Accordion("📱 Thông số màn hình", open=True):
+                            with gr.Row():
+                                screen_size = gr.Number(label="Kích thước màn hình (inch)", value=6.1)
+                                ppi = gr.Number(label="Mật độ điểm ảnh (PPI)", value=460)
+                            total_resolution = gr.Number(label="Độ phân giải tổng", value=2430000)
                 
-                with gr.Accordion("📸 Thông số camera", open=True):
-                    with gr.Row():
-                        camera_score = gr.Number(label="Điểm camera", value=65.0)
-                        main_camera_mp = gr.Number(label="Camera chính (MP)", value=48.0)
-                    with gr.Row():
-                        num_cameras = gr.Number(label="Số lượng camera", value=3)
-                        camera_feature_count = gr.Number(label="Số tính năng camera", value=2)
-                    with gr.Row():
-                        has_telephoto = gr.Checkbox(label="Có telephoto", value=True)
-                        has_ultrawide = gr.Checkbox(label="Có ultrawide", value=True)
-                        has_ois = gr.Checkbox(label="Có OIS", value=True)
+                        with gr.Accordion("📸 Thông số camera", open=True):
+                            with gr.Row():
+                                camera_score = gr.Number(label="Điểm camera", value=65.0)
+                                main_camera_mp = gr.Number(label="Camera chính (MP)", value=48.0)
+                            with gr.Row():
+                                num_cameras = gr.Number(label="Số lượng camera", value=3)
+                                camera_feature_count = gr.Number(label="Số tính năng camera", value=2)
+                            with gr.Row():
+                                has_telephoto = gr.Checkbox(label="Có telephoto", value=True)
+                                has_ultrawide = gr.Checkbox(label="Có ultrawide", value=True)
+                                has_ois = gr.Checkbox(label="Có OIS", value=True)
                 
-                with gr.Accordion("⭐ Điểm đánh giá", open=False):
-                    with gr.Row():
-                        popularity_score = gr.Number(label="Điểm phổ biến", value=60.0)
-                        overall_score_input = gr.Number(label="Điểm tổng quan", value=55.0)
-                    with gr.Row():
-                        display_score = gr.Number(label="Điểm màn hình", value=70.0)
-                        camera_rating_input = gr.Number(label="Đánh giá camera", value=3.5)
+                        with gr.Accordion("⭐ Điểm đánh giá", open=False):
+                            with gr.Row():
+                                popularity_score = gr.Number(label="Điểm phổ biến", value=60.0)
+                                overall_score_input = gr.Number(label="Điểm tổng quan", value=55.0)
+                            with gr.Row():
+                                display_score = gr.Number(label="Điểm màn hình", value=70.0)
+                                camera_rating_input = gr.Number(label="Đánh giá camera", value=3.5)
                 
-                with gr.Accordion("💰 Thông số giá trị", open=False):
-                    with gr.Row():
-                        value_score = gr.Number(label="Điểm giá trị", value=6.5)
-                        price_segment = gr.Radio(
-                            choices=[("Phổ thông", 0), ("Tầm trung", 1), ("Cao cấp", 2)], 
-                            label="Phân khúc giá",
-                            value=1
-                        )
-                    is_premium_input = gr.Checkbox(label="Là flagship", value=False)
+                        with gr.Accordion("💰 Thông số giá trị", open=False):
+                            with gr.Row():
+                                value_score = gr.Number(label="Điểm giá trị", value=6.5)
+                                price_segment = gr.Radio(
+                                    choices=[("Phổ thông", 0), ("Tầm trung", 1), ("Cao cấp", 2)], 
+                                    label="Phân khúc giá",
+                                    value=1
+                                )
+                            is_premium_input = gr.Checkbox(label="Là flagship", value=False)
                 
-                with gr.Accordion("📦 Thông số sản phẩm", open=False):
-                    with gr.Row():
-                        has_warranty = gr.Checkbox(label="Có bảo hành", value=True)
-                        number_of_review = gr.Number(label="Số đánh giá", value=120)
+                        with gr.Accordion("📦 Thông số sản phẩm", open=False):
+                            with gr.Row():
+                                has_warranty = gr.Checkbox(label="Có bảo hành", value=True)
+                                number_of_review = gr.Number(label="Số đánh giá", value=120)
                 
-                predict_btn = gr.Button("🎯 Thực Hiện Dự Đoán", variant="primary", size="lg")
+                        predict_btn = gr.Button("🎯 Thực Hiện Dự Đoán", variant="primary", size="lg")
             
-            # Cột phải: Kết quả + Biểu đồ
-            with gr.Column(scale=2):
-                gr.Markdown("### 📊 Kết Quả Dự Đoán")
+                    # Cột phải: Kết quả + Biểu đồ
+                    with gr.Column(scale=2):
+                        gr.Markdown("### 📊 Kết Quả Dự Đoán")
+                
+                        # Kết quả dạng text
+                        with gr.Group():
+                            gr.Markdown("#### Chi tiết kết quả")
+                            overall_score_output = gr.Textbox(label="Điểm tổng quan", interactive=False)
+                            flagship_output = gr.Textbox(label="Phân loại flagship", interactive=False)
+                            camera_output = gr.Textbox(label="Đánh giá camera", interactive=False)
+                            status_output = gr.Textbox(label="Trạng thái", value="Sẵn sàng", interactive=False)
                 
-                # Kết quả dạng text
-                with gr.Group():
-                    gr.Markdown("#### Chi tiết kết quả")
-                    overall_score_output = gr.Textbox(label="Điểm tổng quan", interactive=False)
-                    flagship_output = gr.Textbox(label="Phân loại flagship", interactive=False)
-                    camera_output = gr.Textbox(label="Đánh giá camera", interactive=False)
-                    status_output = gr.Textbox(label="Trạng thái", value="Sẵn sàng", interactive=False)
+                        # Biểu đồ trực quan
+                        gr.Markdown("#### Biểu đồ trực quan")
+                        with gr.Row():
+                            overall_viz = gr.Plot(label="Điểm tổng quan")
+                            flagship_viz = gr.Plot(label="Xác suất flagship")
+                        with gr.Row():
+                            camera_viz = gr.Plot(label="Đánh giá camera")
+        
+                # What-if: sweep 1-2 thông số quanh bộ thông số đang nhập
+                with gr.Accordion("📈 Phân tích độ nhạy (what-if)", open=False):
+                    sweep_feature_choices = [(label, feature) for feature, (label, _) in SWEEP_FEATURES.items()]
+                    with gr.Row():
+                        with gr.Column(scale=1):
+                            sweep_output = gr.Radio(
+                                choices=[(label, output) for output, (label, _) in SWEEP_OUTPUTS.items()],
+                                label="Kết quả cần xem",
+                                value="overall_score"
+                            )
+                            sweep_x = gr.Dropdown(choices=sweep_feature_choices, value="main_camera_mp", label="Thông số thay đổi (trục X)")
+                            with gr.Row():
+                                sweep_x_start = gr.Number(label="Từ", value=12)
+                                sweep_x_stop = gr.Number(label="Đến", value=200)
+                                sweep_x_steps = gr.Number(label="Số điểm", value=100, precision=0,
+                                                          minimum=2, maximum=SWEEP_MAX_STEPS)
+                            sweep_y = gr.Dropdown(choices=[("(Không)", "")] + sweep_feature_choices, value="",
+                                                  label="Thông số thứ 2 (trục Y, heatmap)")
+                            with gr.Row():
+                                sweep_y_start = gr.Number(label="Từ", value=0)
+                                sweep_y_stop = gr.Number(label="Đến", value=2)
+                                sweep_y_steps = gr.Number(label="Số điểm", value=3, precision=0,
+                                                          minimum=2, maximum=SWEEP_MAX_STEPS)
+                            sweep_btn = gr.Button("📈 Phân Tích", variant="secondary")
+                        with gr.Column(scale=2):
+                            sweep_status = gr.Textbox(label="Trạng thái", value="Sẵn sàng", interactive=False)
+                            sweep_plot = gr.Plot(label="Độ nhạy")
+
+                # Hướng dẫn sử dụng
+                gr.Markdown("---")
+                gr.Markdown("### 💡 Hướng dẫn sử dụng")
+                gr.Markdown("1. Chọn dịch vụ dự đoán cần sử dụng")
+                gr.Markdown("2. Nhập các thông số điện thoại trong các mục tương ứng")  
+                gr.Markdown("3. Nhấn 'Thực Hiện Dự Đoán' để xem kết quả và biểu đồ")
+                gr.Markdown("4. Kết quả được dự đoán bằng Machine Learning models đã train")
+
+            with gr.Tab("🏆 Gợi ý điện thoại"):
+                gr.Markdown("### 🔎 Tìm điện thoại tốt nhất theo nhu cầu")
                 
-                # Biểu đồ trực quan
-                gr.Markdown("#### Biểu đồ trực quan")
                 with gr.Row():
-                    overall_viz = gr.Plot(label="Điểm tổng quan")
-                    flagship_viz = gr.Plot(label="Xác suất flagship")
+                    with gr.Column(scale=1):
+                        max_price_input = gr.Number(label="Giá tối đa (triệu VND)", value=10)
+                        segment_input = gr.CheckboxGroup(
+                            choices=[("Phổ thông", 0), ("Tầm trung", 1), ("Cao cấp", 2)],
+                            label="Phân khúc giá",
+                            value=[0, 1, 2]
+                        )
+                        with gr.Row():
+                            require_ultrawide = gr.Checkbox(label="Có ultrawide", value=True)
+                            require_ois = gr.Checkbox(label="Có OIS", value=True)
+                        with gr.Row():
+                            require_telephoto = gr.Checkbox(label="Có telephoto", value=False)
+                            require_warranty = gr.Checkbox(label="Có bảo hành", value=False)
+                        sort_by_input = gr.Radio(
+                            choices=[("Điểm tổng quan", "overall_score"), ("Điểm giá trị", "value_score")],
+                            label="Sắp xếp theo",
+                            value="overall_score"
+                        )
+                        top_k_input = gr.Slider(minimum=1, maximum=50, step=1, value=10, label="Số lượng kết quả")
+                        recommend_btn = gr.Button("🔎 Tìm Điện Thoại", variant="primary")
+                    
+                    with gr.Column(scale=2):
+                        recommend_status = gr.Textbox(label="Trạng thái", value="Sẵn sàng", interactive=False)
+                        recommend_table = gr.Dataframe(
+                            headers=["product_id", "Tên", "Giá (VND)", "Điểm"],
+                            label="Kết quả gợi ý",
+                            interactive=False
+                        )
+            
+            with gr.Tab("📂 Chấm điểm hàng loạt"):
+                gr.Markdown("### 📂 Upload file CSV / Parquet chứa thông số nhiều điện thoại")
+                gr.Markdown("Mỗi dòng là một điện thoại, tên cột giống tab Dự đoán (vd. `ScreenSize`, `PPI`, `camera_score`, ...)")
+                
                 with gr.Row():
-                    camera_viz = gr.Plot(label="Đánh giá camera")
-        
-        # Hướng dẫn sử dụng
-        gr.Markdown("---")
-        gr.Markdown("### 💡 Hướng dẫn sử dụng")
-        gr.Markdown("1. Chọn dịch vụ dự đoán cần sử dụng")
-        gr.Markdown("2. Nhập các thông số điện thoại trong các mục tương ứng")  
-        gr.Markdown("3. Nhấn 'Thực Hiện Dự Đoán' để xem kết quả và biểu đồ")
-        gr.Markdown("4. Kết quả được dự đoán bằng Machine Learning models đã train")
+                    with gr.Column(scale=1):
+                        batch_file = gr.File(label="File thông số", file_types=[".csv", ".parquet"])
+                        batch_services = gr.CheckboxGroup(
+                            choices=[
+                                ("Đề xuất tổng quan", "recommender"),
+                                ("Phát hiện flagship", "value_detector"),
+                                ("Đánh giá camera", "camera_predictor")
+                            ],
+                            label="Dịch vụ dự đoán",
+                            value=["recommender", "value_detector", "camera_predictor"]
+                        )
+                        batch_btn = gr.Button("🚀 Chấm Điểm", variant="primary")
+                        batch_download = gr.File(label="Tải kết quả", interactive=False)
+                    
+                    with gr.Column(scale=2):
+                        batch_status = gr.Textbox(label="Trạng thái", value="Sẵn sàng", interactive=False)
+                        batch_table = gr.Dataframe(label=f"Kết quả ({BATCH_PREVIEW_ROWS} dòng đầu)", interactive=False)
 
         # ==================== EVENT HANDLERS ====================
 
+        def build_manual_features(screen_size, ppi, total_resolution,
+                                  camera_score, main_camera_mp, num_cameras, camera_feature_count,
+                                  has_telephoto, has_ultrawide, has_ois, popularity_score,
+                                  overall_score_input, display_score, camera_rating_input,
+                                  value_score, price_segment, is_premium_input,
+                                  has_warranty, number_of_review):
+            """Gom input trên form thành dict features cho predictor"""
+            return {
+                "ScreenSize": screen_size,
+                "PPI": ppi,
+                "total_resolution": total_resolution,
+                "camera_score": camera_score,
+                "main_camera_mp": main_camera_mp,
+                "num_cameras": num_cameras,
+                "camera_feature_count": camera_feature_count,
+                "has_telephoto": 1 if has_telephoto else 0,
+                "has_ultrawide": 1 if has_ultrawide else 0,
+                "has_ois": 1 if has_ois else 0,
+                "popularity_score": popularity_score,
+                "overall_score": overall_score_input,
+                "display_score": display_score,
+                "camera_rating": camera_rating_input,
+                "value_score": value_score,
+                "price_segment": price_segment,
+                "is_premium": 1 if is_premium_input else 0,
+                "has_warranty": 1 if has_warranty else 0,
+                "NumberOfReview": number_of_review
+            }
+
         def handle_expert_prediction(services, screen_size, ppi, total_resolution,
                                    camera_score, main_camera_mp, num_cameras, camera_feature_count,
                                    has_telephoto, has_ultrawide, has_ois, popularity_score,
                                    overall_score_input, display_score, camera_rating_input,
                                    value_score, price_segment, is_premium_input,
-                                   has_warranty, number_of_review):
+                                   has_warranty, number_of_review, request: gr.Request = None):
             """Xử lý dự đoán từ manual input chuyên sâu"""
             
             if not services:
@@ -308,31 +750,21 @@ def create_gradio_interface():
                 }
             
             # Chuẩn bị manual features
-            manual_features = {
-                "ScreenSize": screen_size,
-                "PPI": ppi,
-                "total_resolution": total_resolution,
-                "camera_score": camera_score,
-                "main_camera_mp": main_camera_mp,
-                "num_cameras": num_cameras,
-                "camera_feature_count": camera_feature_count,
-                "has_telephoto": 1 if has_telephoto else 0,
-                "has_ultrawide": 1 if has_ultrawide else 0,
-                "has_ois": 1 if has_ois else 0,
-                "popularity_score": popularity_score,
-                "overall_score": overall_score_input,
-                "display_score": display_score,
-                "camera_rating": camera_rating_input,
-                "value_score": value_score,
-                "price_segment": price_segment,
-                "is_premium": 1 if is_premium_input else 0,
-                "has_warranty": 1 if has_warranty else 0,
-                "NumberOfReview": number_of_review
-            }
+            manual_features = build_manual_features(
+                screen_size, ppi, total_resolution,
+                camera_score, main_camera_mp, num_cameras, camera_feature_count,
+                has_telephoto, has_ultrawide, has_ois, popularity_score,
+                overall_score_input, display_score, camera_rating_input,
+                value_score, price_segment, is_premium_input,
+                has_warranty, number_of_review
+            )
             
             try:
-                # Gọi predictor
-                result = predictor.predict_from_features(services, manual_features)
+                # Gọi predictor trong inference pool (giới hạn song song + timeout)
+                result = get_inference_pool().run(
+                    predictor.predict_from_features, services, manual_features,
+                    session=session_key(request, "predict")
+                )
                 
                 if result['status'] == 'success':
                     predictions = result['predictions']
@@ -372,17 +804,155 @@ def create_gradio_interface():
                         camera_viz: None
                     }
                 
+            except InferenceCancelled:
+                # User đã bấm dự đoán lại: request mới sẽ cập nhật UI
+                return {status_output: gr.skip()}
             except Exception as e:
                 return {
                     overall_score_output: "",
                     flagship_output: "",
                     camera_output: "",
-                    status_output: f"❌ Lỗi dự đoán: {str(e)}",
+                    status_output: pool_error_message(e),
                     overall_viz: None,
                     flagship_viz: None,
                     camera_viz: None
                 }
 
+        def handle_sweep(screen_size, ppi, total_resolution,
+                         camera_score, main_camera_mp, num_cameras, camera_feature_count,
+                         has_telephoto, has_ultrawide, has_ois, popularity_score,
+                         overall_score_input, display_score, camera_rating_input,
+                         value_score, price_segment, is_premium_input,
+                         has_warranty, number_of_review,
+                         output, x_feature, x_start, x_stop, x_steps,
+                         y_feature, y_start, y_stop, y_steps, request: gr.Request = None):
+            """What-if: 1 lần predict cho cả lưới giá trị, vẽ đường cong / heatmap"""
+            
+            if predictor is None:
+                return "❌ Lỗi: Models chưa được load", None
+            if y_feature == x_feature:
+                return "❌ Hai thông số sweep phải khác nhau", None
+            
+            try:
+                sweep = {x_feature: sweep_values(x_feature, x_start, x_stop, x_steps)}
+                if y_feature:
+                    sweep[y_feature] = sweep_values(y_feature, y_start, y_stop, y_steps)
+            except (ValueError, KeyError) as e:
+                return f"❌ {e}", None
+            n_points = 1
+            for values in sweep.values():
+                n_points *= len(values)
+            if n_points > SWEEP_MAX_POINTS:
+                return f"❌ Lưới {n_points} điểm, tối đa {SWEEP_MAX_POINTS} điểm: giảm Số điểm", None
+            
+            manual_features = build_manual_features(
+                screen_size, ppi, total_resolution,
+                camera_score, main_camera_mp, num_cameras, camera_feature_count,
+                has_telephoto, has_ultrawide, has_ois, popularity_score,
+                overall_score_input, display_score, camera_rating_input,
+                value_score, price_segment, is_premium_input,
+                has_warranty, number_of_review
+            )
+            try:
+                result = get_inference_pool().run(
+                    predictor.predict_from_features, [SWEEP_OUTPUTS[output][1]], manual_features,
+                    sweep=sweep, session=session_key(request, "sweep")
+                )
+            except InferenceCancelled:
+                return gr.skip(), gr.skip()
+            except Exception as e:
+                return pool_error_message(e), None
+            if result['status'] != 'success':
+                return f"❌ {result.get('error', 'Lỗi không xác định')}", None
+            
+            return f"✅ Đã dự đoán {n_points} điểm", create_sweep_figure(result['sweep'], output)
+
+        def handle_recommendation(max_price, segments, require_ultrawide, require_ois,
+                                  require_telephoto, require_warranty, sort_by, top_k):
+            """Tìm top K điện thoại theo filter"""
+            import pandas as pd
+            empty_table = pd.DataFrame(columns=["product_id", "Tên", "Giá (VND)", "Điểm"])
+            
+            if not segments:
+                return "❌ Vui lòng chọn ít nhất một phân khúc", empty_table
+            
+            try:
+                result = get_recommendation_engine().top_k(
+                    k=int(top_k),
+                    sort_by=sort_by,
+                    max_price=max_price * 1000000 if max_price else None,
+                    price_segments=segments,
+                    has_ultrawide=1 if require_ultrawide else None,
+                    has_ois=1 if require_ois else None,
+                    has_telephoto=1 if require_telephoto else None,
+                    has_warranty=1 if require_warranty else None
+                )
+                
+                table = pd.DataFrame(
+                    [[item['product_id'], item.get('name', ''), item['price'], item['score']]
+                     for item in result['results']],
+                    columns=["product_id", "Tên", "Giá (VND)", "Điểm"]
+                )
+                status = f"✅ Tìm thấy {len(table)} điện thoại (duyệt {result['scanned']}/{result['catalog_size']} sản phẩm)"
+                return status, table
+                
+            except Exception as e:
+                return f"❌ Lỗi tìm kiếm: {str(e)}", empty_table
+
+        def handle_batch_upload(file, services, progress=gr.Progress()):
+            """Chấm điểm file upload theo từng chunk, stream kết quả về UI"""
+            import pandas as pd
+            
+            if predictor is None:
+                yield "❌ Predictor chưa sẵn sàng", None, None
+                return
+            if file is None:
+                yield "❌ Vui lòng upload file CSV hoặc Parquet", None, None
+                return
+            if not services:
+                yield "❌ Vui lòng chọn ít nhất một dịch vụ", None, None
+                return
+            
+            path = file if isinstance(file, str) else file.name
+            try:
+                frame = read_feature_file(path)
+            except Exception as e:
+                yield f"❌ Không đọc được file: {str(e)}", None, None
+                return
+            
+            total = len(frame)
+            if total > BATCH_MAX_ROWS:
+                yield f"❌ File có {total} dòng, tối đa {BATCH_MAX_ROWS} dòng mỗi lần upload", None, None
+                return
+            scored_chunks = []
+            try:
+                for start in range(0, total, BATCH_CHUNK_ROWS):
+                    chunk = frame.iloc[start:start + BATCH_CHUNK_ROWS]
+                    # Qua inference pool như các tab khác: giới hạn song song + timeout cho mỗi chunk
+                    predictions = get_inference_pool().run(predictor.predict_batch, services, chunk)
+                    # File upload lại từ kết quả cũ đã có cột predicted_*: thay bằng kết quả mới
+                    chunk = chunk.drop(columns=predictions.columns.intersection(chunk.columns))
+                    scored_chunks.append(chunk.join(predictions))
+                    done = start + len(chunk)
+                    progress(done / total, desc=f"Đã chấm {done}/{total} dòng")
+                    
+                    # Chỉ gửi preview khi còn thiếu dòng để hiển thị
+                    if done - len(chunk) < BATCH_PREVIEW_ROWS:
+                        preview = pd.concat(scored_chunks).head(BATCH_PREVIEW_ROWS)
+                        yield f"⏳ Đã chấm {done}/{total} dòng...", preview, None
+                    else:
+                        yield f"⏳ Đã chấm {done}/{total} dòng...", gr.skip(), None
+            except (InferenceTimeout, InferenceRejected) as e:
+                yield pool_error_message(e), None, None
+                return
+            except Exception as e:
+                yield f"❌ Lỗi chấm điểm: {str(e)}", None, None
+                return
+            
+            scored = pd.concat(scored_chunks) if scored_chunks else frame
+            output_path = write_scored_file(scored, path)
+            yield f"✅ Đã chấm {total} điện thoại", scored.head(BATCH_PREVIEW_ROWS), output_path
+
         # Bind events
         predict_btn.click(
             handle_expert_prediction,
@@ -393,20 +963,67 @@ def create_gradio_interface():
                    value_score, price_segment, is_premium_input,
                    has_warranty, number_of_review],
             outputs=[overall_score_output, flagship_output, camera_output, status_output,
-                    overall_viz, flagship_viz, camera_viz]
+                    overall_viz, flagship_viz, camera_viz],
+            # Cho phép gửi lại khi request cũ chưa xong: inference pool bỏ request cũ của session
+            trigger_mode="multiple"
+        )
+        
+        sweep_btn.click(
+            handle_sweep,
+            inputs=[screen_size, ppi, total_resolution,
+                   camera_score, main_camera_mp, num_cameras, camera_feature_count,
+                   has_telephoto, has_ultrawide, has_ois, popularity_score,
+                   overall_score_input, display_score, camera_rating_input,
+                   value_score, price_segment, is_premium_input,
+                   has_warranty, number_of_review,
+                   sweep_output, sweep_x, sweep_x_start, sweep_x_stop, sweep_x_steps,
+                   sweep_y, sweep_y_start, sweep_y_stop, sweep_y_steps],
+            outputs=[sweep_status, sweep_plot],
+            trigger_mode="multiple"
         )
 
+        recommend_btn.click(
+            handle_recommendation,
+            inputs=[max_price_input, segment_input, require_ultrawide, require_ois,
+                   require_telephoto, require_warranty, sort_by_input, top_k_input],
+            outputs=[recommend_status, recommend_table]
+        )
+        
+        # Batch job có hàng đợi riêng: file lớn không chiếm slot của các tab khác
+        batch_btn.click(
+            handle_batch_upload,
+            inputs=[batch_file, batch_services],
+            outputs=[batch_status, batch_table, batch_download],
+            concurrency_limit=BATCH_CONCURRENCY,
+            concurrency_id="batch_scoring"
+        )
+
+    # Giới hạn hàng đợi: request vượt max_size bị từ chối ngay thay vì chờ vô hạn
+    demo.queue(default_concurrency_limit=QUEUE_CONCURRENCY, max_size=QUEUE_MAX_SIZE)
     return demo
 
 if __name__ == "__main__":
-    demo = create_gradio_interface()
+    # PHONE_APP_WARMUP=1 hoặc --warmup: load models nền ngay khi start thay vì ở request đầu tiên
+    warm_up = "--warmup" in sys.argv or os.environ.get("PHONE_APP_WARMUP") == "1"
+    
+    with startup_timer.phase("build UI"):
+        demo = create_gradio_interface(warm_up=warm_up)
     print("✅ Gradio interface created successfully!")
     print("🤖 Using trained ML models for prediction")
     print("📊 Features: Manual input + Visualization charts") 
     print("🌐 Starting server on http://localhost:7869")
     
-    demo.launch(
-        server_name="0.0.0.0",
-        server_port=7855,
-        share=False
-    )
\ No newline at end of file
+    with startup_timer.phase("start server"):
+        demo.launch(
+            server_name="0.0.0.0",
+            server_port=7855,
+            share=False,
+            prevent_thread_lock=True
+        )
+    startup_timer.mark_ready()
+    startup_timer.report()
+    
+    # PHONE_PROFILE=1: kill -USR1 <pid> ghi stack request chậm nhất, kill -USR2 <pid> diff tracemalloc
+    if PROFILER.enabled and PROFILER.install_signal_handlers():
+        print(f"🔥 Profiler on (pid {os.getpid()}): SIGUSR1 = slowest stacks, SIGUSR2 = memory diff")
+    demo.block_thread()